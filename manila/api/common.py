@@ -97,6 +97,13 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
                     will cause exc.HTTPBadRequest() exceptions to be raised.
     :kwarg max_limit: The maximum number of items to return from 'items'
     """
+    limit, offset = get_limit_and_offset(request, max_limit)
+    range_end = offset + limit
+    return items[offset:range_end]
+
+
+def get_limit_and_offset(request, max_limit=CONF.osapi_max_limit):
+    """Return limit, offset tuple from request validated as by limited()."""
     try:
         offset = int(request.GET.get('offset', 0))
     except ValueError:
@@ -118,8 +125,7 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
         raise webob.exc.HTTPBadRequest(explanation=msg)
 
     limit = min(max_limit, limit or max_limit)
-    range_end = offset + limit
-    return items[offset:range_end]
+    return limit, offset
 
 
 def limited_by_marker(items, request, max_limit=CONF.osapi_max_limit):
@@ -202,6 +208,8 @@ class ViewBuilder(object):
     def _get_next_link(self, request, identifier):
         """Return href string with proper limit and marker params."""
         params = request.params.copy()
+        # Marker replaces offset of the current page.
+        params.pop("offset", None)
         params["marker"] = identifier
         prefix = self._update_link_prefix(request.application_url,
                                           CONF.osapi_share_base_URL)
@@ -232,8 +240,8 @@ class ViewBuilder(object):
     def _get_collection_links(self, request, items, id_key="uuid"):
         """Retrieve 'next' link, if applicable."""
         links = []
-        limit = int(request.params.get("limit", 0))
-        if limit and limit == len(items):
+        limit = int(request.params.get("limit", 0)) or CONF.osapi_max_limit
+        if min(limit, CONF.osapi_max_limit) == len(items):
             last_item = items[-1]
             if id_key in last_item:
                 last_item_id = last_item[id_key]
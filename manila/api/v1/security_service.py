@@ -125,37 +125,42 @@ class SecurityServiceController(wsgi.Controller):
         if 'share_network_id' in search_opts:
             share_nw = db.share_network_get(context,
                                             search_opts['share_network_id'])
-            security_services = share_nw['security_services']
+            security_services = common.limited(share_nw['security_services'],
+                                               req)
         else:
+            # Pagination and sorting params are not filters.
+            limit, offset = common.get_limit_and_offset(req)
+            for key in ('limit', 'offset'):
+                search_opts.pop(key, None)
+            kwargs = dict(limit=limit, offset=offset or None,
+                          marker=search_opts.pop('marker', None),
+                          sort_key=search_opts.pop('sort_key', None),
+                          sort_dir=search_opts.pop('sort_dir', None))
+            if not is_detail:
+                kwargs['columns'] = self._view_builder.summary_columns
             common.remove_invalid_options(
                 context,
                 search_opts,
                 self._get_security_services_search_options())
-            if 'all_tenants' in search_opts:
-                security_services = db.security_service_get_all(context)
-                del search_opts['all_tenants']
-            else:
-                security_services = db.security_service_get_all_by_project(
-                    context, context.project_id)
-            if search_opts:
-                results = []
-                not_found = object()
-                for service in security_services:
-                    for opt, value in six.iteritems(search_opts):
-                        if service.get(opt, not_found) != value:
-                            break
-                    else:
-                        results.append(service)
-                security_services = results
-
-        limited_list = common.limited(security_services, req)
+            all_tenants = search_opts.pop('all_tenants', None)
+            try:
+                if all_tenants is not None:
+                    security_services = db.security_service_get_all(
+                        context, filters=search_opts, **kwargs)
+                else:
+                    security_services = (
+                        db.security_service_get_all_by_project(
+                            context, context.project_id,
+                            filters=search_opts, **kwargs))
+            except exception.InvalidInput as e:
+                raise exc.HTTPBadRequest(explanation=six.text_type(e))
 
         if is_detail:
             security_services = self._view_builder.detail_list(
-                req, limited_list)
+                req, security_services)
         else:
             security_services = self._view_builder.summary_list(
-                req, limited_list)
+                req, security_services)
         return security_services
 
     def _get_security_services_search_options(self):
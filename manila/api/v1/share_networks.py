@@ -20,6 +20,7 @@ import six
 import webob
 from webob import exc
 
+from manila.api import common
 from manila.api.openstack import wsgi
 from manila.api.views import share_networks as share_networks_views
 from manila.api import xmlutil
@@ -132,17 +133,29 @@ class ShareNetworkController(wsgi.Controller):
         search_opts = {}
         search_opts.update(req.GET)
 
-        if search_opts.pop('all_tenants', None):
-            networks = db_api.share_network_get_all(context)
+        # NOTE: share networks are paginated only on request.
+        kwargs = {}
+        if any(key in search_opts for key in ('limit', 'offset', 'marker')):
+            limit, offset = common.get_limit_and_offset(req)
+            kwargs.update(limit=limit, offset=offset or None)
+        for key in ('limit', 'offset', 'marker', 'sort_key', 'sort_dir'):
+            if key in search_opts:
+                kwargs.setdefault(key, search_opts.pop(key))
+        if is_detail:
+            kwargs['columns'] = self._view_builder.detail_columns
         else:
-            networks = db_api.share_network_get_all_by_project(
-                context,
-                context.project_id)
+            kwargs['columns'] = self._view_builder.summary_columns
 
-        if search_opts:
-            for key, value in six.iteritems(search_opts):
-                networks = [network for network in networks
-                            if network[key] == value]
+        try:
+            if search_opts.pop('all_tenants', None):
+                networks = db_api.share_network_get_all(
+                    context, filters=search_opts, **kwargs)
+            else:
+                networks = db_api.share_network_get_all_by_project(
+                    context, context.project_id, filters=search_opts,
+                    **kwargs)
+        except exception.InvalidInput as e:
+            raise exc.HTTPBadRequest(explanation=six.text_type(e))
         return self._view_builder.build_share_networks(networks, is_detail)
 
     @wsgi.serializers(xml=ShareNetworksTemplate)
@@ -17,6 +17,7 @@ import six
 import webob
 from webob import exc
 
+from manila.api import common
 from manila.api.openstack import wsgi
 from manila.api.views import share_servers as share_servers_views
 from manila.api import xmlutil
@@ -81,20 +82,26 @@ class ShareServerController(wsgi.Controller):
         search_opts = {}
         search_opts.update(req.GET)
 
-        share_servers = db_api.share_server_get_all(context)
+        # NOTE: share servers are paginated only on request.
+        kwargs = {}
+        if any(key in search_opts for key in ('limit', 'offset', 'marker')):
+            limit, offset = common.get_limit_and_offset(req)
+            kwargs.update(limit=limit, offset=offset or None)
+        for key in ('limit', 'offset', 'marker', 'sort_key', 'sort_dir'):
+            if key in search_opts:
+                kwargs.setdefault(key, search_opts.pop(key))
+
+        try:
+            share_servers = db_api.share_server_get_all(
+                context, filters=search_opts, **kwargs)
+        except exception.InvalidInput as e:
+            raise exc.HTTPBadRequest(explanation=six.text_type(e))
         for s in share_servers:
             s.project_id = s.share_network['project_id']
             if s.share_network['name']:
                 s.share_network_name = s.share_network['name']
             else:
                 s.share_network_name = s.share_network_id
-        if search_opts:
-            for k, v in six.iteritems(search_opts):
-                share_servers = [s for s in share_servers if
-                                 (hasattr(s, k) and
-                                  s[k] == v or k == 'share_network' and
-                                  v in [s.share_network['name'],
-                                        s.share_network['id']])]
         return self._view_builder.build_share_servers(share_servers)
 
     @wsgi.serializers(xml=ShareServerTemplate)
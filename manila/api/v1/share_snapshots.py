@@ -107,6 +107,14 @@ class ShareSnapshotsController(wsgi.Controller):
         search_opts = {}
         search_opts.update(req.GET)
 
+        # Pagination and sorting params are not filters.
+        limit, offset = common.get_limit_and_offset(req)
+        for key in ('limit', 'offset'):
+            search_opts.pop(key, None)
+        marker = search_opts.pop('marker', None)
+        sort_key = search_opts.pop('sort_key', None)
+        sort_dir = search_opts.pop('sort_dir', None)
+
         # NOTE(rushiagr): v2 API allows name instead of display_name
         if 'name' in search_opts:
             search_opts['display_name'] = search_opts['name']
@@ -115,13 +123,18 @@ class ShareSnapshotsController(wsgi.Controller):
         common.remove_invalid_options(context, search_opts,
                                       self._get_snapshots_search_options())
 
-        snapshots = self.share_api.get_all_snapshots(context,
-                                                     search_opts=search_opts)
-        limited_list = common.limited(snapshots, req)
+        columns = None if is_detail else self._view_builder.summary_columns
+        try:
+            snapshots = self.share_api.get_all_snapshots(
+                context, search_opts=search_opts, sort_key=sort_key,
+                sort_dir=sort_dir, limit=limit, offset=offset or None,
+                marker=marker, columns=columns)
+        except exception.InvalidInput as e:
+            raise exc.HTTPBadRequest(explanation=six.text_type(e))
         if is_detail:
-            snapshots = self._view_builder.detail_list(req, limited_list)
+            snapshots = self._view_builder.detail_list(req, snapshots)
         else:
-            snapshots = self._view_builder.summary_list(req, limited_list)
+            snapshots = self._view_builder.summary_list(req, snapshots)
         return snapshots
 
     def _get_snapshots_search_options(self):
@@ -110,6 +110,14 @@ class ShareController(wsgi.Controller):
         search_opts = {}
         search_opts.update(req.GET)
 
+        # Pagination and sorting params are not filters.
+        limit, offset = common.get_limit_and_offset(req)
+        for key in ('limit', 'offset'):
+            search_opts.pop(key, None)
+        marker = search_opts.pop('marker', None)
+        sort_key = search_opts.pop('sort_key', None)
+        sort_dir = search_opts.pop('sort_dir', None)
+
         # NOTE(rushiagr): v2 API allows name instead of display_name
         if 'name' in search_opts:
             search_opts['display_name'] = search_opts['name']
@@ -118,14 +126,18 @@ class ShareController(wsgi.Controller):
         common.remove_invalid_options(
             context, search_opts, self._get_share_search_options())
 
-        shares = self.share_api.get_all(context, search_opts=search_opts)
-
-        limited_list = common.limited(shares, req)
+        try:
+            shares = self.share_api.get_all(
+                context, search_opts=search_opts, sort_key=sort_key,
+                sort_dir=sort_dir, limit=limit, offset=offset or None,
+                marker=marker)
+        except exception.InvalidInput as e:
+            raise exc.HTTPBadRequest(explanation=six.text_type(e))
 
         if is_detail:
-            shares = self._view_builder.detail_list(req, limited_list)
+            shares = self._view_builder.detail_list(req, shares)
         else:
-            shares = self._view_builder.summary_list(req, limited_list)
+            shares = self._view_builder.summary_list(req, shares)
         return shares
 
     def _get_share_search_options(self):
@@ -22,6 +22,8 @@ class ViewBuilder(common.ViewBuilder):
     """Model a server API response as a python dictionary."""
 
     _collection_name = 'security_services'
+    # Columns of the database rows used by summary views.
+    summary_columns = ('id', 'name', 'type', 'status')
 
     def summary_list(self, request, security_services):
         """Show a list of security services without many details."""
@@ -22,6 +22,12 @@ class ViewBuilder(common.ViewBuilder):
     """Model a server API response as a python dictionary."""
 
     _collection_name = 'share_networks'
+    # Columns of the database rows used by views.
+    summary_columns = ('id', 'name', 'status')
+    detail_columns = summary_columns + (
+        'project_id', 'created_at', 'updated_at', 'neutron_net_id',
+        'neutron_subnet_id', 'network_type', 'segmentation_id', 'cidr',
+        'ip_version', 'description')
 
     def build_share_network(self, share_network):
         """View of a share network."""
@@ -22,6 +22,8 @@ class ViewBuilder(common.ViewBuilder):
     """Model a server API response as a python dictionary."""
 
     _collection_name = 'snapshots'
+    # Columns of the database rows used by summary views.
+    summary_columns = ('id', 'display_name')
 
     def summary_list(self, request, snapshots):
         """Show a list of share snapshots without many details."""
@@ -0,0 +1,137 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of authenticated clients of other services.
+
+Creating a client of another service per call makes every call
+authenticate with keystone, when it is done with admin credentials, and
+open a new connection to the service.  Clients are therefore kept by a
+key made of the endpoint, the project and the token of a context or a
+marker of admin credentials, and reused.  Clients are dropped after
+client_cache_ttl seconds, before the tokens they hold expire, and the
+least recently used ones when there are more than client_cache_size.
+Clients are created and authenticated under a lock of their key only,
+so that a slow authentication does not delay calls with other keys.
+"""
+
+import collections
+import contextlib
+import time
+
+from eventlet import semaphore
+from oslo.config import cfg
+
+from manila.openstack.common import log as logging
+
+client_cache_opts = [
+    cfg.IntOpt('client_cache_ttl',
+               default=3000,
+               help='Seconds for which authenticated clients of other '
+                    'services are reused, it should be lower than the '
+                    'lifetime of keystone tokens. 0 disables caching.'),
+    cfg.IntOpt('client_cache_size',
+               default=100,
+               help='Maximal number of cached clients of one service.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(client_cache_opts)
+
+LOG = logging.getLogger(__name__)
+
+_caches = {}
+
+
+def get_all_stats():
+    """Returns statistics of all client caches by their names."""
+    return dict((name, cache.get_stats()) for name, cache in _caches.items())
+
+
+class ClientCache(object):
+    """Keeps authenticated clients of one service by keys."""
+
+    def __init__(self, name):
+        self.name = name
+        self._clients = collections.OrderedDict()
+        # NOTE: guards the clients and the key locks, it is never held
+        # while a client is created.
+        self._lock = semaphore.Semaphore()
+        self._key_locks = {}
+        self._stats = {'hits': 0, 'misses': 0, 'auth_calls': 0,
+                       'evictions': 0}
+        _caches[name] = self
+
+    def get(self, key, create, authenticate=None):
+        """Returns client cached by key, creates one if there is none.
+
+        :param create: function returning a new client.
+        :param authenticate: function authenticating a new client.
+        """
+        client = self._get_cached(key)
+        if client is not None:
+            return client
+        with self._key_lock(key):
+            # NOTE: another greenthread may have created it meanwhile.
+            client = self._get_cached(key)
+            if client is not None:
+                return client
+            self._stats['misses'] += 1
+            client = create()
+            if authenticate is not None:
+                self._stats['auth_calls'] += 1
+                authenticate(client)
+            if CONF.client_cache_ttl > 0:
+                with self._lock:
+                    self._clients[key] = (client, time.time())
+                    while len(self._clients) > CONF.client_cache_size:
+                        self._clients.popitem(last=False)
+                        self._stats['evictions'] += 1
+        return client
+
+    @contextlib.contextmanager
+    def _key_lock(self, key):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [semaphore.Semaphore(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _get_cached(self, key):
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is None:
+                return None
+            client, created_at = entry
+            if time.time() - created_at >= CONF.client_cache_ttl:
+                LOG.debug("Dropping expired %s client.", self.name)
+                self._stats['evictions'] += 1
+                return None
+            # NOTE: reinsertion keeps the clients ordered by their last use.
+            self._clients[key] = entry
+            self._stats['hits'] += 1
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['clients'] = len(self._clients)
+        return stats
@@ -0,0 +1,182 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Waiting for resources of other services to reach a state.
+
+Operations waiting for resources of the same kind share one poller,
+which fetches the resources due for a poll in one pass.  Delays
+between polls of a resource grow exponentially and are randomized, so
+that operations started together do not poll together forever.  States
+of resources learned from other sources, e.g. notifications, are passed
+to the waiting operations with Waiter.notify().
+"""
+
+import random
+import sys
+import time
+
+import eventlet
+from eventlet import event
+from oslo.config import cfg
+
+from manila import exception
+from manila.openstack.common import log as logging
+
+waiter_opts = [
+    cfg.IntOpt('resource_poll_interval',
+               default=1,
+               help='Seconds before the first poll of a resource of '
+                    'another service that an operation waits for.'),
+    cfg.IntOpt('resource_poll_max_interval',
+               default=10,
+               help='Maximal seconds between polls of a resource of '
+                    'another service, delays between polls double up '
+                    'to this value.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(waiter_opts)
+
+LOG = logging.getLogger(__name__)
+
+
+def backoff(initial, maximum, factor=2, jitter=0.2):
+    """Yields exponentially growing delays with random jitter.
+
+    :param jitter: maximal fraction by which a delay is changed randomly.
+    """
+    delay = initial
+    while True:
+        yield delay * random.uniform(1 - jitter, 1 + jitter)
+        delay = min(delay * factor, maximum)
+
+
+class _Wait(object):
+    """Operation waiting for a resource."""
+
+    def __init__(self, context, resource_id, check, delays):
+        self.context = context
+        self.resource_id = resource_id
+        self.check = check
+        self.delays = delays
+        self.next_poll = time.time() + next(delays)
+        self.event = event.Event()
+
+
+class Waiter(object):
+    """Waits for resources of one kind of another service.
+
+    :param name: name of the resource kind used in messages.
+    :param fetch: function taking a context and a list of resource ids
+        and returning a dict of found resources by their ids.  Resources
+        that do not exist are not in the dict.
+    """
+
+    def __init__(self, name, fetch, interval=None, max_interval=None):
+        self.name = name
+        self._fetch = fetch
+        self._interval = interval
+        self._max_interval = max_interval
+        self._waits = []
+        self._polling = False
+        self._wakeup = event.Event()
+
+    def wait(self, context, resource_id, check, timeout, resource=None):
+        """Waits until check passes for the resource and returns it.
+
+        :param check: function taking the resource, or None if it does
+            not exist, and returning True when waiting is over.  Errors
+            raised by it are raised to the caller.
+        :param resource: known state of the resource, it is checked
+            before any poll.
+        """
+        if resource is not None and check(resource):
+            return resource
+        wait = _Wait(context, resource_id, check, backoff(
+            self._interval or CONF.resource_poll_interval,
+            self._max_interval or CONF.resource_poll_max_interval))
+        self._waits.append(wait)
+        if not self._polling:
+            self._polling = True
+            eventlet.spawn_n(self._poll)
+        elif not self._wakeup.ready():
+            self._wakeup.send()
+        try:
+            with eventlet.Timeout(timeout, False):
+                return wait.event.wait()
+        finally:
+            self._remove(wait)
+        raise exception.WaitTimeout(name=self.name, id=resource_id,
+                                    timeout=timeout)
+
+    def notify(self, resource_id, resource):
+        """Passes state of a resource learned elsewhere to its waiters."""
+        for wait in list(self._waits):
+            if wait.resource_id == resource_id:
+                self._check(wait, resource)
+
+    def _remove(self, wait):
+        if wait in self._waits:
+            self._waits.remove(wait)
+
+    def _check(self, wait, resource):
+        if wait not in self._waits:
+            # NOTE: the wait timed out or was completed meanwhile.
+            return
+        try:
+            done = wait.check(resource)
+        except Exception:
+            self._remove(wait)
+            wait.event.send_exception(*sys.exc_info())
+            return
+        if done:
+            self._remove(wait)
+            wait.event.send(resource)
+
+    def _poll(self):
+        try:
+            while self._waits:
+                now = time.time()
+                groups = {}
+                for wait in self._waits:
+                    if wait.next_poll <= now:
+                        key = (wait.context.user_id, wait.context.project_id,
+                               wait.context.auth_token)
+                        groups.setdefault(key, []).append(wait)
+                for waits in groups.values():
+                    self._poll_waits(waits)
+                if not self._waits:
+                    break
+                next_poll = min(wait.next_poll for wait in self._waits)
+                with eventlet.Timeout(max(next_poll - time.time(), 0), False):
+                    self._wakeup.wait()
+                self._wakeup = event.Event()
+        finally:
+            self._polling = False
+
+    def _poll_waits(self, waits):
+        """Polls resources of waits with the same context at once."""
+        resource_ids = sorted(set(wait.resource_id for wait in waits))
+        LOG.debug("Polling %(name)s %(ids)s.",
+                  {'name': self.name, 'ids': resource_ids})
+        try:
+            resources = self._fetch(waits[0].context, resource_ids)
+        except Exception:
+            exc_info = sys.exc_info()
+            for wait in waits:
+                if wait in self._waits:
+                    self._remove(wait)
+                    wait.event.send_exception(*exc_info)
+            return
+        for wait in waits:
+            self._check(wait, resources.get(wait.resource_id))
+            wait.next_poll = time.time() + next(wait.delays)
@@ -25,6 +25,8 @@ from novaclient.v1_1.contrib import assisted_volume_snapshots
 from novaclient.v1_1 import servers as nova_servers
 from oslo.config import cfg
 
+from manila.common import client_cache
+from manila.common import waiter
 from manila.db import base
 from manila import exception
 from manila.openstack.common import log as logging
@@ -68,14 +70,19 @@ CONF.register_opts(nova_opts)
 LOG = logging.getLogger(__name__)
 
 
+_client_cache = client_cache.ClientCache('nova')
+
+
 def novaclient(context):
     if context.is_admin and context.project_id is None:
-        c = nova_client.Client(CONF.nova_admin_username,
-                               CONF.nova_admin_password,
-                               CONF.nova_admin_tenant_name,
-                               CONF.nova_admin_auth_url)
-        c.authenticate()
-        return c
+        return _client_cache.get(
+            ('admin', CONF.nova_admin_auth_url, CONF.nova_admin_username,
+             CONF.nova_admin_tenant_name),
+            lambda: nova_client.Client(CONF.nova_admin_username,
+                                       CONF.nova_admin_password,
+                                       CONF.nova_admin_tenant_name,
+                                       CONF.nova_admin_auth_url),
+            authenticate=lambda c: c.authenticate())
     compat_catalog = {
         'access': {'serviceCatalog': context.service_catalog or []}
     }
@@ -98,22 +105,26 @@ def novaclient(context):
                      service_name=service_name,
                      endpoint_type=endpoint_type)
 
-    LOG.debug('Novaclient connection created using URL: %s' % url)
-
-    extensions = [assisted_volume_snapshots]
-
-    c = nova_client.Client(context.user_id,
-                           context.auth_token,
-                           context.project_id,
-                           auth_url=url,
-                           insecure=CONF.nova_api_insecure,
-                           cacert=CONF.nova_ca_certificates_file,
-                           extensions=extensions)
-    # noauth extracts user_id:project_id from auth_token
-    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
-                                                           context.project_id)
-    c.client.management_url = url
-    return c
+    def create():
+        LOG.debug('Novaclient connection created using URL: %s' % url)
+
+        extensions = [assisted_volume_snapshots]
+
+        c = nova_client.Client(context.user_id,
+                               context.auth_token,
+                               context.project_id,
+                               auth_url=url,
+                               insecure=CONF.nova_api_insecure,
+                               cacert=CONF.nova_ca_certificates_file,
+                               extensions=extensions)
+        # noauth extracts user_id:project_id from auth_token
+        c.client.auth_token = context.auth_token or '%s:%s' % (
+            context.user_id, context.project_id)
+        c.client.management_url = url
+        return c
+    return _client_cache.get(
+        (url, context.user_id, context.project_id, context.auth_token),
+        create)
 
 
 def _untranslate_server_summary_view(server):
@@ -153,6 +164,35 @@ def translate_server_exception(method):
     return wrapper
 
 
+def _get_servers(context, instance_ids):
+    """Returns servers with given ids by their ids.
+
+    A single server is shown, several ones are taken from one listing.
+    Listings are capped by nova, so servers missing in the listing are
+    shown on their own. Servers nova reports as not found are left out,
+    other errors are raised.
+    """
+    client = novaclient(context)
+    servers = {}
+    if len(instance_ids) > 1:
+        search_opts = {'all_tenants': True} if context.is_admin else {}
+        for server in client.servers.list(True, search_opts):
+            if server.id in instance_ids:
+                servers[server.id] = _untranslate_server_summary_view(server)
+    for instance_id in instance_ids:
+        if instance_id in servers:
+            continue
+        try:
+            server = client.servers.get(instance_id)
+        except nova_exception.NotFound:
+            continue
+        servers[instance_id] = _untranslate_server_summary_view(server)
+    return servers
+
+
+_server_waiter = waiter.Waiter('Instance', _get_servers)
+
+
 class API(base.Base):
     """API for interacting with novaclient."""
 
@@ -181,6 +221,16 @@ class API(base.Base):
             novaclient(context).servers.get(instance_id)
         )
 
+    def wait_for_server(self, context, instance_id, check, timeout,
+                        server=None):
+        """Waits until check passes for the server and returns it.
+
+        check gets None when the server does not exist.  Servers waited
+        for at the same time are polled together.
+        """
+        return _server_waiter.wait(context, instance_id, check, timeout,
+                                   resource=server)
+
     def server_list(self, context, search_opts=None, all_tenants=False):
         if search_opts is None:
             search_opts = {}
@@ -256,6 +306,12 @@ class API(base.Base):
             novaclient(context).servers.update(instance_id, name=name)
         )
 
+    @translate_server_exception
+    def server_interface_attach(self, context, instance_id, port_id):
+        return novaclient(context).servers.interface_attach(instance_id,
+                                                            port_id, None,
+                                                            None)
+
     def update_server_volume(self, context, instance_id, attachment_id,
                              new_volume_id):
         novaclient(context).volumes.update_server_volume(instance_id,
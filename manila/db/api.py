@@ -217,6 +217,11 @@ def quota_usage_update(context, project_id, user_id, resource, **kwargs):
                                    **kwargs)
 
 
+def quota_usage_resync(context, project_id=None):
+    """Set tracked usages of all projects or a project to actual usages."""
+    return IMPL.quota_usage_resync(context, project_id=project_id)
+
+
 ###################
 
 
@@ -243,6 +248,17 @@ def quota_reserve(context, resources, quotas, user_quotas, deltas, expire,
                               project_id=project_id, user_id=user_id)
 
 
+def quota_reserve_optimistic(context, resources, quotas, user_quotas, deltas,
+                             expire, until_refresh, max_age, project_id=None,
+                             user_id=None, retries=3):
+    """Check quotas and create appropriate reservations without locks."""
+    return IMPL.quota_reserve_optimistic(context, resources, quotas,
+                                         user_quotas, deltas, expire,
+                                         until_refresh, max_age,
+                                         project_id=project_id,
+                                         user_id=user_id, retries=retries)
+
+
 def reservation_commit(context, reservations, project_id=None, user_id=None):
     """Commit quota reservations."""
     return IMPL.reservation_commit(context, reservations,
@@ -257,6 +273,22 @@ def reservation_rollback(context, reservations, project_id=None, user_id=None):
                                      user_id=user_id)
 
 
+def reservation_commit_optimistic(context, reservations, project_id=None,
+                                  user_id=None):
+    """Commit quota reservations without locking usages."""
+    return IMPL.reservation_commit_optimistic(context, reservations,
+                                              project_id=project_id,
+                                              user_id=user_id)
+
+
+def reservation_rollback_optimistic(context, reservations, project_id=None,
+                                    user_id=None):
+    """Roll back quota reservations without locking usages."""
+    return IMPL.reservation_rollback_optimistic(context, reservations,
+                                                project_id=project_id,
+                                                user_id=user_id)
+
+
 def quota_destroy_all_by_project_and_user(context, project_id, user_id):
     """Destroy all quotas associated with a given project and user."""
     return IMPL.quota_destroy_all_by_project_and_user(context,
@@ -268,9 +300,9 @@ def quota_destroy_all_by_project(context, project_id):
     return IMPL.quota_destroy_all_by_project(context, project_id)
 
 
-def reservation_expire(context):
-    """Roll back any expired reservations."""
-    return IMPL.reservation_expire(context)
+def reservation_expire(context, batch_size=1000):
+    """Roll back expired reservations in batches, return their number."""
+    return IMPL.reservation_expire(context, batch_size=batch_size)
 
 
 ###################
@@ -296,9 +328,12 @@ def share_get(context, share_id):
     return IMPL.share_get(context, share_id)
 
 
-def share_get_all(context):
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None):
     """Get all shares."""
-    return IMPL.share_get_all(context)
+    return IMPL.share_get_all(
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker)
 
 
 def share_get_all_by_host(context, host):
@@ -306,14 +341,22 @@ def share_get_all_by_host(context, host):
     return IMPL.share_get_all_by_host(context, host)
 
 
-def share_get_all_by_project(context, project_id):
+def share_get_all_by_project(context, project_id, filters=None,
+                             sort_key=None, sort_dir=None, limit=None,
+                             offset=None, marker=None):
     """Returns all shares with given project ID."""
-    return IMPL.share_get_all_by_project(context, project_id)
+    return IMPL.share_get_all_by_project(
+        context, project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker)
 
 
-def share_get_all_by_share_server(context, share_server_id):
+def share_get_all_by_share_server(context, share_server_id, filters=None,
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None):
     """Returns all shares with given share server."""
-    return IMPL.share_get_all_by_share_server(context, share_server_id)
+    return IMPL.share_get_all_by_share_server(
+        context, share_server_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker)
 
 
 def share_delete(context, share_id):
@@ -329,6 +372,11 @@ def share_access_create(context, values):
     return IMPL.share_access_create(context, values)
 
 
+def share_access_create_many(context, values_list):
+    """Allow many accesses to shares in a single transaction."""
+    return IMPL.share_access_create_many(context, values_list)
+
+
 def share_access_get(context, access_id):
     """Allow access to share."""
     return IMPL.share_access_get(context, access_id)
@@ -339,6 +387,11 @@ def share_access_get_all_for_share(context, share_id):
     return IMPL.share_access_get_all_for_share(context, share_id)
 
 
+def share_access_get_all_for_shares(context, share_ids):
+    """Returns access rules of all shares with given IDs."""
+    return IMPL.share_access_get_all_for_shares(context, share_ids)
+
+
 def share_access_get_all_by_type_and_access(context, share_id, access_type,
                                             access):
     """Returns share access by given type and access."""
@@ -356,6 +409,16 @@ def share_access_update(context, access_id, values):
     return IMPL.share_access_update(context, access_id, values)
 
 
+def share_access_delete_many(context, access_ids):
+    """Deny many accesses to shares by a single statement."""
+    return IMPL.share_access_delete_many(context, access_ids)
+
+
+def share_access_update_many(context, access_ids, values):
+    """Update many access records by a single statement."""
+    return IMPL.share_access_update_many(context, access_ids, values)
+
+
 ####################
 
 
@@ -379,14 +442,23 @@ def share_snapshot_get(context, snapshot_id):
     return IMPL.share_snapshot_get(context, snapshot_id)
 
 
-def share_snapshot_get_all(context):
+def share_snapshot_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                           limit=None, offset=None, marker=None, columns=None):
     """Get all snapshots."""
-    return IMPL.share_snapshot_get_all(context)
+    return IMPL.share_snapshot_get_all(
+        context, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
-def share_snapshot_get_all_by_project(context, project_id):
+def share_snapshot_get_all_by_project(context, project_id, filters=None,
+                                      sort_key=None, sort_dir=None, limit=None,
+                                      offset=None, marker=None, columns=None):
     """Get all snapshots belonging to a project."""
-    return IMPL.share_snapshot_get_all_by_project(context, project_id)
+    return IMPL.share_snapshot_get_all_by_project(
+        context, project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
 def share_snapshot_get_all_for_share(context, share_id):
@@ -430,14 +502,25 @@ def security_service_get(context, id):
     return IMPL.security_service_get(context, id)
 
 
-def security_service_get_all(context):
+def security_service_get_all(context, filters=None, sort_key=None,
+                             sort_dir=None, limit=None, offset=None,
+                             marker=None, columns=None):
     """Get all security service DB records."""
-    return IMPL.security_service_get_all(context)
+    return IMPL.security_service_get_all(
+        context, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
-def security_service_get_all_by_project(context, project_id):
+def security_service_get_all_by_project(context, project_id, filters=None,
+                                        sort_key=None, sort_dir=None,
+                                        limit=None, offset=None, marker=None,
+                                        columns=None):
     """Get all security service DB records for the given project."""
-    return IMPL.security_service_get_all_by_project(context, project_id)
+    return IMPL.security_service_get_all_by_project(
+        context, project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
 ####################
@@ -479,14 +562,23 @@ def share_network_get(context, id):
     return IMPL.share_network_get(context, id)
 
 
-def share_network_get_all(context):
+def share_network_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                          limit=None, offset=None, marker=None, columns=None):
     """Get all share network DB records."""
-    return IMPL.share_network_get_all(context)
+    return IMPL.share_network_get_all(
+        context, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
-def share_network_get_all_by_project(context, project_id):
+def share_network_get_all_by_project(context, project_id, filters=None,
+                                     sort_key=None, sort_dir=None, limit=None,
+                                     offset=None, marker=None, columns=None):
     """Get all share network DB records for the given project."""
-    return IMPL.share_network_get_all_by_project(context, project_id)
+    return IMPL.share_network_get_all_by_project(
+        context, project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
 
 
 def share_network_get_all_by_security_service(context, share_network_id):
@@ -577,9 +669,12 @@ def share_server_get_by_host_and_share_net_valid(context, host,
                                                              session=session)
 
 
-def share_server_get_all(context):
+def share_server_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                         limit=None, offset=None, marker=None):
     """Get all share server DB records."""
-    return IMPL.share_server_get_all(context)
+    return IMPL.share_server_get_all(
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker)
 
 
 def share_server_backend_details_set(context, share_server_id, server_details):
@@ -658,3 +753,18 @@ def volume_type_extra_specs_update_or_create(context,
     return IMPL.volume_type_extra_specs_update_or_create(context,
                                                          volume_type_id,
                                                          extra_specs)
+
+
+###################
+
+
+def purge_deleted_rows(context, age_in_days, batch_size=1000, dry_run=False,
+                       archive=False):
+    """Remove rows soft deleted more than age_in_days days ago.
+
+    Rows are moved to shadow tables with archive, or only counted with
+    dry_run. Returns the number of rows by table name.
+    """
+    return IMPL.purge_deleted_rows(context, age_in_days,
+                                   batch_size=batch_size, dry_run=dry_run,
+                                   archive=archive)
@@ -0,0 +1,65 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""add_indexes_for_hot_queries
+
+Revision ID: 3a482171410f
+Revises: 162a3e673105
+Create Date: 2026-10-16 21:30:12.418862
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a482171410f'
+down_revision = '162a3e673105'
+
+from alembic import op
+
+
+# NOTE: indexes lead with the columns queries filter on by equality, the
+# 'deleted' column every model_query filters on follows them.
+INDEXES = (
+    ('quota_usages_project_id_deleted_idx', 'quota_usages',
+     ['project_id', 'deleted']),
+    ('reservations_deleted_expire_idx', 'reservations',
+     ['deleted', 'expire']),
+    ('shares_host_deleted_idx', 'shares',
+     ['host', 'deleted']),
+    ('shares_project_id_deleted_idx', 'shares',
+     ['project_id', 'deleted']),
+    ('shares_share_server_id_deleted_idx', 'shares',
+     ['share_server_id', 'deleted']),
+    ('share_metadata_share_id_deleted_idx', 'share_metadata',
+     ['share_id', 'deleted']),
+    ('share_access_map_share_id_deleted_idx', 'share_access_map',
+     ['share_id', 'deleted']),
+    ('share_snapshots_share_id_deleted_idx', 'share_snapshots',
+     ['share_id', 'deleted']),
+    ('share_servers_host_share_network_id_deleted_idx', 'share_servers',
+     ['host', 'share_network_id', 'deleted']),
+    ('share_server_backend_details_share_server_id_deleted_idx',
+     'share_server_backend_details',
+     ['share_server_id', 'deleted']),
+    ('network_allocations_share_server_id_deleted_idx',
+     'network_allocations',
+     ['share_server_id', 'deleted']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
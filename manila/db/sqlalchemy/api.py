@@ -19,6 +19,7 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import datetime
 import sys
 import uuid
 import warnings
@@ -27,9 +28,14 @@ from oslo.config import cfg
 from oslo.db import exception as db_exception
 from oslo.db import options as db_options
 from oslo.db.sqlalchemy import session
+from oslo.db.sqlalchemy import utils as sqlalchemyutils
 import six
+import sqlalchemy
+from sqlalchemy import and_
 from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm import joinedload
+from sqlalchemy import sql
 from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.sql import func
 
@@ -244,50 +250,117 @@ def exact_filter(query, model, filters, legal_keys):
     return query
 
 
-def _sync_shares(context, project_id, user_id, session):
-    (shares, gigs) = share_data_get_for_project(context,
-                                                project_id,
-                                                user_id,
-                                                session=session)
-    return {'shares': shares}
-
-
-def _sync_snapshots(context, project_id, user_id, session):
-    (snapshots, gigs) = snapshot_data_get_for_project(context,
-                                                      project_id,
-                                                      user_id,
-                                                      session=session)
-    return {'snapshots': snapshots}
-
-
-def _sync_gigabytes(context, project_id, user_id, session):
-    (_junk, share_gigs) = share_data_get_for_project(context,
-                                                     project_id,
-                                                     user_id,
-                                                     session=session)
-    if CONF.no_snapshot_gb_quota:
-        return {'gigabytes': share_gigs}
-
-    (_junk, snap_gigs) = snapshot_data_get_for_project(context,
-                                                       project_id,
-                                                       user_id,
-                                                       session=session)
-    return {'gigabytes': share_gigs + snap_gigs}
-
-
-def _sync_share_networks(context, project_id, user_id, session):
-    share_networks = share_network_get_all_by_project(context,
-                                                      project_id,
-                                                      user_id,
-                                                      session=session)
-    return {'share_networks': len(share_networks)}
+def _get_list(context, query, model, filters=None, sort_key=None,
+              sort_dir=None, limit=None, offset=None, marker=None,
+              columns=None):
+    """Returns rows of a list query filtered, sorted and paginated by the DB.
+
+    :param query: query of the model to list rows of
+    :param filters: dict of column names and values to match, rows never
+        match filters by other names
+    :param sort_key: column to sort by, 'created_at' by default when the
+        list is sorted or paginated
+    :param sort_dir: 'asc' or 'desc', 'desc' by default
+    :param limit: maximum number of rows to return
+    :param offset: number of rows to skip
+    :param marker: ID of the last row of the previous page
+    :param columns: names of the only columns to load, rows are returned as
+        dicts of them instead of models
+    """
+    table_columns = model.__table__.columns
+    for key, value in six.iteritems(filters or {}):
+        if key not in table_columns:
+            return []
+        query = query.filter(getattr(model, key) == value)
+
+    if not (sort_key is None and sort_dir is None and limit is None and
+            offset is None and marker is None):
+        sort_key = sort_key or 'created_at'
+        sort_dir = sort_dir or 'desc'
+        if sort_key not in table_columns:
+            raise exception.InvalidInput(
+                reason=_("Invalid sort key %s.") % sort_key)
+        if sort_dir not in ('asc', 'desc'):
+            raise exception.InvalidInput(
+                reason=_("Invalid sort direction %s.") % sort_dir)
+        if marker is not None:
+            marker = model_query(context, model).filter_by(id=marker).first()
+            if marker is None:
+                raise exception.InvalidInput(reason=_("Marker not found."))
+
+        # NOTE: id makes the sort order unique as required by keyset
+        # pagination.
+        sort_keys = [sort_key] if sort_key == 'id' else [sort_key, 'id']
+        query = sqlalchemyutils.paginate_query(query, model, limit,
+                                               sort_keys, marker=marker,
+                                               sort_dir=sort_dir)
+        if offset:
+            query = query.offset(offset)
+
+    if columns is None:
+        return query.all()
+    query = query.with_entities(*[getattr(model, c) for c in columns])
+    return [dict(zip(columns, row)) for row in query.all()]
+
+
+def _quota_usage_counts(context, project_id=None, user_id=None,
+                        session=None):
+    """Count usages of all reservable resources with a single query.
+
+    Returns a dict of dicts of in_use values by resource name, keyed by
+    (project_id, user_id) pairs that own anything.
+    """
+    selects = []
+    for resource, model, size in (
+            ('shares', models.Share, models.Share.size),
+            ('snapshots', models.ShareSnapshot, models.ShareSnapshot.size),
+            ('share_networks', models.ShareNetwork, literal_column('0'))):
+        select = sql.select([
+            sql.literal(resource).label('resource'),
+            model.project_id.label('project_id'),
+            model.user_id.label('user_id'),
+            func.count(model.id).label('count'),
+            func.coalesce(func.sum(size), 0).label('size'),
+        ]).where(model.deleted == 'False').\
+            group_by(model.project_id, model.user_id)
+        if project_id is not None:
+            select = select.where(model.project_id == project_id)
+        if user_id is not None:
+            select = select.where(model.user_id == user_id)
+        selects.append(select)
+
+    session = session or get_session()
+    counts = {}
+    for row in session.execute(sql.union_all(*selects)):
+        usages = counts.setdefault(
+            (row.project_id, row.user_id),
+            {'shares': 0, 'snapshots': 0, 'gigabytes': 0,
+             'share_networks': 0})
+        usages[row.resource] += int(row.count)
+        if row.resource == 'shares' or (row.resource == 'snapshots' and
+                                        not CONF.no_snapshot_gb_quota):
+            usages['gigabytes'] += int(row.size)
+    return counts
+
+
+def _sync_usages(context, project_id, user_id, session):
+    # NOTE: all reservable resources are refreshed at once, quota_reserve
+    # drops the refreshed resources from its work set.
+    usages = {'shares': 0, 'snapshots': 0, 'gigabytes': 0,
+              'share_networks': 0}
+    counts = _quota_usage_counts(context, project_id, user_id,
+                                 session=session)
+    for user_usages in counts.values():
+        for resource, in_use in user_usages.items():
+            usages[resource] += in_use
+    return usages
 
 
 QUOTA_SYNC_FUNCTIONS = {
-    '_sync_shares': _sync_shares,
-    '_sync_snapshots': _sync_snapshots,
-    '_sync_gigabytes': _sync_gigabytes,
-    '_sync_share_networks': _sync_share_networks,
+    '_sync_shares': _sync_usages,
+    '_sync_snapshots': _sync_usages,
+    '_sync_gigabytes': _sync_usages,
+    '_sync_share_networks': _sync_usages,
 }
 
 
@@ -689,6 +762,60 @@ def quota_usage_update(context, project_id, user_id, resource, **kwargs):
         raise exception.QuotaUsageNotFound(project_id=project_id)
 
 
+@require_admin_context
+def quota_usage_resync(context, project_id=None):
+    """Set in_use of tracked usages to the actual usages.
+
+    Usages of all projects, or of the given one, are locked and compared
+    with actual usages counted with a single query. Returns the list of
+    usages that were out of sync, with their tracked and actual in_use.
+    """
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.QuotaUsage, read_deleted="no",
+                            session=session)
+        if project_id is not None:
+            query = query.filter_by(project_id=project_id)
+        usages = query.with_lockmode('update').all()
+
+        counts = _quota_usage_counts(context, project_id=project_id,
+                                     session=session)
+        project_counts = {}
+        for (usage_project_id, _user_id), user_counts in counts.items():
+            totals = project_counts.setdefault(usage_project_id, {})
+            for resource, in_use in user_counts.items():
+                totals[resource] = totals.get(resource, 0) + in_use
+
+        resynced = []
+        for usage in usages:
+            if usage.user_id is None:
+                actual = project_counts.get(usage.project_id, {})
+            else:
+                actual = counts.get((usage.project_id, usage.user_id), {})
+            in_use = actual.get(usage.resource, 0)
+            if usage.in_use == in_use:
+                continue
+            LOG.info(_('quota_usages out of sync, updating. '
+                       'project_id: %(project_id)s, '
+                       'user_id: %(user_id)s, '
+                       'resource: %(res)s, '
+                       'tracked usage: %(tracked_use)s, '
+                       'actual usage: %(in_use)s'),
+                     {'project_id': usage.project_id,
+                      'user_id': usage.user_id,
+                      'res': usage.resource,
+                      'tracked_use': usage.in_use,
+                      'in_use': in_use})
+            resynced.append({'project_id': usage.project_id,
+                             'user_id': usage.user_id,
+                             'resource': usage.resource,
+                             'tracked_use': usage.in_use,
+                             'in_use': in_use})
+            usage.in_use = in_use
+            usage.save(session=session)
+    return resynced
+
+
 ###################
 
 
@@ -960,6 +1087,237 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
     return reservations
 
 
+class _QuotaUsageChanged(Exception):
+    """Usages changed concurrently while reserving optimistically."""
+
+
+def _quota_usages_total(context, session, project_id, resources):
+    rows = model_query(context, models.QuotaUsage, read_deleted="no",
+                       session=session).\
+        filter_by(project_id=project_id).\
+        filter(models.QuotaUsage.resource.in_(resources)).\
+        group_by(models.QuotaUsage.resource).\
+        with_entities(models.QuotaUsage.resource,
+                      func.sum(models.QuotaUsage.in_use),
+                      func.sum(models.QuotaUsage.reserved)).\
+        all()
+    return dict((resource, dict(in_use=in_use or 0, reserved=reserved or 0,
+                                total=(in_use or 0) + (reserved or 0)))
+                for resource, in_use, reserved in rows)
+
+
+def _quota_reserve_optimistic(context, project_quotas, user_quotas, deltas,
+                              expire, max_age, project_id, user_id):
+    """Make one attempt of an optimistic reservation.
+
+    Returns None if usages have to be created or refreshed first.
+    """
+    elevated = context.elevated()
+    session = get_session()
+    with session.begin():
+        rows = model_query(context, models.QuotaUsage, read_deleted="no",
+                           session=session).\
+            filter_by(project_id=project_id).\
+            filter(models.QuotaUsage.resource.in_(deltas.keys())).\
+            all()
+        user_usages = {}
+        for row in rows:
+            if row.resource in PER_PROJECT_QUOTAS:
+                if row.user_id is None:
+                    user_usages[row.resource] = row
+            elif row.user_id == user_id:
+                user_usages[row.resource] = row
+
+        # NOTE: guarded increments serialize reservations of one user
+        # only, so projects with usages of several users are reserved
+        # for under locks.
+        if any(row.user_id != user_id for row in rows
+               if row.resource not in PER_PROJECT_QUOTAS):
+            return None
+
+        # NOTE: usages are created and refreshed only under locks.
+        for resource in deltas:
+            usage = user_usages.get(resource)
+            if (usage is None or usage.in_use < 0 or
+                    (usage.until_refresh is not None and
+                     usage.until_refresh <= 1) or
+                    (max_age and (usage.updated_at -
+                                  timeutils.utcnow()).seconds >= max_age)):
+                return None
+
+        project_usages = _quota_usages_total(context, session, project_id,
+                                             deltas.keys())
+        unders = [res for res, delta in deltas.items()
+                  if delta < 0 and
+                  delta + user_usages[res].in_use < 0]
+        overs = [res for res, delta in deltas.items()
+                 if user_quotas[res] >= 0 and delta >= 0 and
+                 (project_quotas[res] < delta +
+                  project_usages[res]['total'] or
+                  user_quotas[res] < delta +
+                  user_usages[res].total)]
+        if overs:
+            if project_quotas == user_quotas:
+                usages = project_usages
+            else:
+                usages = user_usages
+            usages = dict((k, dict(in_use=v['in_use'], reserved=v['reserved']))
+                          for k, v in usages.items())
+            raise exception.OverQuota(overs=sorted(overs), quotas=user_quotas,
+                                      usages=usages)
+
+        # NOTE: usages are updated in order of their ids, like they are
+        # locked everywhere else.
+        for res in sorted(deltas, key=lambda res: user_usages[res].id):
+            delta = deltas[res]
+            usage = user_usages[res]
+            updates = {}
+            if delta > 0:
+                updates['reserved'] = models.QuotaUsage.reserved + delta
+            if usage.until_refresh is not None:
+                updates['until_refresh'] = models.QuotaUsage.until_refresh - 1
+            if not updates:
+                continue
+            query = model_query(context, models.QuotaUsage, read_deleted="no",
+                                session=session).\
+                filter_by(id=usage.id)
+            if delta > 0 and user_quotas[res] >= 0:
+                # NOTE: the guarded increment is the compare-and-swap, it
+                # fails only if concurrent reservations took the room.
+                # The usage is the only one of the resource in the
+                # project, so it is checked against both limits.
+                limit = user_quotas[res]
+                if project_quotas[res] >= 0:
+                    limit = min(limit, project_quotas[res])
+                query = query.filter(models.QuotaUsage.in_use +
+                                     models.QuotaUsage.reserved + delta <=
+                                     limit)
+            if not query.update(updates, synchronize_session=False):
+                raise _QuotaUsageChanged()
+
+        # NOTE: other users may have created usages since they were read,
+        # only a locking read sees them before their transactions end.
+        per_user = [res for res in deltas if res not in PER_PROJECT_QUOTAS]
+        if per_user and model_query(context, models.QuotaUsage,
+                                    read_deleted="no", session=session).\
+                filter_by(project_id=project_id).\
+                filter(models.QuotaUsage.resource.in_(per_user)).\
+                filter(models.QuotaUsage.user_id != user_id).\
+                with_lockmode('update').\
+                with_entities(models.QuotaUsage.id).\
+                first():
+            raise _QuotaUsageChanged()
+
+        reservations = []
+        for res, delta in deltas.items():
+            reservation = _reservation_create(elevated,
+                                              str(uuid.uuid4()),
+                                              user_usages[res],
+                                              project_id,
+                                              user_id,
+                                              res, delta, expire,
+                                              session=session)
+            reservations.append(reservation.uuid)
+
+    if unders:
+        LOG.warning(_("Change will make usage less than 0 for the following "
+                      "resources: %s"), unders)
+    return reservations
+
+
+@require_context
+def quota_reserve_optimistic(context, resources, project_quotas, user_quotas,
+                             deltas, expire, until_refresh, max_age,
+                             project_id=None, user_id=None, retries=3):
+    """Reserve resources without locking usages of the project.
+
+    Only usages of the reserved resources are touched, reserved amounts
+    are increased with updates guarded by the quota limit. An attempt
+    that loses a race is rolled back and retried up to `retries` times,
+    after that, whenever usages have to be created or refreshed, and for
+    projects with usages of several users, quota_reserve is used.
+    """
+    if project_id is None:
+        project_id = context.project_id
+    if user_id is None:
+        user_id = context.user_id
+
+    for attempt in range(retries + 1):
+        try:
+            reservations = _quota_reserve_optimistic(
+                context, project_quotas, user_quotas, deltas, expire,
+                max_age, project_id, user_id)
+        except (_QuotaUsageChanged, db_exception.DBDeadlock):
+            LOG.debug('Quota usages of project %(project_id)s changed '
+                      'concurrently, attempt %(attempt)s.',
+                      {'project_id': project_id, 'attempt': attempt + 1})
+            continue
+        if reservations is not None:
+            return reservations
+        break
+
+    return quota_reserve(context, resources, project_quotas, user_quotas,
+                         deltas, expire, until_refresh, max_age,
+                         project_id=project_id, user_id=user_id)
+
+
+def _reservations_finish_optimistic(context, reservations, commit):
+    session = get_session()
+    with session.begin():
+        found = model_query(context, models.Reservation, read_deleted="no",
+                            session=session).\
+            filter(models.Reservation.uuid.in_(reservations)).\
+            all()
+        if not found:
+            return
+        # NOTE: usages are locked before reservations, like everywhere
+        # else, so that finishing reservations does not deadlock with
+        # their expiry.
+        model_query(context, models.QuotaUsage, read_deleted="no",
+                    session=session).\
+            filter(models.QuotaUsage.id.in_(
+                sorted(set(reservation.usage_id for reservation in found)))).\
+            order_by(models.QuotaUsage.id).\
+            with_lockmode('update').\
+            all()
+        for reservation in found:
+            # NOTE: only the transaction which deletes the reservation
+            # applies it, so it is never applied twice.
+            deleted = model_query(context, models.Reservation,
+                                  read_deleted="no", session=session).\
+                filter_by(id=reservation.id).\
+                update({'deleted': True,
+                        'deleted_at': timeutils.utcnow(),
+                        'updated_at': literal_column('updated_at')},
+                       synchronize_session=False)
+            if not deleted:
+                continue
+            updates = {}
+            if reservation.delta >= 0:
+                updates['reserved'] = (models.QuotaUsage.reserved -
+                                       reservation.delta)
+            if commit:
+                updates['in_use'] = (models.QuotaUsage.in_use +
+                                     reservation.delta)
+            if updates:
+                model_query(context, models.QuotaUsage, read_deleted="no",
+                            session=session).\
+                    filter_by(id=reservation.usage_id).\
+                    update(updates, synchronize_session=False)
+
+
+@require_context
+def reservation_commit_optimistic(context, reservations, project_id=None,
+                                  user_id=None):
+    _reservations_finish_optimistic(context, reservations, commit=True)
+
+
+@require_context
+def reservation_rollback_optimistic(context, reservations, project_id=None,
+                                    user_id=None):
+    _reservations_finish_optimistic(context, reservations, commit=False)
+
+
 def _quota_reservations_query(session, context, reservations):
     """Return the relevant reservations."""
 
@@ -1075,24 +1433,81 @@ def quota_destroy_all_by_project(context, project_id):
                    synchronize_session=False)
 
 
-@require_admin_context
-def reservation_expire(context):
+def _reservation_expire_batch(context, batch_size):
     session = get_session()
     with session.begin():
         current_time = timeutils.utcnow()
-        reservation_query = model_query(context, models.Reservation,
-                                        session=session, read_deleted="no").\
-            filter(models.Reservation.expire < current_time)
+        candidates = model_query(context, models.Reservation,
+                                 read_deleted="no", session=session).\
+            filter(models.Reservation.expire < current_time).\
+            order_by(models.Reservation.id).\
+            limit(batch_size).\
+            with_entities(models.Reservation.id,
+                          models.Reservation.usage_id).\
+            all()
+        if not candidates:
+            return 0, 0
+
+        # NOTE: usages are locked before reservations, like everywhere
+        # else, then reservations are read again as concurrent commits
+        # and rollbacks may have deleted some of them meanwhile.
+        usage_ids = sorted(set(row.usage_id for row in candidates))
+        model_query(context, models.QuotaUsage, read_deleted="no",
+                    session=session).\
+            filter(models.QuotaUsage.id.in_(usage_ids)).\
+            order_by(models.QuotaUsage.id).\
+            with_lockmode('update').\
+            all()
+        reservations = model_query(context, models.Reservation,
+                                   read_deleted="no", session=session).\
+            filter(models.Reservation.id.in_(
+                [row.id for row in candidates])).\
+            filter(models.Reservation.expire < current_time).\
+            with_lockmode('update').\
+            with_entities(models.Reservation.id,
+                          models.Reservation.usage_id,
+                          models.Reservation.delta).\
+            all()
 
-        for reservation in reservation_query.join(models.QuotaUsage).all():
+        reserved = {}
+        for reservation in reservations:
             if reservation.delta >= 0:
-                reservation.usage.reserved -= reservation.delta
-                session.add(reservation.usage)
+                reserved[reservation.usage_id] = (
+                    reserved.get(reservation.usage_id, 0) + reservation.delta)
+        for usage_id, delta in reserved.items():
+            model_query(context, models.QuotaUsage, read_deleted="no",
+                        session=session).\
+                filter_by(id=usage_id).\
+                update({'reserved': models.QuotaUsage.reserved - delta},
+                       synchronize_session=False)
 
-        reservation_query.update({'deleted': True,
-                                  'deleted_at': timeutils.utcnow(),
-                                  'updated_at': literal_column('updated_at')},
-                                 synchronize_session=False)
+        if reservations:
+            model_query(context, models.Reservation, read_deleted="no",
+                        session=session).\
+                filter(models.Reservation.id.in_(
+                    [reservation.id for reservation in reservations])).\
+                update({'deleted': True,
+                        'deleted_at': timeutils.utcnow(),
+                        'updated_at': literal_column('updated_at')},
+                       synchronize_session=False)
+    return len(candidates), len(reservations)
+
+
+@require_admin_context
+def reservation_expire(context, batch_size=1000):
+    """Roll back expired reservations.
+
+    Reservations are processed in transactions of at most batch_size
+    reservations, reserved amounts of each usage are decreased with a
+    single update per transaction. Returns the number of rolled back
+    reservations.
+    """
+    expired = 0
+    while True:
+        found, rolled_back = _reservation_expire_batch(context, batch_size)
+        expired += rolled_back
+        if found < batch_size:
+            return expired
 
 
 ################
@@ -1166,9 +1581,22 @@ def share_get(context, share_id, session=None):
     return result
 
 
+def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
+                                **kwargs):
+    query = _share_get_query(context)
+    if project_id is not None:
+        query = query.filter_by(project_id=project_id)
+    if share_server_id is not None:
+        query = query.filter_by(share_server_id=share_server_id)
+    return _get_list(context, query, models.Share, **kwargs)
+
+
 @require_admin_context
-def share_get_all(context):
-    return _share_get_query(context).all()
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None):
+    return _share_get_all_with_filters(
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker)
 
 
 @require_admin_context
@@ -1178,16 +1606,24 @@ def share_get_all_by_host(context, host):
 
 
 @require_context
-def share_get_all_by_project(context, project_id):
+def share_get_all_by_project(context, project_id, filters=None,
+                             sort_key=None, sort_dir=None, limit=None,
+                             offset=None, marker=None):
     """Returns list of shares with given project ID."""
-    return _share_get_query(context).filter_by(project_id=project_id).all()
+    return _share_get_all_with_filters(
+        context, project_id=project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker)
 
 
 @require_context
-def share_get_all_by_share_server(context, share_server_id):
+def share_get_all_by_share_server(context, share_server_id, filters=None,
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None):
     """Returns list of shares with given share server."""
-    return _share_get_query(context).filter_by(
-        share_server_id=share_server_id).all()
+    return _share_get_all_with_filters(
+        context, share_server_id=share_server_id, filters=filters,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker)
 
 
 @require_context
@@ -1228,6 +1664,22 @@ def share_access_create(context, values):
         return access_ref
 
 
+@require_context
+def share_access_create_many(context, values_list):
+    """Create access records in a single transaction."""
+    session = get_session()
+    access_refs = []
+    with session.begin():
+        for values in values_list:
+            access_ref = models.ShareAccessMapping()
+            if not values.get('id'):
+                values['id'] = str(uuid.uuid4())
+            access_ref.update(values)
+            access_refs.append(access_ref)
+        session.add_all(access_refs)
+    return access_refs
+
+
 @require_context
 def share_access_get(context, access_id):
     """Get access record."""
@@ -1247,6 +1699,17 @@ def share_access_get_all_for_share(context, share_id):
                                    {'share_id': share_id}).all()
 
 
+@require_context
+def share_access_get_all_for_shares(context, share_ids):
+    """Returns access rules of all shares with given IDs."""
+    if not share_ids:
+        return []
+    session = get_session()
+    return _share_access_get_query(context, session, {}).\
+        filter(models.ShareAccessMapping.share_id.in_(share_ids)).\
+        all()
+
+
 @require_context
 def share_access_get_all_by_type_and_access(context, share_id, access_type,
                                             access):
@@ -1280,6 +1743,37 @@ def share_access_update(context, access_id, values):
         return access
 
 
+@require_context
+def share_access_delete_many(context, access_ids):
+    """Delete access records with given IDs by a single statement."""
+    if not access_ids:
+        return
+    session = get_session()
+    with session.begin():
+        session.query(models.ShareAccessMapping).\
+            filter(models.ShareAccessMapping.id.in_(access_ids)).\
+            update({'deleted': True,
+                    'deleted_at': timeutils.utcnow(),
+                    'updated_at': literal_column('updated_at'),
+                    'state': models.ShareAccessMapping.STATE_DELETED},
+                   synchronize_session=False)
+
+
+@require_context
+def share_access_update_many(context, access_ids, values):
+    """Update access records with given IDs by a single statement.
+
+    Returns the number of updated access records.
+    """
+    if not access_ids:
+        return 0
+    session = get_session()
+    with session.begin():
+        return _share_access_get_query(context, session, {}).\
+            filter(models.ShareAccessMapping.id.in_(access_ids)).\
+            update(values, synchronize_session=False)
+
+
 ###################
 
 
@@ -1342,19 +1836,35 @@ def share_snapshot_get(context, snapshot_id, session=None):
 
 
 @require_admin_context
-def share_snapshot_get_all(context):
-    return model_query(context, models.ShareSnapshot).\
-        options(joinedload('share')).\
-        all()
+def share_snapshot_get_all(context, filters=None, sort_key=None,
+                           sort_dir=None, limit=None, offset=None,
+                           marker=None, columns=None):
+    return _share_snapshot_get_all_with_filters(
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker, columns=columns)
 
 
 @require_context
-def share_snapshot_get_all_by_project(context, project_id):
+def share_snapshot_get_all_by_project(context, project_id, filters=None,
+                                      sort_key=None, sort_dir=None,
+                                      limit=None, offset=None, marker=None,
+                                      columns=None):
     authorize_project_context(context, project_id)
-    return model_query(context, models.ShareSnapshot).\
-        filter_by(project_id=project_id).\
-        options(joinedload('share')).\
-        all()
+    return _share_snapshot_get_all_with_filters(
+        context, project_id=project_id, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        columns=columns)
+
+
+def _share_snapshot_get_all_with_filters(context, project_id=None,
+                                         columns=None, **kwargs):
+    query = model_query(context, models.ShareSnapshot)
+    if columns is None:
+        query = query.options(joinedload('share'))
+    if project_id is not None:
+        query = query.filter_by(project_id=project_id)
+    return _get_list(context, query, models.ShareSnapshot, columns=columns,
+                     **kwargs)
 
 
 @require_context
@@ -1440,56 +1950,50 @@ def _share_metadata_get(context, share_id, session=None):
 @require_context
 @require_share_exists
 def _share_metadata_update(context, share_id, metadata, delete, session=None):
+    """Update metadata of a share with at most one statement per kind.
+
+    Removed keys are deleted by one update, changed values are set by one
+    update and new keys are inserted by one executemany insert.
+    """
     if not session:
         session = get_session()
 
     with session.begin():
+        query = model_query(context, models.ShareMetadata, session=session,
+                            read_deleted="no").\
+            filter_by(share_id=share_id)
+        original_metadata = dict(query.with_entities(
+            models.ShareMetadata.key, models.ShareMetadata.value).all())
+
         # Set existing metadata to deleted if delete argument is True
         if delete:
-            original_metadata = _share_metadata_get(context, share_id,
-                                                    session=session)
-            for meta_key, meta_value in six.iteritems(original_metadata):
-                if meta_key not in metadata:
-                    meta_ref = _share_metadata_get_item(context, share_id,
-                                                        meta_key,
-                                                        session=session)
-                    meta_ref.update({'deleted': True})
-                    meta_ref.save(session=session)
-
-        meta_ref = None
-
-        # Now update all existing items with new values, or create new meta
-        # objects
-        for meta_key, meta_value in metadata.items():
-
-            # update the value whether it exists or not
-            item = {"value": meta_value}
-
-            try:
-                meta_ref = _share_metadata_get_item(context, share_id,
-                                                    meta_key,
-                                                    session=session)
-            except exception.ShareMetadataNotFound:
-                meta_ref = models.ShareMetadata()
-                item.update({"key": meta_key, "share_id": share_id})
-
-            meta_ref.update(item)
-            meta_ref.save(session=session)
+            deleted_keys = [key for key in original_metadata
+                            if key not in metadata]
+            if deleted_keys:
+                query.filter(models.ShareMetadata.key.in_(deleted_keys)).\
+                    update({'deleted': True,
+                            'deleted_at': timeutils.utcnow(),
+                            'updated_at': literal_column('updated_at')},
+                           synchronize_session=False)
+
+        changed = dict((key, value) for key, value in metadata.items()
+                       if key in original_metadata and
+                       original_metadata[key] != value)
+        if changed:
+            query.filter(models.ShareMetadata.key.in_(list(changed))).\
+                update({'value': sql.case(changed,
+                                          value=models.ShareMetadata.key)},
+                       synchronize_session=False)
+
+        created = [{'share_id': share_id, 'key': key, 'value': value}
+                   for key, value in metadata.items()
+                   if key not in original_metadata]
+        if created:
+            session.execute(models.ShareMetadata.__table__.insert(), created)
 
         return metadata
 
 
-def _share_metadata_get_item(context, share_id, key, session=None):
-    result = _share_metadata_get_query(context, share_id, session=session).\
-        filter_by(key=key).\
-        first()
-
-    if not result:
-        raise exception.ShareMetadataNotFound(metadata_key=key,
-                                              share_id=share_id)
-    return result
-
-
 @require_context
 def security_service_create(context, values):
     if not values.get('id'):
@@ -1538,14 +2042,25 @@ def security_service_get(context, id, session=None):
 
 
 @require_context
-def security_service_get_all(context):
-    return _security_service_get_query(context).all()
+def security_service_get_all(context, filters=None, sort_key=None,
+                             sort_dir=None, limit=None, offset=None,
+                             marker=None, columns=None):
+    return _get_list(context, _security_service_get_query(context),
+                     models.SecurityService, filters=filters,
+                     sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+                     offset=offset, marker=marker, columns=columns)
 
 
 @require_context
-def security_service_get_all_by_project(context, project_id):
-    return _security_service_get_query(context).\
-        filter_by(project_id=project_id).all()
+def security_service_get_all_by_project(context, project_id, filters=None,
+                                        sort_key=None, sort_dir=None,
+                                        limit=None, offset=None, marker=None,
+                                        columns=None):
+    query = _security_service_get_query(context).filter_by(
+        project_id=project_id)
+    return _get_list(context, query, models.SecurityService, filters=filters,
+                     sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+                     offset=offset, marker=marker, columns=columns)
 
 
 def _security_service_get_query(context, session=None):
@@ -1606,18 +2121,40 @@ def share_network_get(context, id, session=None):
 
 
 @require_context
-def share_network_get_all(context):
-    return _network_get_query(context).all()
+def share_network_get_all(context, filters=None, sort_key=None,
+                          sort_dir=None, limit=None, offset=None,
+                          marker=None, columns=None):
+    return _share_network_get_all_with_filters(
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker, columns=columns)
 
 
 @require_context
 def share_network_get_all_by_project(context, project_id, user_id=None,
-                                     session=None):
-    query = _network_get_query(context, session)
-    query = query.filter_by(project_id=project_id)
+                                     session=None, filters=None,
+                                     sort_key=None, sort_dir=None,
+                                     limit=None, offset=None, marker=None,
+                                     columns=None):
+    return _share_network_get_all_with_filters(
+        context, project_id=project_id, user_id=user_id, session=session,
+        filters=filters, sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+        offset=offset, marker=marker, columns=columns)
+
+
+def _share_network_get_all_with_filters(context, project_id=None,
+                                        user_id=None, session=None,
+                                        columns=None, **kwargs):
+    if columns is None:
+        query = _network_get_query(context, session)
+    else:
+        # Related objects are not needed without models.
+        query = model_query(context, models.ShareNetwork, session=session)
+    if project_id is not None:
+        query = query.filter_by(project_id=project_id)
     if user_id is not None:
         query = query.filter_by(user_id=user_id)
-    return query.all()
+    return _get_list(context, query, models.ShareNetwork, columns=columns,
+                     **kwargs)
 
 
 @require_context
@@ -1754,8 +2291,35 @@ def share_server_get_by_host_and_share_net_valid(context, host, share_net_id,
 
 
 @require_context
-def share_server_get_all(context):
-    return _server_get_query(context).all()
+def share_server_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                         limit=None, offset=None, marker=None):
+    """Returns share servers with their share networks loaded by one query.
+
+    Besides share server columns, filters may contain 'project_id' of the
+    share network of servers, 'share_network' to match its name or ID and
+    'share_network_name' to match its name or, for unnamed share networks,
+    its ID. Related shares and network allocations are not loaded eagerly.
+    """
+    network = models.ShareNetwork
+    query = model_query(context, models.ShareServer).\
+        outerjoin(models.ShareServer.share_network).\
+        options(contains_eager('share_network'))
+
+    filters = dict(filters or {})
+    if 'project_id' in filters:
+        query = query.filter(network.project_id == filters.pop('project_id'))
+    if 'share_network' in filters:
+        value = filters.pop('share_network')
+        query = query.filter(or_(network.name == value, network.id == value))
+    if 'share_network_name' in filters:
+        value = filters.pop('share_network_name')
+        query = query.filter(or_(
+            network.name == value,
+            and_(or_(network.name == None, network.name == ''),  # noqa
+                 models.ShareServer.share_network_id == value)))
+    return _get_list(context, query, models.ShareServer, filters=filters,
+                     sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+                     offset=offset, marker=marker)
 
 
 @require_context
@@ -2068,3 +2632,156 @@ def volume_type_extra_specs_update_or_create(context, volume_type_id,
             spec_ref.save(session=session)
 
         return specs
+
+
+####################
+
+
+# NOTE: dependencies which are not declared as foreign keys.
+_PURGE_EXTRA_DEPENDENCIES = [
+    ('share_snapshots', 'share_id', 'shares', 'id'),
+]
+
+_SHADOW_TABLE_PREFIX = 'shadow_'
+_SHADOW_METADATA = sqlalchemy.MetaData()
+
+
+def _purge_dependencies(tables):
+    """Return (child, child column, parent column) tuples by parent."""
+    dependencies = dict((table.name, []) for table in tables)
+    for table in tables:
+        for fk in table.foreign_keys:
+            dependencies[fk.column.table.name].append(
+                (table, fk.parent, fk.column))
+    by_name = dict((table.name, table) for table in tables)
+    for child, child_column, parent, parent_column in (
+            _PURGE_EXTRA_DEPENDENCIES):
+        dependencies[parent].append(
+            (by_name[child], by_name[child].c[child_column],
+             by_name[parent].c[parent_column]))
+    return dependencies
+
+
+def _purge_order(tables, dependencies):
+    """Order tables so that children come before their parents."""
+    order = []
+
+    def visit(table):
+        if table in order:
+            return
+        for child, _child_column, _parent_column in dependencies[table.name]:
+            if child is not table:
+                visit(child)
+        order.append(table)
+
+    for table in tables:
+        visit(table)
+    return order
+
+
+def _purgeable(table, cutoff):
+    return sql.and_(table.c.deleted != table.c.deleted.default.arg,
+                    table.c.deleted_at < cutoff)
+
+
+def _purge_condition(table, dependencies, cutoff, transitive):
+    """Return condition of rows of the table which are removed.
+
+    Children are removed before their parents, so a row is removed when
+    no row of its children remains. Nothing is removed with transitive,
+    rows are then kept while children which are kept reference them.
+    """
+    condition = _purgeable(table, cutoff)
+    for child, child_column, parent_column in dependencies[table.name]:
+        referenced = child_column == parent_column
+        if transitive:
+            referenced = sql.and_(referenced, ~_purge_condition(
+                child, dependencies, cutoff, transitive))
+        condition = sql.and_(condition, ~sql.exists().where(referenced))
+    return condition
+
+
+def _get_shadow_table(table):
+    """Return table archived rows of the table are moved to.
+
+    Shadow tables are not created by migrations, columns which were
+    added to the table after its shadow table was created are added to
+    the shadow table here.
+    """
+    name = _SHADOW_TABLE_PREFIX + table.name
+    if name not in _SHADOW_METADATA.tables:
+        # NOTE: no keys, ids of archived rows may get reused.
+        sqlalchemy.Table(name, _SHADOW_METADATA,
+                         *[sqlalchemy.Column(column.name, column.type)
+                           for column in table.columns],
+                         mysql_engine='InnoDB')
+    shadow = _SHADOW_METADATA.tables[name]
+    engine = get_engine()
+    inspector = sqlalchemy.inspect(engine)
+    if name not in inspector.get_table_names():
+        shadow.create(engine)
+        return shadow
+    existing = set(column['name'] for column in inspector.get_columns(name))
+    for column in shadow.columns:
+        if column.name not in existing:
+            LOG.info(_('Adding column %(column)s to table %(table)s.'),
+                     {'column': column.name, 'table': name})
+            engine.execute('ALTER TABLE %s ADD COLUMN %s' % (
+                name, sqlalchemy.schema.CreateColumn(column).compile(
+                    dialect=engine.dialect)))
+    return shadow
+
+
+@require_admin_context
+def purge_deleted_rows(context, age_in_days, batch_size=1000, dry_run=False,
+                       archive=False):
+    """Remove soft deleted rows deleted more than age_in_days days ago.
+
+    Tables are processed children first. A row is kept while rows of
+    other tables which are kept reference it. Rows are removed in
+    transactions of at most batch_size rows. Returns the number of rows
+    removed, or only counted with dry_run, by table name.
+    """
+    cutoff = timeutils.utcnow() - datetime.timedelta(days=age_in_days)
+    # NOTE: models may define tables which migrations do not create.
+    existing = set(sqlalchemy.inspect(get_engine()).get_table_names())
+    tables = [table for table in models.BASE.metadata.sorted_tables
+              if table.name in existing and
+              'deleted' in table.c and 'deleted_at' in table.c]
+    dependencies = _purge_dependencies(tables)
+    session = get_session()
+    counts = {}
+    for table in _purge_order(tables, dependencies):
+        condition = _purge_condition(table, dependencies, cutoff, dry_run)
+
+        if dry_run:
+            counts[table.name] = session.execute(
+                sql.select([func.count()]).select_from(table).
+                where(condition)).scalar()
+            continue
+
+        shadow = _get_shadow_table(table) if archive else None
+        counts[table.name] = 0
+        while True:
+            with session.begin():
+                ids = [row[0] for row in session.execute(
+                    sql.select([table.c.id]).where(condition).
+                    limit(batch_size))]
+                if not ids:
+                    break
+                if shadow is not None:
+                    session.execute(shadow.insert().from_select(
+                        [column.name for column in table.columns],
+                        sql.select(list(table.columns)).where(
+                            table.c.id.in_(ids))))
+                session.execute(table.delete().where(table.c.id.in_(ids)))
+            counts[table.name] += len(ids)
+            if len(ids) < batch_size:
+                break
+        if counts[table.name] and archive:
+            LOG.info(_('Archived %(count)s deleted rows of table %(table)s.'),
+                     {'count': counts[table.name], 'table': table.name})
+        elif counts[table.name]:
+            LOG.info(_('Purged %(count)s deleted rows of table %(table)s.'),
+                     {'count': counts[table.name], 'table': table.name})
+    return counts
@@ -26,7 +26,7 @@ from oslo.db.sqlalchemy import models
 import six
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import ForeignKey, DateTime, Boolean, Enum
+from sqlalchemy import ForeignKey, DateTime, Boolean, Enum, Index
 from sqlalchemy.orm import relationship, backref
 
 from manila.common import constants
@@ -131,6 +131,10 @@ class QuotaUsage(BASE, ManilaBase):
     """Represents the current usage for a given resource."""
 
     __tablename__ = 'quota_usages'
+    __table_args__ = (
+        Index('quota_usages_project_id_deleted_idx', 'project_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(Integer, primary_key=True)
 
     project_id = Column(String(255), index=True)
@@ -151,6 +155,10 @@ class Reservation(BASE, ManilaBase):
     """Represents a resource reservation for quotas."""
 
     __tablename__ = 'reservations'
+    __table_args__ = (
+        Index('reservations_deleted_expire_idx', 'deleted', 'expire'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36), nullable=False)
 
@@ -173,6 +181,13 @@ class Reservation(BASE, ManilaBase):
 class Share(BASE, ManilaBase):
     """Represents an NFS and CIFS shares."""
     __tablename__ = 'shares'
+    __table_args__ = (
+        Index('shares_host_deleted_idx', 'host', 'deleted'),
+        Index('shares_project_id_deleted_idx', 'project_id', 'deleted'),
+        Index('shares_share_server_id_deleted_idx',
+              'share_server_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
 
     @property
     def name(self):
@@ -237,6 +252,10 @@ class VolumeTypeExtraSpecs(BASE, ManilaBase):
 class ShareMetadata(BASE, ManilaBase):
     """Represents a metadata key/value pair for a share."""
     __tablename__ = 'share_metadata'
+    __table_args__ = (
+        Index('share_metadata_share_id_deleted_idx', 'share_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(Integer, primary_key=True)
     key = Column(String(255), nullable=False)
     value = Column(String(1023), nullable=False)
@@ -257,6 +276,10 @@ class ShareAccessMapping(BASE, ManilaBase):
     STATE_ERROR = 'error'
 
     __tablename__ = 'share_access_map'
+    __table_args__ = (
+        Index('share_access_map_share_id_deleted_idx', 'share_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(String(36), primary_key=True)
     deleted = Column(String(36), default='False')
     share_id = Column(String(36), ForeignKey('shares.id'))
@@ -270,6 +293,10 @@ class ShareAccessMapping(BASE, ManilaBase):
 class ShareSnapshot(BASE, ManilaBase):
     """Represents a snapshot of a share."""
     __tablename__ = 'share_snapshots'
+    __table_args__ = (
+        Index('share_snapshots_share_id_deleted_idx', 'share_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
 
     @property
     def name(self):
@@ -361,6 +388,11 @@ class ShareNetwork(BASE, ManilaBase):
 class ShareServer(BASE, ManilaBase):
     """Represents share server used by share."""
     __tablename__ = 'share_servers'
+    __table_args__ = (
+        Index('share_servers_host_share_network_id_deleted_idx',
+              'host', 'share_network_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     share_network_id = Column(String(36), ForeignKey('share_networks.id'),
@@ -385,6 +417,11 @@ class ShareServer(BASE, ManilaBase):
 class ShareServerBackendDetails(BASE, ManilaBase):
     """Represents a metadata key/value pair for a share server."""
     __tablename__ = 'share_server_backend_details'
+    __table_args__ = (
+        Index('share_server_backend_details_share_server_id_deleted_idx',
+              'share_server_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     deleted = Column(String(36), default='False')
     id = Column(Integer, primary_key=True)
     key = Column(String(255), nullable=False)
@@ -410,6 +447,11 @@ class ShareNetworkSecurityServiceAssociation(BASE, ManilaBase):
 class NetworkAllocation(BASE, ManilaBase):
     """Represents network allocation data."""
     __tablename__ = 'network_allocations'
+    __table_args__ = (
+        Index('network_allocations_share_server_id_deleted_idx',
+              'share_server_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'},
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     ip_address = Column(String(64), nullable=True)
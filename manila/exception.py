@@ -330,6 +330,11 @@ class InvalidShareAccess(Invalid):
     message = _("Invalid access_rule: %(reason)s.")
 
 
+class ShareAccessUpdateFailed(ManilaException):
+    message = _("Failed to update access rules %(access_ids)s of share "
+                "%(share_id)s.")
+
+
 class ShareIsBusy(ManilaException):
     message = _("Deleting $(share_name) share that used.")
 
@@ -425,6 +430,11 @@ class InstanceNotFound(NotFound):
     message = _("Instance %(instance_id)s could not be found.")
 
 
+class WaitTimeout(ManilaException):
+    message = _("%(name)s %(id)s has not reached the expected state "
+                "in %(timeout)ss. Giving up.")
+
+
 class BridgeDoesNotExist(ManilaException):
     message = _("Bridge %(bridge)s does not exist.")
 
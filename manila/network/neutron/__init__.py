@@ -19,8 +19,12 @@ from neutronclient.common import exceptions
 from neutronclient.v2_0 import client as clientv20
 from oslo.config import cfg
 
+from manila.common import client_cache
+
 CONF = cfg.CONF
 
+_client_cache = client_cache.ClientCache('neutron')
+
 
 def _get_client(token=None):
     params = {
@@ -50,4 +54,7 @@ def get_client(context):
     else:
         token = context.auth_token
 
-    return _get_client(token=token)
+    # NOTE: admin clients authenticate on their first request and again
+    # when their token is rejected.
+    return _client_cache.get((CONF.neutron_url, token),
+                             lambda: _get_client(token=token))
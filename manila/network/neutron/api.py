@@ -184,6 +184,14 @@ class API(base.Base):
             raise exception.NetworkException(code=e.status_code,
                                              message=e.message)
 
+    def list_subnets(self, **search_opts):
+        """List subnets for the client based on search options."""
+        try:
+            return self.client.list_subnets(**search_opts).get('subnets', [])
+        except neutron_client_exc.NeutronClientException as e:
+            raise exception.NetworkException(code=e.status_code,
+                                             message=e.message)
+
     def list_extensions(self):
         extensions_list = self.client.list_extensions().get('extensions')
         return dict((ext['name'], ext) for ext in extensions_list)
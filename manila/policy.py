@@ -15,13 +15,279 @@
 
 """Policy Engine For Manila"""
 
+import ast
+import collections
 import functools
+import re
+import time
+
+from oslo.config import cfg
+import six
 
 from manila import exception
+from manila.openstack.common import log as logging
 from manila.openstack.common import policy
 
+policy_opts = [
+    cfg.IntOpt('policy_file_check_interval',
+               default=1,
+               help='Minimal interval in seconds between checks of the '
+                    'policy file for modifications, 0 checks the file on '
+                    'every policy enforcement.'),
+    cfg.IntOpt('policy_decision_cache_size',
+               default=1024,
+               help='Maximum number of cached policy decisions, 0 disables '
+                    'the cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(policy_opts)
+
+LOG = logging.getLogger(__name__)
+
 _ENFORCER = None
 
+# Marks a target or credentials key absent from the dict in cache keys.
+_MISSING = object()
+
+# Dependencies of a check which reads nothing from target and credentials.
+_NO_DEPS = (frozenset(), frozenset())
+
+# Substitutions of a GenericCheck match, anything else left after removal of
+# named ones and escaped percents makes the match depend on the whole target.
+_NAMED_SUBSTITUTION = re.compile(r'%%|%\(([^)]*)\)')
+
+
+class CompiledEnforcer(policy.Enforcer):
+    """Enforcer evaluating compiled rules with cached decisions.
+
+    Each rule is compiled once per set of rules into a closure along with the
+    keys of target and credentials it depends on. Decisions of rules with
+    known dependencies are cached by the values of these keys, rules with
+    http or custom checks are always evaluated.
+    The policy file is checked for modifications at most once per
+    policy_file_check_interval.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CompiledEnforcer, self).__init__(*args, **kwargs)
+        self._last_file_check = None
+        self._reset_compiled()
+
+    def _reset_compiled(self):
+        self._compiled_rules = self.rules
+        self._compiled = {}
+        self._compiling = set()
+        self._decisions = collections.OrderedDict()
+
+    def set_rules(self, rules, overwrite=True, use_conf=False):
+        super(CompiledEnforcer, self).set_rules(rules, overwrite=overwrite,
+                                                use_conf=use_conf)
+        self._reset_compiled()
+
+    def load_rules(self, force_reload=False):
+        now = time.time()
+        if (not force_reload and self.use_conf and self.rules and
+                self._last_file_check is not None and
+                now - self._last_file_check < CONF.policy_file_check_interval):
+            return
+        self._last_file_check = now
+        use_conf = self.use_conf or force_reload
+        super(CompiledEnforcer, self).load_rules(force_reload=force_reload)
+        # Rules loaded from the file are set with use_conf=False, keep
+        # checking the file for modifications.
+        self.use_conf = use_conf
+
+    def enforce(self, rule, target, creds, do_raise=False,
+                exc=None, *args, **kwargs):
+        if isinstance(rule, policy.BaseCheck):
+            return super(CompiledEnforcer, self).enforce(
+                rule, target, creds, do_raise, exc, *args, **kwargs)
+
+        self.load_rules()
+        if not self.rules:
+            # No rules to reference means we're going to fail closed
+            result = False
+        else:
+            try:
+                result = self._check(rule, target, creds)
+            except KeyError:
+                LOG.debug("Rule [%s] doesn't exist" % rule)
+                result = False
+
+        if do_raise and not result:
+            if exc:
+                raise exc(*args, **kwargs)
+            raise policy.PolicyNotAuthorized(rule)
+        return result
+
+    def _check(self, rule, target, creds):
+        if self._compiled_rules is not self.rules:
+            # Rules were replaced bypassing set_rules.
+            self._reset_compiled()
+        func, deps = self._compile_rule(rule)
+        if func is None:
+            raise KeyError(rule)
+        size = CONF.policy_decision_cache_size
+        if deps is None or size <= 0:
+            return func(target, creds)
+
+        target_keys, creds_keys = deps
+        key = (rule,
+               tuple(self._cache_value(target, k) for k in target_keys),
+               tuple(self._cache_value(creds, k) for k in creds_keys))
+        try:
+            hash(key)
+        except TypeError:
+            return func(target, creds)
+
+        try:
+            result = self._decisions.pop(key)
+        except KeyError:
+            result = func(target, creds)
+        self._decisions[key] = result
+        while len(self._decisions) > size:
+            self._decisions.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _cache_value(values, key):
+        value = values.get(key, _MISSING)
+        if isinstance(value, list):
+            value = tuple(value)
+        # Equal values of different types, e.g. 1 and True, are
+        # formatted differently by checks.
+        return type(value), value
+
+    def _compile_rule(self, name):
+        """Returns compiled rule and its dependencies.
+
+        Compiled rule is None when the rule does not exist, dependencies are
+        a tuple of target and credentials keys or None when the decision
+        can not be cached.
+        """
+        if name in self._compiled:
+            return self._compiled[name]
+        if name in self._compiling:
+            # Reference cycle, evaluate it the way the rule checks do.
+            return (lambda target, creds:
+                    self.rules[name](target, creds, self)), None
+
+        try:
+            check = self.rules[name]
+        except KeyError:
+            self._compiled[name] = None, _NO_DEPS
+            return self._compiled[name]
+        self._compiling.add(name)
+        try:
+            self._compiled[name] = self._compile(check)
+        finally:
+            self._compiling.discard(name)
+        return self._compiled[name]
+
+    def _compile(self, check):
+        check_type = type(check)
+        if check_type is policy.TrueCheck:
+            return (lambda target, creds: True), _NO_DEPS
+        if check_type is policy.FalseCheck:
+            return (lambda target, creds: False), _NO_DEPS
+        if check_type is policy.NotCheck:
+            func, deps = self._compile(check.rule)
+            return (lambda target, creds: not func(target, creds)), deps
+        if check_type in (policy.AndCheck, policy.OrCheck):
+            return self._compile_list(check_type, check.rules)
+        if check_type is policy.RuleCheck:
+            return self._compile_rule_check(check.match)
+        if check_type is policy.RoleCheck:
+            return self._compile_role_check(check.match)
+        if check_type is policy.GenericCheck:
+            compiled = self._compile_generic_check(check.kind, check.match)
+            if compiled is not None:
+                return compiled
+        return (lambda target, creds: check(target, creds, self)), None
+
+    def _compile_list(self, check_type, checks):
+        compiled = [self._compile(check) for check in checks]
+        funcs = [func for func, deps in compiled]
+        deps = self._merge_deps(deps for func, deps in compiled)
+        if check_type is policy.AndCheck:
+            def func(target, creds):
+                for f in funcs:
+                    if not f(target, creds):
+                        return False
+                return True
+        else:
+            def func(target, creds):
+                for f in funcs:
+                    if f(target, creds):
+                        return True
+                return False
+        return func, deps
+
+    @staticmethod
+    def _merge_deps(all_deps):
+        target_keys = set()
+        creds_keys = set()
+        for deps in all_deps:
+            if deps is None:
+                return None
+            target_keys.update(deps[0])
+            creds_keys.update(deps[1])
+        return frozenset(target_keys), frozenset(creds_keys)
+
+    def _compile_rule_check(self, name):
+        rule_func, deps = self._compile_rule(name)
+        if rule_func is None:
+            return (lambda target, creds: False), _NO_DEPS
+
+        def func(target, creds):
+            try:
+                return rule_func(target, creds)
+            except KeyError:
+                # We don't have any matching rule; fail closed
+                return False
+        return func, deps
+
+    @staticmethod
+    def _compile_role_check(role):
+        role = role.lower()
+
+        def func(target, creds):
+            return role in [x.lower() for x in creds['roles']]
+        return func, (frozenset(), frozenset(['roles']))
+
+    @staticmethod
+    def _compile_generic_check(kind, match):
+        if '%' in _NAMED_SUBSTITUTION.sub('', match):
+            return None
+        target_keys = frozenset(
+            key for key in _NAMED_SUBSTITUTION.findall(match) if key)
+        try:
+            literal = six.text_type(ast.literal_eval(kind))
+        except ValueError:
+            literal = None
+        except Exception:
+            return None
+
+        if literal is not None:
+            def func(target, creds):
+                try:
+                    return match % target == literal
+                except KeyError:
+                    return False
+            return func, (target_keys, frozenset())
+
+        def func(target, creds):
+            try:
+                value = match % target
+            except KeyError:
+                return False
+            try:
+                return value == six.text_type(creds[kind])
+            except KeyError:
+                return False
+        return func, (target_keys, frozenset([kind]))
+
 
 def reset():
     global _ENFORCER
@@ -33,7 +299,7 @@ def reset():
 def init(policy_path=None):
     global _ENFORCER
     if not _ENFORCER:
-        _ENFORCER = policy.Enforcer()
+        _ENFORCER = CompiledEnforcer()
         if policy_path:
             _ENFORCER.policy_path = policy_path
     _ENFORCER.load_rules()
@@ -17,6 +17,7 @@
 """Quotas for shares."""
 
 import datetime
+import time
 
 from oslo.config import cfg
 import six
@@ -46,6 +47,10 @@ quota_opts = [
     cfg.IntOpt('reservation_expire',
                default=86400,
                help='Number of seconds until a reservation expires.'),
+    cfg.IntOpt('reservation_expire_batch_size',
+               default=1000,
+               help='Maximal number of expired reservations rolled back in '
+                    'one database transaction.'),
     cfg.IntOpt('until_refresh',
                default=0,
                help='Count of reservations until usage is refreshed.'),
@@ -54,19 +59,101 @@ quota_opts = [
                help='Number of seconds between subsequent usage refreshes.'),
     cfg.StrOpt('quota_driver',
                default='manila.quota.DbQuotaDriver',
-               help='Default driver to use for quota checks.'), ]
+               help='Default driver to use for quota checks.'),
+    cfg.IntOpt('quota_reserve_retries',
+               default=3,
+               help='Number of retries of a reservation of '
+                    'OptimisticDbQuotaDriver that lost a race with '
+                    'concurrent reservations before usages get locked.'),
+    cfg.IntOpt('quota_limits_cache_ttl',
+               default=60,
+               help='Number of seconds quota limits read from the database '
+                    'are cached by DbQuotaDriver, 0 disables the cache. '
+                    'Changes made through the API of the same process take '
+                    'effect immediately.'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
 
 
+class QuotaLimitsCache(object):
+    """Cache of quota limits read from the database.
+
+    Entries are keyed by tuples starting with the kind of limits:
+    ('project', project_id), ('user', project_id, user_id),
+    ('class', quota_class) and ('default',). They expire after
+    quota_limits_cache_ttl seconds or when invalidated.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _authorized(context, key):
+        # NOTE: the database API checks access to limits of other projects
+        # and quota classes, cache hits must not bypass that.
+        if (context.is_admin or not context.user_id or
+                not context.project_id or key[0] == 'default'):
+            return True
+        if key[0] == 'class':
+            return context.quota_class == key[1]
+        return context.project_id == key[1]
+
+    def get(self, context, key, func, *args):
+        """Return cached limits or limits returned by func(*args)."""
+        ttl = CONF.quota_limits_cache_ttl
+        if ttl <= 0 or not self._authorized(context, key):
+            return func(*args)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return dict(entry[1])
+        self.misses += 1
+        limits = func(*args)
+        self._entries[key] = (now + ttl, dict(limits))
+        return limits
+
+    def invalidate(self, project_id=None, quota_class=None):
+        """Drop limits of a project or of quota classes.
+
+        Limits of all quota classes are dropped for any quota class, as
+        the default class provides defaults of all limits. Everything is
+        dropped if neither is given.
+        """
+        if project_id is None and quota_class is None:
+            self._entries.clear()
+            return
+        for key in list(self._entries):
+            if key[0] in ('project', 'user'):
+                if key[1] == project_id:
+                    self._entries.pop(key, None)
+            elif quota_class is not None:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries)}
+
+
 class DbQuotaDriver(object):
     """Database Quota driver.
 
     Driver to perform necessary checks to enforce quotas and obtain
     quota information.  The default driver utilizes the local
-    database.
+    database.  Limits are cached, see QuotaLimitsCache.
     """
+
+    def __init__(self):
+        self.limits_cache = QuotaLimitsCache()
+
+    def invalidate_limits(self, project_id=None, quota_class=None):
+        """Drop cached limits of a project or of quota classes."""
+        self.limits_cache.invalidate(project_id=project_id,
+                                     quota_class=quota_class)
+
     def get_by_project_and_user(self, context, project_id, user_id, resource):
         """Get a specific quota by project and user."""
 
@@ -90,7 +177,8 @@ class DbQuotaDriver(object):
         """
 
         quotas = {}
-        default_quotas = db.quota_class_get_default(context)
+        default_quotas = self.limits_cache.get(
+            context, ('default',), db.quota_class_get_default, context)
         for resource in resources.values():
             quotas[resource.name] = default_quotas.get(resource.name,
                                                        resource.default)
@@ -114,7 +202,9 @@ class DbQuotaDriver(object):
         """
 
         quotas = {}
-        class_quotas = db.quota_class_get_all_by_name(context, quota_class)
+        class_quotas = self.limits_cache.get(
+            context, ('class', quota_class), db.quota_class_get_all_by_name,
+            context, quota_class)
         for resource in resources.values():
             if defaults or resource.name in class_quotas:
                 quotas[resource.name] = class_quotas.get(resource.name,
@@ -133,7 +223,9 @@ class DbQuotaDriver(object):
         if project_id == context.project_id:
             quota_class = context.quota_class
         if quota_class:
-            class_quotas = db.quota_class_get_all_by_name(context, quota_class)
+            class_quotas = self.limits_cache.get(
+                context, ('class', quota_class),
+                db.quota_class_get_all_by_name, context, quota_class)
         else:
             class_quotas = {}
 
@@ -196,7 +288,9 @@ class DbQuotaDriver(object):
         :param remains: If True, the current remains of the project will
                         will be returned.
         """
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas = self.limits_cache.get(
+            context, ('project', project_id), db.quota_get_all_by_project,
+            context, project_id)
         project_usages = None
         if usages:
             project_usages = db.quota_usage_get_all_by_project(context,
@@ -230,10 +324,14 @@ class DbQuotaDriver(object):
         :param usages: If True, the current in_use and reserved counts
                        will also be returned.
         """
-        user_quotas = db.quota_get_all_by_project_and_user(context,
-                                                           project_id, user_id)
+        user_quotas = self.limits_cache.get(
+            context, ('user', project_id, user_id),
+            db.quota_get_all_by_project_and_user, context, project_id,
+            user_id)
         # Use the project quota for default user quota.
-        proj_quotas = db.quota_get_all_by_project(context, project_id)
+        proj_quotas = self.limits_cache.get(
+            context, ('project', project_id), db.quota_get_all_by_project,
+            context, project_id)
         for key, value in six.iteritems(proj_quotas):
             if key not in user_quotas.keys():
                 user_quotas[key] = value
@@ -457,6 +555,11 @@ class DbQuotaDriver(object):
         #            which means access to the session.  Since the
         #            session isn't available outside the DBAPI, we
         #            have to do the work there.
+        return self._reserve(context, resources, quotas, user_quotas,
+                             deltas, expire, project_id, user_id)
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
         return db.quota_reserve(context, resources, quotas, user_quotas,
                                 deltas, expire,
                                 CONF.until_refresh, CONF.max_age,
@@ -550,6 +653,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project(context, project_id)
+        self.invalidate_limits(project_id=project_id)
 
     def destroy_all_by_project_and_user(self, context, project_id, user_id):
         """Destroy metadata associated with a project and user.
@@ -563,17 +667,53 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project_and_user(context, project_id, user_id)
+        self.invalidate_limits(project_id=project_id)
 
     def expire(self, context):
         """Expire reservations.
 
         Explores all currently existing reservations and rolls back
-        any that have expired.
+        any that have expired.  Returns the number of rolled back
+        reservations.
 
         :param context: The request context, for access checks.
         """
 
-        db.reservation_expire(context)
+        return db.reservation_expire(
+            context, batch_size=CONF.reservation_expire_batch_size)
+
+
+class OptimisticDbQuotaDriver(DbQuotaDriver):
+    """Database quota driver which reserves without locking usages.
+
+    DbQuotaDriver locks all quota usages of the project while reserving,
+    committing or rolling back, which serializes concurrent requests of a
+    project. This driver touches only usages of the reserved resources,
+    increases them with updates guarded by the quota limits and retries
+    reservations which lost a race, see quota_reserve_retries. Usages are
+    still created, refreshed and expired with locks.
+    """
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
+        return db.quota_reserve_optimistic(context, resources, quotas,
+                                           user_quotas, deltas, expire,
+                                           CONF.until_refresh, CONF.max_age,
+                                           project_id=project_id,
+                                           user_id=user_id,
+                                           retries=CONF.quota_reserve_retries)
+
+    def commit(self, context, reservations, project_id=None, user_id=None):
+        """Commit reservations without locking usages."""
+        db.reservation_commit_optimistic(context, reservations,
+                                         project_id=project_id,
+                                         user_id=user_id)
+
+    def rollback(self, context, reservations, project_id=None, user_id=None):
+        """Roll back reservations without locking usages."""
+        db.reservation_rollback_optimistic(context, reservations,
+                                           project_id=project_id,
+                                           user_id=user_id)
 
 
 class BaseResource(object):
@@ -1039,6 +1179,18 @@ class QuotaEngine(object):
         self._driver.destroy_all_by_project_and_user(context,
                                                      project_id, user_id)
 
+    def invalidate_limits(self, project_id=None, quota_class=None):
+        """Drop cached limits after they were changed.
+
+        :param project_id: The ID of the project which limits, including
+                           limits of its users, were changed.
+        :param quota_class: The name of the quota class which limits were
+                            changed.
+        """
+
+        self._driver.invalidate_limits(project_id=project_id,
+                                       quota_class=quota_class)
+
     def destroy_all_by_project(self, context, project_id):
         """Destroy metadate associated with a project.
 
@@ -1055,12 +1207,13 @@ class QuotaEngine(object):
         """Expire reservations.
 
         Explores all currently existing reservations and rolls back
-        any that have expired.
+        any that have expired.  Returns the number of rolled back
+        reservations.
 
         :param context: The request context, for access checks.
         """
 
-        self._driver.expire(context)
+        return self._driver.expire(context)
 
     @property
     def resources(self):
@@ -71,3 +71,4 @@ class ChanceScheduler(driver.Scheduler):
                                        request_spec,
                                        filter_properties,
                                        snapshot_id)
+        return host
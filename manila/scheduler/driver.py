@@ -21,6 +21,8 @@
 Scheduler base class that all Schedulers should inherit from
 """
 
+import copy
+
 from oslo.config import cfg
 
 from manila import db
@@ -87,5 +89,29 @@ class Scheduler(object):
         raise NotImplementedError(_("Must implement a fallback schedule"))
 
     def schedule_create_share(self, context, request_spec, filter_properties):
-        """Must override schedule method for scheduler to work."""
+        """Must override schedule method for scheduler to work.
+
+        Returns the host chosen for the share.
+        """
         raise NotImplementedError(_("Must implement schedule_create_share"))
+
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties):
+        """Schedules several shares, one by one by default.
+
+        Each share gets its own copy of filter_properties.
+
+        :returns: list of dicts in order of request_specs, either with
+                  'host' chosen for the share, or with 'error' holding the
+                  exception, which prevented scheduling of the share.
+        """
+        decisions = []
+        for request_spec in request_specs:
+            try:
+                host = self.schedule_create_share(
+                    context, request_spec,
+                    copy.deepcopy(filter_properties or {}))
+                decisions.append({'host': host})
+            except Exception as ex:
+                decisions.append({'host': None, 'error': ex})
+        return decisions
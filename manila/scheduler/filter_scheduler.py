@@ -20,6 +20,8 @@ You can customize this scheduler by specifying your own share Filters and
 Weighing Functions.
 """
 
+import copy
+
 from oslo.config import cfg
 
 from manila import exception
@@ -78,9 +80,36 @@ class FilterScheduler(driver.Scheduler):
         return max_attempts
 
     def schedule_create_share(self, context, request_spec, filter_properties):
+        return self._schedule_create_share(context, request_spec,
+                                           filter_properties)
+
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties):
+        """Places several shares using one view of the hosts.
+
+        Host states are fetched once for the whole batch and resources
+        are virtually consumed from the chosen host before the next share
+        is placed, so the batch is placed consistently.
+        """
+        elevated = context.elevated()
+        hosts = list(self.host_manager.get_all_host_states_share(elevated))
+        decisions = []
+        for request_spec in request_specs:
+            try:
+                host = self._schedule_create_share(
+                    context, request_spec,
+                    copy.deepcopy(filter_properties or {}), hosts=hosts)
+                decisions.append({'host': host})
+            except Exception as ex:
+                decisions.append({'host': None, 'error': ex})
+        return decisions
+
+    def _schedule_create_share(self, context, request_spec,
+                               filter_properties, hosts=None):
         weighed_host = self._schedule_share(context,
                                             request_spec,
-                                            filter_properties)
+                                            filter_properties,
+                                            hosts=hosts)
 
         if not weighed_host:
             raise exception.NoValidHost(reason="")
@@ -100,11 +129,14 @@ class FilterScheduler(driver.Scheduler):
                                        request_spec=request_spec,
                                        filter_properties=filter_properties,
                                        snapshot_id=snapshot_id)
+        return host
 
-    def _schedule_share(self, context, request_spec, filter_properties=None):
+    def _schedule_share(self, context, request_spec, filter_properties=None,
+                        hosts=None):
         """Returns a list of hosts that meet the required specs.
 
-        The list is ordered by their fitness.
+        The list is ordered by their fitness. Host states are fetched
+        from the host manager, unless they are passed in hosts.
         """
         elevated = context.elevated()
 
@@ -138,7 +170,8 @@ class FilterScheduler(driver.Scheduler):
 
         # Note: remember, we are using an iterator here. So only
         # traverse this list once.
-        hosts = self.host_manager.get_all_host_states_share(elevated)
+        if hosts is None:
+            hosts = self.host_manager.get_all_host_states_share(elevated)
 
         # Filter local hosts based on requirements ...
         hosts = self.host_manager.get_filtered_hosts(hosts,
@@ -18,9 +18,11 @@
 
 import math
 
+from manila.openstack.common import importutils
 from manila.openstack.common import log as logging
 from manila.openstack.common.scheduler import filters
 
+np = importutils.try_import('numpy')
 
 LOG = logging.getLogger(__name__)
 
@@ -55,3 +57,17 @@ class CapacityFilter(filters.BaseHostFilter):
                          'available': free})
 
         return free >= volume_size
+
+    def filter_all_vectorized(self, host_arrays, rows, filter_properties):
+        """Return boolean array of hosts having sufficient capacity."""
+        volume_size = filter_properties.get('size') or 0
+        free_space = host_arrays.free_capacity_gb[rows]
+        reserved = host_arrays.reserved_percentage[rows] / 100
+        if np.isnan(free_space).any():
+            LOG.error(_("Free capacity not set: "
+                        "volume node info collection broken."))
+        with np.errstate(invalid='ignore'):
+            free = np.floor(free_space * (1 - reserved))
+            # NOTE: nan, which stands for not set free capacity, compares
+            # False, 'infinite' and 'unknown' capacities always pass.
+            return np.isposinf(free_space) | (free >= volume_size)
@@ -17,6 +17,7 @@
 Manage hosts in the current zone.
 """
 
+import operator
 import UserDict
 
 from oslo.config import cfg
@@ -24,12 +25,15 @@ import six
 
 from manila import db
 from manila import exception
+from manila.openstack.common import importutils
 from manila.openstack.common import log as logging
 from manila.openstack.common.scheduler import filters
 from manila.openstack.common.scheduler import weights
 from manila.openstack.common import timeutils
 from manila import utils
 
+np = importutils.try_import('numpy')
+
 host_manager_opts = [
     cfg.ListOpt('scheduler_default_filters',
                 default=[
@@ -43,7 +47,19 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_service_refresh_interval',
+               default=10,
+               help='Seconds between reloads of the share services from '
+                    'the database when getting host states. Capability '
+                    'reports are applied to host states as they arrive. '
+                    'Should be lower than service_down_time. 0 means '
+                    'reload on every scheduling request.'),
+    cfg.BoolOpt('scheduler_use_vectorized_evaluation',
+                default=False,
+                help='Keep capacity of hosts in NumPy arrays and run '
+                     'filters and weighers, which support it, as array '
+                     'operations over all hosts at once. Requires NumPy.'),
 ]
 
 CONF = cfg.CONF
@@ -104,6 +120,10 @@ class HostState(object):
 
         self.updated = None
 
+        # HostStateArrays, holding a copy of capacity of this host
+        self.host_arrays = None
+        self.host_row = None
+
     def update_capabilities(self, capabilities=None, service=None):
         # Read-only capability dicts
 
@@ -131,6 +151,7 @@ class HostState(object):
             self.reserved_percentage = capability['reserved_percentage']
 
             self.updated = capability['timestamp']
+            self._update_host_arrays()
 
     def consume_from_share(self, share):
         """Incrementally update host state from an share."""
@@ -144,6 +165,62 @@ class HostState(object):
         else:
             self.free_capacity_gb -= share_gb
         self.updated = timeutils.utcnow()
+        self._update_host_arrays()
+
+    def _update_host_arrays(self):
+        if self.host_arrays is not None:
+            self.host_arrays.update(self)
+
+
+class HostStateArrays(object):
+    """Capacity of host states kept in NumPy arrays.
+
+    Each host state gets a row in the arrays and keeps it in sync on
+    capability updates and share consumption. 'infinite' and 'unknown'
+    capacities are stored as inf, missing ones as nan.
+    """
+
+    def __init__(self, host_states):
+        self.host_states = list(host_states)
+        size = len(self.host_states)
+        self.free_capacity_gb = np.empty(size)
+        self.total_capacity_gb = np.empty(size)
+        self.reserved_percentage = np.empty(size)
+        for row, host_state in enumerate(self.host_states):
+            host_state.host_arrays = self
+            host_state.host_row = row
+            self.update(host_state)
+
+    @staticmethod
+    def _to_float(capacity):
+        if capacity is None:
+            return float('nan')
+        if capacity in ('infinite', 'unknown'):
+            return float('inf')
+        return float(capacity)
+
+    def update(self, host_state):
+        row = host_state.host_row
+        self.free_capacity_gb[row] = self._to_float(
+            host_state.free_capacity_gb)
+        self.total_capacity_gb[row] = self._to_float(
+            host_state.total_capacity_gb)
+        self.reserved_percentage[row] = float(host_state.reserved_percentage)
+
+    def get_rows(self, host_states):
+        """Returns array of rows of host states.
+
+        Returns None, if any of host states is not kept in these arrays.
+        """
+        try:
+            owners = list(map(operator.attrgetter('host_arrays'),
+                              host_states))
+        except AttributeError:
+            return None
+        if owners.count(self) != len(owners):
+            return None
+        return np.fromiter(map(operator.attrgetter('host_row'), host_states),
+                           dtype=int, count=len(owners))
 
 
 class HostManager(object):
@@ -160,6 +237,15 @@ class HostManager(object):
         self.weight_handler = weights.HostWeightHandler('manila.scheduler.'
                                                         'weights')
         self.weight_classes = self.weight_handler.get_all_classes()
+        # Cached share services, keyed by host, None means reload is needed
+        self._services = None
+        self._services_updated_at = None
+        # Hosts, whose state should be updated on next request
+        self._dirty_hosts = set()
+        self.host_arrays = None
+        if CONF.scheduler_use_vectorized_evaluation and np is None:
+            LOG.warning(_("NumPy is not available, vectorized evaluation "
+                          "of hosts is disabled."))
 
     def _choose_host_filters(self, filter_cls_names):
         """Choose acceptable filters.
@@ -218,21 +304,85 @@ class HostManager(object):
             raise exception.SchedulerHostWeigherNotFound(weigher_name=msg)
         return good_weighers
 
+    def _get_host_rows(self, hosts):
+        """Returns rows of hosts in host arrays, if they can be used."""
+        if (self.host_arrays is None or
+                not CONF.scheduler_use_vectorized_evaluation):
+            return None
+        return self.host_arrays.get_rows(hosts)
+
     def get_filtered_hosts(self, hosts, filter_properties,
                            filter_class_names=None):
-        """Filter hosts and return only ones passing all filters."""
+        """Filter hosts and return only ones passing all filters.
+
+        With vectorized evaluation enabled, filters having
+        filter_all_vectorized() are run first over host arrays, the rest
+        of filters is run per host on hosts, which passed them.
+        """
         filter_classes = self._choose_host_filters(filter_class_names)
+        hosts = list(hosts)
+        rows = self._get_host_rows(hosts)
+        if rows is not None:
+            vectorized = [cls for cls in filter_classes
+                          if hasattr(cls, 'filter_all_vectorized')]
+            passes = np.ones(len(rows), dtype=bool)
+            for filter_cls in vectorized:
+                passes &= filter_cls().filter_all_vectorized(
+                    self.host_arrays, rows, filter_properties)
+            hosts = [hosts[i] for i in np.flatnonzero(passes)]
+            filter_classes = [cls for cls in filter_classes
+                              if cls not in vectorized]
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
 
     def get_weighed_hosts(self, hosts, weight_properties,
                           weigher_class_names=None):
-        """Weigh the hosts."""
+        """Weigh the hosts.
+
+        With vectorized evaluation enabled, weighers having
+        weigh_objects_vectorized() compute weights of all hosts at once.
+        """
         weigher_classes = self._choose_host_weighers(weigher_class_names)
-        return self.weight_handler.get_weighed_objects(weigher_classes,
-                                                       hosts,
-                                                       weight_properties)
+        hosts = list(hosts)
+        rows = self._get_host_rows(hosts)
+        if rows is None or not hosts:
+            return self.weight_handler.get_weighed_objects(weigher_classes,
+                                                           hosts,
+                                                           weight_properties)
+        object_class = self.weight_handler.object_class
+        total = np.zeros(len(hosts))
+        for weigher_cls in weigher_classes:
+            weigher = weigher_cls()
+            if hasattr(weigher, 'weigh_objects_vectorized'):
+                weights = weigher.weigh_objects_vectorized(
+                    self.host_arrays, rows, weight_properties)
+            else:
+                weighed_hosts = [object_class(host, weight)
+                                 for host, weight in zip(hosts, total)]
+                weights = np.array(weigher.weigh_objects(weighed_hosts,
+                                                         weight_properties),
+                                   dtype=float)
+            total += weigher.weight_multiplier() * self._normalize(
+                weights, weigher.minval, weigher.maxval)
+        # NOTE: stable sort keeps order of hosts with equal weights the
+        # same as sorted(..., reverse=True) of the per host path does.
+        order = np.argsort(-total, kind='mergesort')
+        return [object_class(hosts[i], weight)
+                for i, weight in zip(order, total[order].tolist())]
+
+    @staticmethod
+    def _normalize(weights, minval=None, maxval=None):
+        """Normalizes weights between 0 and 1.0 like weights.normalize."""
+        # NOTE: per host weighers extend preset bounds by actual weights.
+        minval = weights.min() if minval is None else min(minval,
+                                                          weights.min())
+        maxval = weights.max() if maxval is None else max(maxval,
+                                                          weights.max())
+        if minval == maxval:
+            return np.zeros(len(weights))
+        with np.errstate(invalid='ignore'):
+            return (weights - minval) / float(maxval - minval)
 
     def update_service_capabilities(self, service_name, host, capabilities):
         """Update the per-service capabilities based on this notification."""
@@ -248,6 +398,31 @@ class HostManager(object):
         capab_copy = dict(capabilities)
         capab_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capab_copy
+        if self._services is not None and host not in self._services:
+            # New share service, reload services on next request.
+            self.invalidate_services()
+        self._dirty_hosts.add(host)
+
+    def invalidate_services(self):
+        """Reload share services from the database on next request."""
+        self._services = None
+
+    def _refresh_services(self, context):
+        """Reload share services, if cached ones are outdated.
+
+        All hosts are marked for the update of their state on reload.
+        """
+        interval = CONF.scheduler_service_refresh_interval
+        if (self._services is not None and interval > 0 and
+                not timeutils.is_older_than(self._services_updated_at,
+                                            interval)):
+            return
+        topic = CONF.share_topic
+        share_services = db.service_get_all_by_topic(context, topic)
+        self._services = dict((service['host'], service)
+                              for service in share_services)
+        self._services_updated_at = timeutils.utcnow()
+        self._dirty_hosts.update(self._services)
 
     def get_all_host_states_share(self, context):
         """Get all hosts and their states.
@@ -256,18 +431,24 @@ class HostManager(object):
         about. Also, each of the consumable resources in HostState are
         pre-populated and adjusted based on data in the db.
 
+        Share services are cached for scheduler_service_refresh_interval
+        seconds, only states of hosts, which reported capabilities since
+        the previous call, are updated in between.
+
         For example:
           {'192.168.1.100': HostState(), ...}
         """
 
         # Get resource usage across the available share nodes:
-        topic = CONF.share_topic
-        share_services = db.service_get_all_by_topic(context, topic)
-        for service in share_services:
+        self._refresh_services(context)
+        dirty_hosts, self._dirty_hosts = self._dirty_hosts, set()
+        for host in dirty_hosts:
+            service = self._services.get(host)
+            if service is None:
+                continue
             if not utils.service_is_up(service) or service['disabled']:
                 LOG.warn(_("service is down or disabled."))
                 continue
-            host = service['host']
             capabilities = self.service_states.get(host, None)
             host_state = self.host_state_map.get(host)
             if host_state:
@@ -283,4 +464,15 @@ class HostManager(object):
             # update host_state
             host_state.update_from_share_capability(capabilities)
 
+        if CONF.scheduler_use_vectorized_evaluation:
+            self._update_host_arrays()
         return self.host_state_map.itervalues()
+
+    def _update_host_arrays(self):
+        """Rebuilds host arrays, if set of hosts changed."""
+        if np is None:
+            return
+        if (self.host_arrays is None or len(self.host_arrays.host_states) !=
+                len(self.host_state_map)):
+            self.host_arrays = HostStateArrays(
+                self.host_state_map.itervalues())
@@ -20,6 +20,7 @@ Scheduler Service
 """
 
 from oslo.config import cfg
+from oslo import messaging
 
 from manila import context
 from manila import db
@@ -28,6 +29,7 @@ from manila import manager
 from manila.openstack.common import excutils
 from manila.openstack.common import importutils
 from manila.openstack.common import log as logging
+from manila import quota
 from manila import rpc
 from manila.share import rpcapi as share_rpcapi
 
@@ -45,6 +47,10 @@ CONF.register_opt(scheduler_driver_opt)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create shares."""
 
+    RPC_API_VERSION = '1.1'
+
+    target = messaging.Target(version=RPC_API_VERSION)
+
     def __init__(self, scheduler_driver=None, service_name=None,
                  *args, **kwargs):
         if not scheduler_driver:
@@ -56,6 +62,13 @@ class SchedulerManager(manager.Manager):
         ctxt = context.get_admin_context()
         self.request_service_capabilities(ctxt)
 
+    @manager.periodic_task
+    def _expire_reservations(self, context):
+        expired = quota.QUOTAS.expire(context)
+        if expired:
+            LOG.info(_('Rolled back %d expired quota reservations.'),
+                     expired)
+
     def get_host_list(self, context):
         """Get a list of hosts from the HostManager."""
         return self.driver.get_host_list()
@@ -87,6 +100,26 @@ class SchedulerManager(manager.Manager):
                                                        context, ex,
                                                        request_spec)
 
+    def create_shares(self, context, topic, request_specs,
+                      filter_properties=None):
+        """Schedules several shares at once.
+
+        Returns list of {'share_id': ..., 'host': ...} dicts in order of
+        request_specs, host is None for shares, which failed to schedule.
+        """
+        decisions = self.driver.schedule_create_shares(context, request_specs,
+                                                       filter_properties)
+        result = []
+        for request_spec, decision in zip(request_specs, decisions):
+            ex = decision.get('error')
+            if ex is not None:
+                self._set_share_error_state_and_notify('create_share',
+                                                       context, ex,
+                                                       request_spec)
+            result.append({'share_id': request_spec.get('share_id'),
+                           'host': decision.get('host')})
+        return result
+
     def _set_share_error_state_and_notify(self, method, context, ex,
                                           request_spec):
         LOG.warning(_("Failed to schedule_%(method)s: %(ex)s"),
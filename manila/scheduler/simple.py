@@ -67,7 +67,7 @@ class SimpleScheduler(chance.ChanceScheduler):
                                            None,
                                            snapshot_id=snapshot_id
                                            )
-            return None
+            return host
 
         results = db.service_get_all_share_sorted(elevated)
         if zone:
@@ -87,6 +87,6 @@ class SimpleScheduler(chance.ChanceScheduler):
                                                request_spec,
                                                None,
                                                snapshot_id=snapshot_id)
-                return None
+                return service['host']
         msg = _("Is the appropriate service running?")
         raise exception.NoValidHost(reason=msg)
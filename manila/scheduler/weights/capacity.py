@@ -24,9 +24,11 @@ import math
 
 from oslo.config import cfg
 
-
+from manila.openstack.common import importutils
 from manila.openstack.common.scheduler import weights
 
+np = importutils.try_import('numpy')
+
 capacity_weight_opts = [
     cfg.FloatOpt('capacity_weight_multiplier',
                  default=1.0,
@@ -54,3 +56,11 @@ class CapacityWeigher(weights.BaseHostWeigher):
         else:
             free = math.floor(host_state.free_capacity_gb * (1 - reserved))
         return free
+
+    def weigh_objects_vectorized(self, host_arrays, rows, weight_properties):
+        """Return array of weights of hosts."""
+        reserved = host_arrays.reserved_percentage[rows] / 100
+        free_space = host_arrays.free_capacity_gb[rows]
+        with np.errstate(invalid='ignore'):
+            free = np.floor(free_space * (1 - reserved))
+        return np.where(np.isinf(free_space), free_space, free)
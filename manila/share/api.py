@@ -308,30 +308,34 @@ class API(base.Base):
         policy.check_policy(context, 'share', 'get', rv)
         return rv
 
-    def get_all(self, context, search_opts=None):
+    def get_all(self, context, search_opts=None, sort_key=None,
+                sort_dir=None, limit=None, offset=None, marker=None):
+        """Returns shares matching search options.
+
+        Shares are filtered, sorted and paginated by the database, see
+        db.share_get_all for the meaning of sorting and pagination params.
+        """
         policy.check_policy(context, 'share', 'get_all')
         if search_opts is None:
             search_opts = {}
+        kwargs = dict(sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+                      offset=offset, marker=marker)
+        # NOTE(vponomaryov): we do not need 'all_tenants' opt for filtering
+        all_tenants = search_opts.pop('all_tenants', None)
+        if search_opts:
+            LOG.debug("Searching for shares by: %s" % str(search_opts))
         if 'share_server_id' in search_opts:
             # NOTE(vponomaryov): this is project_id independent
             policy.check_policy(context, 'share', 'list_by_share_server_id')
+            share_server_id = search_opts.pop('share_server_id')
             shares = self.db.share_get_all_by_share_server(
-                context, search_opts.pop('share_server_id'))
-        elif (context.is_admin and 'all_tenants' in search_opts):
-            shares = self.db.share_get_all(context)
+                context, share_server_id, filters=search_opts, **kwargs)
+        elif context.is_admin and all_tenants is not None:
+            shares = self.db.share_get_all(context, filters=search_opts,
+                                           **kwargs)
         else:
-            shares = self.db.share_get_all_by_project(context,
-                                                      context.project_id)
-        # NOTE(vponomaryov): we do not need 'all_tenants' opt anymore
-        search_opts.pop('all_tenants', None)
-        if search_opts:
-            LOG.debug("Searching for shares by: %s" % str(search_opts))
-            results = []
-            for s in shares:
-                # values in search_opts can be only strings
-                if all(s.get(k, None) == v for k, v in search_opts.items()):
-                    results.append(s)
-            shares = results
+            shares = self.db.share_get_all_by_project(
+                context, context.project_id, filters=search_opts, **kwargs)
         return shares
 
     def get_snapshot(self, context, snapshot_id):
@@ -339,31 +343,29 @@ class API(base.Base):
         rv = self.db.share_snapshot_get(context, snapshot_id)
         return dict(six.iteritems(rv))
 
-    def get_all_snapshots(self, context, search_opts=None):
+    def get_all_snapshots(self, context, search_opts=None, sort_key=None,
+                          sort_dir=None, limit=None, offset=None,
+                          marker=None, columns=None):
+        """Returns snapshots matching search options.
+
+        Snapshots are filtered, sorted and paginated by the database, see
+        db.share_snapshot_get_all for the meaning of the other params.
+        """
         policy.check_policy(context, 'share', 'get_all_snapshots')
 
         search_opts = search_opts or {}
-
-        if (context.is_admin and 'all_tenants' in search_opts):
-            # Need to remove all_tenants to pass the filtering below.
-            del search_opts['all_tenants']
-            snapshots = self.db.share_snapshot_get_all(context)
-        else:
-            snapshots = self.db.share_snapshot_get_all_by_project(
-                context, context.project_id)
-
+        kwargs = dict(sort_key=sort_key, sort_dir=sort_dir, limit=limit,
+                      offset=offset, marker=marker, columns=columns)
+        all_tenants = search_opts.pop('all_tenants', None)
         if search_opts:
             LOG.debug("Searching by: %s" % str(search_opts))
 
-            results = []
-            not_found = object()
-            for snapshot in snapshots:
-                for opt, value in six.iteritems(search_opts):
-                    if snapshot.get(opt, not_found) != value:
-                        break
-                else:
-                    results.append(snapshot)
-            snapshots = results
+        if context.is_admin and all_tenants is not None:
+            snapshots = self.db.share_snapshot_get_all(
+                context, filters=search_opts, **kwargs)
+        else:
+            snapshots = self.db.share_snapshot_get_all_by_project(
+                context, context.project_id, filters=search_opts, **kwargs)
         return snapshots
 
     def allow_access(self, ctx, share, access_type, access_to):
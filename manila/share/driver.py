@@ -121,6 +121,38 @@ class ShareDriver(object):
         """Deny access to the share."""
         raise NotImplementedError()
 
+    def update_access(self, context, share, add_rules, delete_rules,
+                      share_server=None):
+        """Allow and deny several access rules of the share at once.
+
+        Drivers able to apply a set of rules with a single backend
+        operation should override this method. By default rules are
+        processed one by one with deny_access and allow_access, rules
+        that already exist on the backend are skipped. A failing rule
+        is logged and does not stop processing of the other rules.
+
+        :param add_rules: list of access rules to be allowed
+        :param delete_rules: list of access rules to be denied
+        :raises: ShareAccessUpdateFailed with IDs of the failed rules
+        """
+        failed_ids = []
+        changes = ([(access, self.deny_access) for access in delete_rules] +
+                   [(access, self.allow_access) for access in add_rules])
+        for access, method in changes:
+            try:
+                method(context, share, access, share_server=share_server)
+            except exception.ShareAccessExists:
+                pass
+            except Exception as e:
+                LOG.error(_("Failed to update access rule %(access_id)s of "
+                            "share %(share_id)s: %(e)s"),
+                          {'access_id': access['id'],
+                           'share_id': share['id'], 'e': e})
+                failed_ids.append(access['id'])
+        if failed_ids:
+            raise exception.ShareAccessUpdateFailed(access_ids=failed_ids,
+                                                    share_id=share['id'])
+
     def check_for_setup_error(self):
         """Check for setup error."""
         pass
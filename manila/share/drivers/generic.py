@@ -19,9 +19,11 @@ import os
 import re
 import time
 
+from eventlet import semaphore
 from oslo.config import cfg
 import six
 
+from manila.common import client_cache
 from manila.common import constants as const
 from manila import compute
 from manila import context
@@ -71,6 +73,18 @@ share_opts = [
                default='ext4',
                choices=['ext4', 'ext3'],
                help='Filesystem type of the share volume.'),
+    cfg.IntOpt('service_instance_ssh_pool_size',
+               default=1,
+               help='Maximum number of SSH connections opened to one '
+                    'service instance.'),
+    cfg.IntOpt('service_instance_ssh_max_channels',
+               default=10,
+               help='Maximum number of commands run concurrently over one '
+                    'SSH connection to a service instance.'),
+    cfg.IntOpt('service_instance_ssh_idle_timeout',
+               default=600,
+               help='Time in seconds after which unused SSH connections '
+                    'to a service instance are closed.'),
 ]
 
 CONF = cfg.CONF
@@ -97,6 +111,131 @@ def ensure_server(f):
     return wrap
 
 
+class SSHSessions(object):
+    """SSH connections to one service instance.
+
+    Up to 'pool_size' connections are opened, each of them running up to
+    'max_channels' commands at a time on separate channels of its
+    transport.
+    """
+
+    def __init__(self, server, pool_size, max_channels):
+        self.ssh_pool = utils.SSHPool(server['ip'],
+                                      22,
+                                      None,
+                                      server['username'],
+                                      server['password'],
+                                      server['pk_path'],
+                                      max_size=pool_size)
+        self.max_channels = max_channels
+        # NOTE: maps connection to the number of commands running on it
+        self.connections = {}
+        self.last_used = time.time()
+        self._channels = semaphore.Semaphore(pool_size * max_channels)
+        self._lock = semaphore.Semaphore()
+
+    def acquire(self):
+        """Returns connection able to run one more command."""
+        self._channels.acquire()
+        try:
+            with self._lock:
+                ssh = self._get_connection()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._channels.release()
+        self.connections[ssh] += 1
+        self.last_used = time.time()
+        return ssh
+
+    def release(self, ssh):
+        """Marks command run on the connection as finished."""
+        if ssh in self.connections:
+            self.connections[ssh] -= 1
+            if (not self.connections[ssh] and
+                    not ssh.get_transport().is_active()):
+                self._remove(ssh)
+        self.last_used = time.time()
+        self._channels.release()
+
+    def is_idle(self, timeout):
+        return (not any(self.connections.values()) and
+                time.time() - self.last_used > timeout)
+
+    def close(self):
+        for ssh in list(self.connections):
+            self._remove(ssh)
+
+    def _get_connection(self):
+        for ssh, channels in list(self.connections.items()):
+            if not channels and not ssh.get_transport().is_active():
+                LOG.debug("Reopening inactive SSH connection to %s.",
+                          self.ssh_pool.ip)
+                self._remove(ssh)
+        for ssh, channels in self.connections.items():
+            if not channels:
+                return ssh
+        if len(self.connections) < self.ssh_pool.max_size:
+            ssh = self.ssh_pool.create()
+            self.connections[ssh] = 0
+            return ssh
+        # NOTE: the semaphore guarantees a free channel on the least
+        # loaded connection.
+        return min(self.connections, key=self.connections.get)
+
+    def _remove(self, ssh):
+        del self.connections[ssh]
+        self.ssh_pool.remove(ssh)
+
+
+class SSHSessionManager(object):
+    """Runs commands over SSH connections to service instances."""
+
+    def __init__(self, pool_size, max_channels, idle_timeout):
+        self.pool_size = pool_size
+        self.max_channels = max_channels
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._stats = {'commands': 0, 'wait_time': 0.0, 'command_time': 0.0}
+
+    def execute(self, server, cmd):
+        sessions = self._sessions.get(server['instance_id'])
+        if sessions is None:
+            sessions = SSHSessions(server, self.pool_size, self.max_channels)
+            self._sessions[server['instance_id']] = sessions
+
+        started_at = time.time()
+        ssh = sessions.acquire()
+        self._stats['wait_time'] += time.time() - started_at
+        started_at = time.time()
+        try:
+            return processutils.ssh_execute(ssh, cmd)
+        finally:
+            sessions.release(ssh)
+            self._stats['commands'] += 1
+            self._stats['command_time'] += time.time() - started_at
+
+    def close(self, instance_id):
+        """Closes all connections to the service instance."""
+        sessions = self._sessions.pop(instance_id, None)
+        if sessions:
+            sessions.close()
+
+    def evict_idle(self):
+        """Closes connections to service instances not used recently."""
+        for instance_id, sessions in list(self._sessions.items()):
+            if sessions.is_idle(self.idle_timeout):
+                LOG.debug("Closing idle SSH connections to service "
+                          "instance %s.", instance_id)
+                self.close(instance_id)
+
+    def get_stats(self):
+        stats = dict(self._stats)
+        stats['service_instances'] = len(self._sessions)
+        stats['open_sessions'] = sum(len(sessions.connections)
+                                     for sessions in self._sessions.values())
+        return stats
+
+
 class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     """Executes commands relating to Shares."""
 
@@ -110,31 +249,16 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         self._helpers = {}
         self.backend_name = self.configuration.safe_get(
             'share_backend_name') or "Cinder_Volumes"
-        self.ssh_connections = {}
+        self.ssh_sessions = SSHSessionManager(
+            self.configuration.service_instance_ssh_pool_size,
+            self.configuration.service_instance_ssh_max_channels,
+            self.configuration.service_instance_ssh_idle_timeout)
         self.service_instance_manager = (
             service_instance.ServiceInstanceManager(
                 self.db, driver_config=self.configuration))
 
     def _ssh_exec(self, server, command):
-        connection = self.ssh_connections.get(server['instance_id'])
-        if not connection:
-            ssh_pool = utils.SSHPool(server['ip'],
-                                     22,
-                                     None,
-                                     server['username'],
-                                     server['password'],
-                                     server['pk_path'],
-                                     max_size=1)
-            ssh = ssh_pool.create()
-            self.ssh_connections[server['instance_id']] = (ssh_pool, ssh)
-        else:
-            ssh_pool, ssh = connection
-
-        if not ssh.get_transport().is_active():
-            ssh_pool.remove(ssh)
-            ssh = ssh_pool.create()
-            self.ssh_connections[server['instance_id']] = (ssh_pool, ssh)
-        return processutils.ssh_execute(ssh, ' '.join(command))
+        return self.ssh_sessions.execute(server, ' '.join(command))
 
     def check_for_setup_error(self):
         """Returns an error if prerequisites aren't met."""
@@ -287,19 +411,17 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                                                     instance_id,
                                                     volume['id'],
                                                     )
-            t = time.time()
-            while time.time() - t < self.configuration.max_time_to_attach:
-                volume = self.volume_api.get(context, volume['id'])
-                if volume['status'] == 'in-use':
-                    return volume
-                elif volume['status'] != 'attaching':
+            volume_id = volume['id']
+
+            def is_attached(volume):
+                if volume is None or volume['status'] not in ('in-use',
+                                                              'attaching'):
                     raise exception.ManilaException(
-                        _('Failed to attach volume %s') % volume['id'])
-                time.sleep(1)
-            else:
-                raise exception.ManilaException(
-                    _('Volume have not been attached in %ss. Giving up') %
-                    self.configuration.max_time_to_attach)
+                        _('Failed to attach volume %s') % volume_id)
+                return volume['status'] == 'in-use'
+            return self.volume_api.wait_for_volume(
+                context, volume_id, is_attached,
+                self.configuration.max_time_to_attach)
         return do_attach(volume)
 
     def _get_volume(self, context, share_id):
@@ -348,16 +470,12 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                     instance_id,
                     volume['id']
                 )
-                t = time.time()
-                while time.time() - t < self.configuration.max_time_to_attach:
-                    volume = self.volume_api.get(context, volume['id'])
-                    if volume['status'] in ('available', 'error'):
-                        break
-                    time.sleep(1)
-                else:
-                    raise exception.ManilaException(
-                        _('Volume have not been detached in %ss. Giving up')
-                        % self.configuration.max_time_to_attach)
+                self.volume_api.wait_for_volume(
+                    context, volume['id'],
+                    lambda volume: (volume is None or
+                                    volume['status'] in ('available',
+                                                         'error')),
+                    self.configuration.max_time_to_attach)
         do_detach()
 
     def _allocate_container(self, context, share, snapshot=None):
@@ -372,41 +490,23 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             self.configuration.volume_name_template % share['id'], '',
             snapshot=volume_snapshot)
 
-        t = time.time()
-        while time.time() - t < self.configuration.max_time_to_create_volume:
-            if volume['status'] == 'available':
-                break
-            if volume['status'] == 'error':
+        def is_created(volume):
+            if volume is None or volume['status'] == 'error':
                 raise exception.ManilaException(_('Failed to create volume'))
-            time.sleep(1)
-            volume = self.volume_api.get(context, volume['id'])
-        else:
-            raise exception.ManilaException(
-                _('Volume have not been created '
-                  'in %ss. Giving up') %
-                self.configuration.max_time_to_create_volume)
-
-        return volume
+            return volume['status'] == 'available'
+        return self.volume_api.wait_for_volume(
+            context, volume['id'], is_created,
+            self.configuration.max_time_to_create_volume, volume=volume)
 
     def _deallocate_container(self, context, share):
         """Deletes cinder volume."""
         volume = self._get_volume(context, share['id'])
         if volume:
             self.volume_api.delete(context, volume['id'])
-            t = time.time()
-            while (time.time() - t <
-                   self.configuration.max_time_to_create_volume):
-                try:
-                    volume = self.volume_api.get(context, volume['id'])
-                except exception.VolumeNotFound:
-                    LOG.debug('Volume was deleted succesfully')
-                    break
-                time.sleep(1)
-            else:
-                raise exception.ManilaException(
-                    _('Volume have not been '
-                      'deleted in %ss. Giving up')
-                    % self.configuration.max_time_to_create_volume)
+            self.volume_api.wait_for_volume(
+                context, volume['id'], lambda volume: volume is None,
+                self.configuration.max_time_to_create_volume)
+            LOG.debug('Volume was deleted succesfully')
 
     def get_share_stats(self, refresh=False):
         """Get share status.
@@ -440,6 +540,11 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
 
         self._stats = data
 
+        self.ssh_sessions.evict_idle()
+        LOG.debug("SSH sessions statistics: %s",
+                  self.ssh_sessions.get_stats())
+        LOG.debug("Client cache statistics: %s", client_cache.get_all_stats())
+
     @ensure_server
     def create_share_from_snapshot(self, context, share, snapshot,
                                    share_server=None):
@@ -472,22 +577,17 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                                 volume_snapshot_name_template % snapshot['id'])
         volume_snapshot = self.volume_api.create_snapshot_force(
             self.admin_context, volume['id'], volume_snapshot_name, '')
-        t = time.time()
-        while time.time() - t < self.configuration.max_time_to_create_volume:
-            if volume_snapshot['status'] == 'available':
-                break
-            if volume_snapshot['status'] == 'error':
+
+        def is_created(volume_snapshot):
+            if (volume_snapshot is None or
+                    volume_snapshot['status'] == 'error'):
                 raise exception.ManilaException(_('Failed to create volume '
                                                   'snapshot'))
-            time.sleep(1)
-            volume_snapshot = self.volume_api.get_snapshot(
-                self.admin_context,
-                volume_snapshot['id'])
-        else:
-            raise exception.ManilaException(
-                _('Volume snapshot have not been '
-                  'created in %ss. Giving up') %
-                self.configuration.max_time_to_create_volume)
+            return volume_snapshot['status'] == 'available'
+        self.volume_api.wait_for_snapshot(
+            self.admin_context, volume_snapshot['id'], is_created,
+            self.configuration.max_time_to_create_volume,
+            snapshot=volume_snapshot)
 
     @ensure_server
     def delete_snapshot(self, context, snapshot, share_server=None):
@@ -498,20 +598,11 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             return
         self.volume_api.delete_snapshot(self.admin_context,
                                         volume_snapshot['id'])
-        t = time.time()
-        while time.time() - t < self.configuration.max_time_to_create_volume:
-            try:
-                snapshot = self.volume_api.get_snapshot(self.admin_context,
-                                                        volume_snapshot['id'])
-            except exception.VolumeSnapshotNotFound:
-                LOG.debug('Volume snapshot was deleted succesfully')
-                break
-            time.sleep(1)
-        else:
-            raise exception.ManilaException(
-                _('Volume snapshot have not been '
-                  'deleted in %ss. Giving up') %
-                self.configuration.max_time_to_create_volume)
+        self.volume_api.wait_for_snapshot(
+            self.admin_context, volume_snapshot['id'],
+            lambda volume_snapshot: volume_snapshot is None,
+            self.configuration.max_time_to_create_volume)
+        LOG.debug('Volume snapshot was deleted succesfully')
 
     @ensure_server
     def ensure_share(self, context, share, share_server=None):
@@ -543,6 +634,17 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                                             access['access_type'],
                                             access['access_to'])
 
+    @ensure_server
+    def update_access(self, context, share, add_rules, delete_rules,
+                      share_server=None):
+        """Allow and deny several access rules of the share at once."""
+        failed_ids = self._get_helper(share).update_access(
+            share_server['backend_details'], share['name'], add_rules,
+            delete_rules)
+        if failed_ids:
+            raise exception.ShareAccessUpdateFailed(access_ids=failed_ids,
+                                                    share_id=share['id'])
+
     def _get_helper(self, share):
         if share['share_proto'].startswith('NFS'):
             return self._helpers['NFS']
@@ -575,6 +677,7 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         instance_id = server_details.get("instance_id")
         msg = "Removing share infrastructure for service instance '%s'."
         LOG.debug(msg % instance_id)
+        self.ssh_sessions.close(instance_id)
         try:
             self.service_instance_manager.delete_service_instance(
                 self.admin_context,
@@ -586,6 +689,84 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             LOG.warning(e)
 
 
+class RemoteCommandBatch(object):
+    """Runs several commands on a service instance with one SSH exec.
+
+    Commands queued with add() are run by flush() as a single shell
+    script. Each step is followed by a marker line with its exit code,
+    so that output and exit code of every step can be parsed separately.
+    Failure of a checked step stops the script and is raised as
+    ProcessExecutionError of that step. Commands queued with defer() are
+    run once at the end of the batch, no matter how many times they were
+    deferred.
+    """
+
+    STEP_MARKER = '__manila_batch_step__'
+
+    def __init__(self, ssh_execute, server):
+        self._ssh_exec = ssh_execute
+        self.server = server
+        self._steps = []
+        self._deferred = []
+        self._step_re = re.compile(
+            re.escape(self.STEP_MARKER) + r' (\d+) (\d+)\n?')
+
+    def __len__(self):
+        return len(self._steps)
+
+    def add(self, command, check_exit_code=True):
+        """Queues command, returns index of its result in flush() output."""
+        self._steps.append((command, check_exit_code))
+        return len(self._steps) - 1
+
+    def defer(self, command):
+        """Queues command to be run once after all other commands."""
+        if command not in self._deferred:
+            self._deferred.append(command)
+
+    def flush(self):
+        """Runs queued commands.
+
+        Deferred commands are run only if there is anything else to run.
+
+        :returns: list of (stdout, exit_code) tuples, one per step.
+        """
+        steps, deferred = self._steps, self._deferred
+        self._steps, self._deferred = [], []
+        if not steps:
+            return []
+        steps += [(command, True) for command in deferred]
+        script = []
+        for index, (command, check_exit_code) in enumerate(steps):
+            script.extend(command)
+            script.extend([';', 'rc=$?', ';',
+                           'echo', self.STEP_MARKER, str(index), '$rc', ';'])
+            if check_exit_code:
+                script.extend(['[', '$rc', '-eq', '0', ']', '||',
+                               'exit', '$rc', ';'])
+        try:
+            out, __ = self._ssh_exec(self.server, script)
+        except exception.ProcessExecutionError as e:
+            results = self._parse_results(steps, e.stdout or '')
+            for (command, check_exit_code), (stdout, exit_code) in zip(
+                    steps, results):
+                if check_exit_code and exit_code:
+                    raise exception.ProcessExecutionError(
+                        exit_code=exit_code, stdout=stdout, stderr=e.stderr,
+                        cmd=' '.join(command))
+            raise
+        return self._parse_results(steps, out)
+
+    def _parse_results(self, steps, out):
+        results = [('', None)] * len(steps)
+        start = 0
+        for match in self._step_re.finditer(out):
+            index, exit_code = int(match.group(1)), int(match.group(2))
+            results[index] = (out[start:match.start()], exit_code)
+            start = match.end()
+        return results
+
+
 class NASHelperBase(object):
     """Interface to work with share."""
 
@@ -597,6 +778,10 @@ class NASHelperBase(object):
     def init_helper(self, server):
         pass
 
+    def _get_batch(self, server):
+        """Returns new batch of commands to be run on the server."""
+        return RemoteCommandBatch(self._ssh_exec, server)
+
     def create_export(self, server, share_name, recreate=False):
         """Create new export, delete old one if exists."""
         raise NotImplementedError()
@@ -614,6 +799,46 @@ class NASHelperBase(object):
         """Deny access to the host."""
         raise NotImplementedError()
 
+    def update_access(self, server, share_name, add_rules, delete_rules):
+        """Allow and deny several access rules at once.
+
+        Helpers able to apply all changes with less round trips to the
+        service instance should override this method. A failing rule does
+        not stop processing of the other rules.
+
+        :returns: IDs of the rules which failed to be applied.
+        """
+        failed_ids = []
+        changes = ([(access, self.deny_access) for access in delete_rules] +
+                   [(access, self.allow_access) for access in add_rules])
+        for access, method in changes:
+            try:
+                method(server, share_name, access['access_type'],
+                       access['access_to'])
+            except exception.ShareAccessExists:
+                pass
+            except Exception as e:
+                self._log_rule_failure(share_name, access, e)
+                failed_ids.append(access['id'])
+        return failed_ids
+
+    @staticmethod
+    def _log_rule_failure(share_name, access, reason):
+        LOG.error(_("Failed to update access rule %(access_id)s of share "
+                    "%(share)s: %(reason)s"),
+                  {'access_id': access['id'], 'share': share_name,
+                   'reason': reason})
+
+    def _get_invalid_rule_ids(self, share_name, rules):
+        """Returns IDs of the rules of other than ip access type."""
+        invalid_ids = []
+        for access in rules:
+            if access['access_type'] != 'ip':
+                self._log_rule_failure(share_name, access,
+                                       _('Only ip access type allowed.'))
+                invalid_ids.append(access['id'])
+        return invalid_ids
+
 
 def nfs_synchronized(f):
 
@@ -667,10 +892,11 @@ class NFSHelper(NASHelperBase):
         if out is not None:
             raise exception.ShareAccessExists(access_type=access_type,
                                               access=access)
-        self._ssh_exec(server,
-                       ['sudo', 'exportfs', '-o', 'rw,no_subtree_check',
-                        ':'.join([access, local_path])])
-        self._sync_nfs_temp_and_perm_files(server)
+        batch = self._get_batch(server)
+        batch.add(['sudo', 'exportfs', '-o', 'rw,no_subtree_check',
+                   ':'.join([access, local_path])])
+        batch.defer(self._get_sync_nfs_temp_and_perm_files_cmd())
+        batch.flush()
 
     @nfs_synchronized
     def deny_access(self, server, share_name, access_type, access,
@@ -678,22 +904,76 @@ class NFSHelper(NASHelperBase):
         """Deny access to the host."""
         local_path = os.path.join(self.configuration.share_mount_path,
                                   share_name)
-        self._ssh_exec(server, ['sudo', 'exportfs', '-u',
-                                ':'.join([access, local_path])])
-        self._sync_nfs_temp_and_perm_files(server)
+        batch = self._get_batch(server)
+        batch.add(['sudo', 'exportfs', '-u', ':'.join([access, local_path])])
+        batch.defer(self._get_sync_nfs_temp_and_perm_files_cmd())
+        batch.flush()
+
+    @nfs_synchronized
+    def update_access(self, server, share_name, add_rules, delete_rules):
+        """Apply all access changes with one batch of exportfs calls.
 
-    def _sync_nfs_temp_and_perm_files(self, server):
-        """Sync changes of exports with permanent NFS config file.
+        Rules of other than ip access type and rules whose exportfs call
+        fails are skipped, the other rules are applied.
+
+        :returns: IDs of the rules which failed to be applied.
+        """
+        local_path = os.path.join(self.configuration.share_mount_path,
+                                  share_name)
+        failed_ids = self._get_invalid_rule_ids(share_name, add_rules)
+        add_rules = [access for access in add_rules
+                     if access['id'] not in failed_ids]
+        if not (add_rules or delete_rules):
+            return failed_ids
+        out, __ = self._ssh_exec(server, ['sudo', 'exportfs'])
+        hosts = self._get_exports(out).get(local_path, set())
+        batch = self._get_batch(server)
+        steps = []
+        for access in delete_rules:
+            if access['access_to'] in hosts:
+                hosts.remove(access['access_to'])
+                steps.append((access, batch.add(
+                    ['sudo', 'exportfs', '-u',
+                     ':'.join([access['access_to'], local_path])],
+                    check_exit_code=False)))
+        for access in add_rules:
+            if access['access_to'] not in hosts:
+                hosts.add(access['access_to'])
+                steps.append((access, batch.add(
+                    ['sudo', 'exportfs', '-o', 'rw,no_subtree_check',
+                     ':'.join([access['access_to'], local_path])],
+                    check_exit_code=False)))
+        batch.defer(self._get_sync_nfs_temp_and_perm_files_cmd())
+        results = batch.flush()
+        for access, index in steps:
+            stdout, exit_code = results[index]
+            if exit_code:
+                self._log_rule_failure(share_name, access, stdout)
+                failed_ids.append(access['id'])
+        return failed_ids
+
+    @staticmethod
+    def _get_exports(out):
+        """Parses output of 'exportfs' into {path: set of hosts} dict."""
+        exports = {}
+        # NOTE: exportfs prints '<path> <host>' pairs, long paths are
+        # followed by a line break instead of a space.
+        items = out.split()
+        for path, host in zip(items[::2], items[1::2]):
+            exports.setdefault(path, set()).add(host)
+        return exports
+
+    def _get_sync_nfs_temp_and_perm_files_cmd(self):
+        """Returns command syncing exports with permanent NFS config file.
 
         This is required to ensure, that after share server reboot, exports
         still exist.
         """
-        sync_cmd = [
+        return [
             'sudo', 'cp ', const.NFS_EXPORTS_FILE_TEMP, const.NFS_EXPORTS_FILE,
             '&&',
             'sudo', 'exportfs', '-a',
         ]
-        self._ssh_exec(server, sync_cmd)
 
 
 class CIFSHelper(NASHelperBase):
@@ -715,27 +995,23 @@ class CIFSHelper(NASHelperBase):
             share_name, self.configuration.share_mount_path,
             'writeable=y', 'guest_ok=y',
         ]
-        try:
-            self._ssh_exec(
-                server, ['sudo', 'net', 'conf', 'showshare', share_name, ])
-        except exception.ProcessExecutionError as parent_e:
-            # Share does not exist, create it
-            try:
-                self._ssh_exec(server, create_cmd)
-            except Exception:
-                # If we get here, then it will be useful
-                # to log parent exception too.
-                with excutils.save_and_reraise_exception():
-                    LOG.error(parent_e)
+        batch = self._get_batch(server)
+        parent_e = None
+        if recreate:
+            # NOTE: share may not exist, so result of removal is ignored.
+            batch.add(['sudo', 'net', 'conf', 'delshare', share_name],
+                      check_exit_code=False)
         else:
-            # Share exists
-            if recreate:
+            try:
                 self._ssh_exec(
-                    server, ['sudo', 'net', 'conf', 'delshare', share_name, ])
-                self._ssh_exec(server, create_cmd)
+                    server, ['sudo', 'net', 'conf', 'showshare', share_name, ])
+            except exception.ProcessExecutionError as e:
+                # Share does not exist, create it
+                parent_e = e
             else:
                 msg = _('Share section %s already defined.') % share_name
                 raise exception.ShareBackendException(msg=msg)
+        batch.add(create_cmd)
         parameters = {
             'browseable': 'yes',
             '\"create mask\"': '0755',
@@ -743,13 +1019,17 @@ class CIFSHelper(NASHelperBase):
             '\"hosts allow\"': '127.0.0.1',
             '\"read only\"': 'no',
         }
-        set_of_commands = [':', ]  # : is just placeholder
         for param, value in parameters.items():
-            # These are combined in one list to run in one process
-            # instead of big chain of one action calls.
-            set_of_commands.extend(['&&', 'sudo', 'net', 'conf', 'setparm',
-                                    share_name, param, value])
-        self._ssh_exec(server, set_of_commands)
+            batch.add(['sudo', 'net', 'conf', 'setparm',
+                       share_name, param, value])
+        try:
+            batch.flush()
+        except Exception:
+            # If we get here, then it will be useful
+            # to log parent exception too.
+            with excutils.save_and_reraise_exception():
+                if parent_e is not None:
+                    LOG.error(parent_e)
         return '//%s/%s' % (server['public_address'], share_name)
 
     def remove_export(self, server, share_name):
@@ -790,6 +1070,53 @@ class CIFSHelper(NASHelperBase):
             if not force:
                 raise
 
+    def update_access(self, server, share_name, add_rules, delete_rules):
+        """Apply all access changes with one 'hosts allow' update.
+
+        Rules of other than ip access type are skipped. If the update
+        fails, allowed hosts are added one by one to find the failing
+        rules.
+
+        :returns: IDs of the rules which failed to be applied.
+        """
+        failed_ids = self._get_invalid_rule_ids(share_name, add_rules)
+        add_rules = [access for access in add_rules
+                     if access['id'] not in failed_ids]
+        if not (add_rules or delete_rules):
+            return failed_ids
+
+        hosts = self._get_allow_hosts(server, share_name)
+        denied = set(access['access_to'] for access in delete_rules)
+        new_hosts = [host for host in hosts if host not in denied]
+        for access in add_rules:
+            if access['access_to'] not in new_hosts:
+                new_hosts.append(access['access_to'])
+        if new_hosts == hosts:
+            return failed_ids
+        try:
+            self._set_allow_hosts(server, new_hosts, share_name)
+        except exception.ProcessExecutionError as e:
+            if not add_rules:
+                raise
+            LOG.warning(_("Failed to update hosts allowed to access share "
+                          "%(share)s, adding them one by one: %(e)s"),
+                        {'share': share_name, 'e': e.stderr})
+            new_hosts = [host for host in hosts if host not in denied]
+            if new_hosts != hosts:
+                self._set_allow_hosts(server, new_hosts, share_name)
+            for access in add_rules:
+                if access['access_to'] in new_hosts:
+                    continue
+                try:
+                    self._set_allow_hosts(
+                        server, new_hosts + [access['access_to']], share_name)
+                except exception.ProcessExecutionError as e:
+                    self._log_rule_failure(share_name, access, e.stderr)
+                    failed_ids.append(access['id'])
+                else:
+                    new_hosts.append(access['access_to'])
+        return failed_ids
+
     def _get_allow_hosts(self, server, share_name):
         (out, _) = self._ssh_exec(server, ['sudo', 'net', 'conf', 'getparm',
                                            share_name, '\"hosts allow\"'])
@@ -29,8 +29,12 @@ import errno
 import os
 import pipes
 import re
+import sys
 import xml.etree.cElementTree as etree
 
+import eventlet
+from eventlet import event
+
 from manila import exception
 from manila.openstack.common import log as logging
 from manila.share import driver
@@ -48,6 +52,11 @@ GlusterfsManilaShare_opts = [
                default='$state_path/mnt',
                help='Base directory containing mount points for Gluster '
                     'volumes.'),
+    cfg.FloatOpt('glusterfs_export_dir_update_window',
+                 default=0.0,
+                 help='Time in seconds to collect concurrent access changes '
+                      'before applying them with a single gluster volume '
+                      'set command.'),
 ]
 
 CONF = cfg.CONF
@@ -85,6 +94,91 @@ class GlusterAddress(object):
         return args, kw
 
 
+class GlusterExportDirUpdater(object):
+    """Coalesces updates of the nfs.export-dir option of a volume.
+
+    Export entries of the volume are kept in memory as a {dir: [host,..]}
+    dict. Changes requested while an update is being prepared or run are
+    queued and then applied together with one volume set command. Before
+    each update the entries of the volume are compared with the ones last
+    written, entries changed outside of the driver replace the in-memory
+    ones. A change failing for one share does not affect the changes of
+    the other shares.
+    """
+
+    def __init__(self, get_export_dir_dict, set_export_dir_dict, window=0):
+        self._get_export_dir_dict = get_export_dir_dict
+        self._set_export_dir_dict = set_export_dir_dict
+        self.window = window
+        self.export_dir_dict = None
+        self._pending = []
+        self._updating = False
+
+    def update(self, edir, changes):
+        """Apply changes to the export entry of edir.
+
+        Returns once the changes are applied on the volume.
+
+        :param edir: name of share i.e. export directory
+        :param changes: list of (host, cbk) pairs, see
+                        GlusterfsShareDriver._manage_access for cbk
+        """
+        done = event.Event()
+        self._pending.append((edir, changes, done))
+        if not self._updating:
+            self._updating = True
+            try:
+                eventlet.sleep(self.window)
+                while self._pending:
+                    batch, self._pending = self._pending, []
+                    self._apply(batch)
+            finally:
+                self._updating = False
+        return done.wait()
+
+    def _load(self):
+        export_dir_dict = self._get_export_dir_dict()
+        if (self.export_dir_dict is not None and
+                export_dir_dict != self.export_dir_dict):
+            LOG.warning(_("Export entries of the GlusterFS volume were "
+                          "changed outside of the driver, reloading them."))
+        self.export_dir_dict = export_dir_dict
+
+    def _apply(self, batch):
+        failures = {}
+        try:
+            self._load()
+            export_dir_dict = dict((d, list(v)) for d, v in
+                                   self.export_dir_dict.items())
+            for edir, changes, done in batch:
+                entry = list(export_dir_dict.get(edir, []))
+                try:
+                    for host, cbk in changes:
+                        cbk(export_dir_dict, edir, host)
+                except Exception:
+                    failures[done] = sys.exc_info()
+                    LOG.exception(_("Failed to update export entry of %s."),
+                                  edir)
+                    # NOTE: the other changes are applied without these.
+                    export_dir_dict.pop(edir, None)
+                    if entry:
+                        export_dir_dict[edir] = entry
+            if export_dir_dict != self.export_dir_dict:
+                self._set_export_dir_dict(export_dir_dict)
+                self.export_dir_dict = export_dir_dict
+        except Exception:
+            self.export_dir_dict = None
+            exc_info = sys.exc_info()
+            for edir, changes, done in batch:
+                done.send_exception(*exc_info)
+        else:
+            for edir, changes, done in batch:
+                if done in failures:
+                    done.send_exception(*failures[done])
+                else:
+                    done.send()
+
+
 class GlusterfsShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     """Execute commands relating to Shares."""
 
@@ -96,6 +190,11 @@ class GlusterfsShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         self.configuration.append_config_values(GlusterfsManilaShare_opts)
         self.backend_name = self.configuration.safe_get(
             'share_backend_name') or 'GlusterFS'
+        self._export_dir_updater = GlusterExportDirUpdater(
+            lambda: self._get_export_dir_dict(),
+            lambda export_dir_dict: self._set_export_dir_dict(
+                export_dir_dict),
+            window=self.configuration.glusterfs_export_dir_update_window)
 
     def do_setup(self, context):
         """Native mount the GlusterFS volume and tune it."""
@@ -331,13 +430,26 @@ class GlusterfsShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         :type host: string
         :returns: bool (cbk leaves ddict intact) or None (cbk modifies ddict)
         """
+        self._manage_access_rules(context, share, [(access, cbk)])
 
-        if access['access_type'] != 'ip':
-            raise exception.InvalidShareAccess('only ip access type allowed')
-        export_dir_dict = self._get_export_dir_dict()
-        if cbk(export_dir_dict, share['name'], access['access_to']):
-            return
+    def _manage_access_rules(self, context, share, changes):
+        """Manage share access with a list of (access, cbk) pairs.
+
+        Changes are applied on the volume together with changes requested
+        concurrently for other shares, see _manage_access for the
+        description of cbk.
+        """
 
+        for access, cbk in changes:
+            if access['access_type'] != 'ip':
+                raise exception.InvalidShareAccess(
+                    'only ip access type allowed')
+        self._export_dir_updater.update(
+            share['name'],
+            [(access['access_to'], cbk) for access, cbk in changes])
+
+    def _set_export_dir_dict(self, export_dir_dict):
+        """Set the export entries of shares in the GlusterFS volume."""
         if export_dir_dict:
             export_dir_new = (",".join("/%s(%s)" % (d, "|".join(v))
                               for d, v in sorted(export_dir_dict.items())))
@@ -354,22 +466,52 @@ class GlusterfsShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             LOG.error(_("Error in gluster volume set: %s"), exc.stderr)
             raise
 
+    @staticmethod
+    def _allow_cbk(ddict, edir, host):
+        if edir not in ddict:
+            ddict[edir] = []
+        if host in ddict[edir]:
+            return True
+        ddict[edir].append(host)
+
+    @staticmethod
+    def _deny_cbk(ddict, edir, host):
+        if edir not in ddict or host not in ddict[edir]:
+            return True
+        ddict[edir].remove(host)
+        if not ddict[edir]:
+            ddict.pop(edir)
+
     def allow_access(self, context, share, access, share_server=None):
         """Allow access to a share."""
-        def cbk(ddict, edir, host):
-            if edir not in ddict:
-                ddict[edir] = []
-            if host in ddict[edir]:
-                return True
-            ddict[edir].append(host)
-        self._manage_access(context, share, access, cbk)
+        self._manage_access(context, share, access, self._allow_cbk)
 
     def deny_access(self, context, share, access, share_server=None):
         """Deny access to a share."""
-        def cbk(ddict, edir, host):
-            if edir not in ddict or host not in ddict[edir]:
-                return True
-            ddict[edir].remove(host)
-            if not ddict[edir]:
-                ddict.pop(edir)
-        self._manage_access(context, share, access, cbk)
+        self._manage_access(context, share, access, self._deny_cbk)
+
+    def update_access(self, context, share, add_rules, delete_rules,
+                      share_server=None):
+        """Allow and deny access rules with one gluster volume set.
+
+        Rules of other than ip access type are skipped, the other rules
+        are applied.
+        """
+        changes = ([(access, self._deny_cbk) for access in delete_rules] +
+                   [(access, self._allow_cbk) for access in add_rules])
+        failed_ids = []
+        for access, cbk in changes:
+            if access['access_type'] != 'ip':
+                LOG.error(_("Failed to update access rule %(access_id)s of "
+                            "share %(share_id)s: only ip access type "
+                            "allowed."),
+                          {'access_id': access['id'],
+                           'share_id': share['id']})
+                failed_ids.append(access['id'])
+        changes = [(access, cbk) for access, cbk in changes
+                   if access['id'] not in failed_ids]
+        if changes:
+            self._manage_access_rules(context, share, changes)
+        if failed_ids:
+            raise exception.ShareAccessUpdateFailed(access_ids=failed_ids,
+                                                    share_id=share['id'])
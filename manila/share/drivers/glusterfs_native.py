@@ -26,6 +26,7 @@ with the GlusterFS backend can mount and hence use the share.
 
 from manila import exception
 from manila.openstack.common import log as logging
+from manila.share import driver
 from manila.share.drivers import glusterfs
 
 
@@ -164,3 +165,14 @@ class GlusterfsNativeShareDriver(glusterfs.GlusterfsShareDriver):
                       {'volname': self.gluster_address.volume,
                        'option': AUTH_SSL_ALLOW, 'error': exc.stderr})
             raise
+
+    def update_access(self, context, share, add_rules, delete_rules,
+                      share_server=None):
+        """Allow and deny several access rules one by one.
+
+        Access to native shares is not managed with nfs.export-dir, hence
+        the per-rule implementation of the base driver is used.
+        """
+        driver.ShareDriver.update_access(self, context, share, add_rules,
+                                         delete_rules,
+                                         share_server=share_server)
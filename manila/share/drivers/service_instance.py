@@ -15,23 +15,28 @@
 
 """Module for managing nova instances for share drivers."""
 
+import collections
 import os
 import socket
-import threading
 import time
+import uuid
 
+import eventlet
 import netaddr
 from oslo.config import cfg
 import six
 
 from manila.common import constants
+from manila.common import waiter
 from manila import compute
 from manila import context
 from manila import exception
 from manila.network.linux import ip_lib
 from manila.network.neutron import api as neutron
 from manila.openstack.common import importutils
+from manila.openstack.common import lockutils
 from manila.openstack.common import log as logging
+from manila.openstack.common import loopingcall
 from manila import utils
 
 
@@ -89,12 +94,166 @@ server_opts = [
     cfg.BoolOpt('connect_share_server_to_tenant_network',
                 default=False,
                 help='Attach share server directly to share network.'),
+    cfg.IntOpt('service_instance_pool_size',
+               default=0,
+               help="Number of booted and SSH-reachable service instances "
+                    "kept ready to be claimed by new share servers. "
+                    "0 disables the pool."),
+    cfg.IntOpt('service_instance_pool_ttl',
+               default=0,
+               help="Seconds after which unclaimed service instances of "
+                    "the pool are deleted and replaced by new ones. "
+                    "0 keeps them until they are claimed."),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(server_opts)
 
-lock = threading.Lock()
+
+class ServiceInstancePool(object):
+    """Keeps pre-booted service instances ready to be claimed.
+
+    Instances are booted by greenthreads in the background, each on a
+    service subnet of its own which is not routed to any tenant yet.
+    They become claimable once they are active and reachable via SSH.
+    Every claim triggers a refill of the pool. Instances older than ttl
+    seconds are replaced instead of being claimed, and by expire(),
+    which is to be called periodically.
+    """
+
+    def __init__(self, create_instance, delete_instance, size, ttl=0):
+        self._create_instance = create_instance
+        self._delete_instance = delete_instance
+        self.size = size
+        self.ttl = ttl
+        self._ready = collections.deque()
+        self._booting = 0
+
+    def claim(self):
+        """Returns a ready instance, or None when the pool is empty."""
+        self._drop_expired()
+        instance = None
+        if self._ready:
+            ready_at, instance = self._ready.popleft()
+        self.refill()
+        return instance
+
+    def expire(self):
+        """Replaces instances older than ttl seconds."""
+        self._drop_expired()
+        self.refill()
+
+    def _drop_expired(self):
+        if not self.ttl:
+            return
+        # NOTE: instances are kept in order of their readiness.
+        while self._ready and time.time() - self._ready[0][0] > self.ttl:
+            ready_at, instance = self._ready.popleft()
+            LOG.debug("Replacing expired service instance %s of the pool.",
+                      instance['id'])
+            self.discard(instance)
+
+    def refill(self):
+        """Starts booting instances missing from the pool."""
+        for __ in range(self.size - len(self._ready) - self._booting):
+            self._booting += 1
+            eventlet.spawn_n(self._boot)
+
+    def _boot(self):
+        try:
+            instance = self._create_instance()
+        except Exception:
+            LOG.exception(_("Failed to boot service instance for the "
+                            "pool."))
+        else:
+            self._ready.append((time.time(), instance))
+        finally:
+            self._booting -= 1
+
+    def discard(self, instance):
+        """Deletes an instance taken from the pool in the background."""
+        eventlet.spawn_n(self._delete, instance)
+
+    def _delete(self, instance):
+        try:
+            self._delete_instance(instance)
+        except Exception:
+            LOG.exception(_("Failed to delete service instance %s of the "
+                            "pool."), instance['id'])
+
+
+class ServiceSubnetIndex(object):
+    """Local index of the subnets of the service network.
+
+    Subnets are loaded by a single list call on first use and on
+    refresh(), then kept up to date by add(), rename() and remove() as
+    the manager learns about changes of them. Free CIDRs are handed out
+    in order from a cursor over the service network CIDR, which only
+    moves past used ones.
+    """
+
+    def __init__(self, list_subnets, cidr, division_mask):
+        self._list_subnets = list_subnets
+        self._cidr = cidr
+        self._division_mask = division_mask
+        self._subnets = None
+
+    def refresh(self):
+        """Reloads all subnets of the service network."""
+        subnets = self._list_subnets()
+        self._subnets = {}
+        self._by_name = {}
+        self._used_cidrs = set()
+        self._candidates = netaddr.IPNetwork(self._cidr).subnet(
+            self._division_mask)
+        self._free_cidr = None
+        for subnet in subnets:
+            self.add(subnet)
+
+    def _load(self):
+        if self._subnets is None:
+            self.refresh()
+
+    def add(self, subnet):
+        self._load()
+        self._subnets[subnet['id']] = subnet
+        self._by_name.setdefault(subnet['name'], {})[subnet['id']] = subnet
+        self._used_cidrs.add(subnet['cidr'])
+
+    def rename(self, subnet_id, name):
+        self._load()
+        subnet = self._subnets.get(subnet_id)
+        if subnet is None:
+            return
+        del self._by_name[subnet['name']][subnet_id]
+        subnet['name'] = name
+        self._by_name.setdefault(name, {})[subnet_id] = subnet
+
+    def remove(self, subnet_id):
+        self._load()
+        subnet = self._subnets.pop(subnet_id, None)
+        if subnet is None:
+            return
+        del self._by_name[subnet['name']][subnet_id]
+        self._used_cidrs.discard(subnet['cidr'])
+
+    def get_all(self):
+        self._load()
+        return list(self._subnets.values())
+
+    def get_by_name(self, name):
+        self._load()
+        return list(self._by_name.get(name, {}).values())
+
+    def get_free_cidr(self):
+        """Returns the first CIDR not used by any subnet, or None."""
+        self._load()
+        while self._free_cidr is None or self._free_cidr in self._used_cidrs:
+            try:
+                self._free_cidr = str(next(self._candidates).cidr)
+            except StopIteration:
+                return None
+        return self._free_cidr
 
 
 class ServiceInstanceManager(object):
@@ -152,6 +311,8 @@ class ServiceInstanceManager(object):
         self.service_network_id = self._get_service_network()
         self.vif_driver = importutils.import_class(
             self.get_config_option("interface_driver"))()
+        self._connected_subnet_ids = set()
+        self._connected_interface_name = None
         self._setup_connectivity_with_service_instances()
         self.max_time_to_build_instance = self.get_config_option(
             "max_time_to_build_instance")
@@ -160,6 +321,21 @@ class ServiceInstanceManager(object):
         self.path_to_public_key = self.get_config_option("path_to_public_key")
         self.connect_share_server_to_tenant_network = self.get_config_option(
             'connect_share_server_to_tenant_network')
+        self.service_subnets = ServiceSubnetIndex(
+            lambda: self.neutron_api.list_subnets(
+                network_id=self.service_network_id),
+            self.get_config_option("service_network_cidr"),
+            self.get_config_option("service_network_division_mask"))
+        self.pool = None
+        pool_size = self.get_config_option('service_instance_pool_size')
+        if pool_size:
+            self.pool = ServiceInstancePool(
+                lambda: self._create_pool_instance(self.admin_context),
+                lambda instance: self._delete_pool_instance(
+                    self.admin_context, instance),
+                pool_size,
+                self.get_config_option('service_instance_pool_ttl'))
+            eventlet.spawn_n(self._start_pool)
 
     @utils.synchronized("service_instance_get_service_network", external=True)
     def _get_service_network(self):
@@ -263,19 +439,10 @@ class ServiceInstanceManager(object):
     def _delete_server(self, context, server_id):
         """Deletes the server."""
         self.compute_api.server_delete(context, server_id)
-        t = time.time()
-        while time.time() - t < self.max_time_to_build_instance:
-            try:
-                self.compute_api.server_get(context, server_id)
-            except exception.InstanceNotFound:
-                LOG.debug('Service instance was deleted succesfully.')
-                break
-            time.sleep(1)
-        else:
-            raise exception.ServiceInstanceException(
-                _('Instance have not '
-                  'been deleted in %ss. Giving up.') %
-                self.max_time_to_build_instance)
+        self.compute_api.wait_for_server(
+            context, server_id, lambda server: server is None,
+            self.max_time_to_build_instance)
+        LOG.debug('Service instance was deleted succesfully.')
 
     def set_up_service_instance(self, context, instance_name, neutron_net_id,
                                 neutron_subnet_id):
@@ -288,10 +455,17 @@ class ServiceInstanceManager(object):
         :returns: dict with service instance details
         :raises: exception.ServiceInstanceException
         """
-        server = self._create_service_instance(context,
+        server = None
+        if self.pool:
+            server = self._claim_pool_instance(context,
                                                instance_name,
                                                neutron_net_id,
                                                neutron_subnet_id)
+        if server is None:
+            server = self._create_service_instance(context,
+                                                   instance_name,
+                                                   neutron_net_id,
+                                                   neutron_subnet_id)
 
         return {'instance_id': server['id'],
                 'ip': server['ip'],
@@ -357,55 +531,83 @@ class ServiceInstanceManager(object):
                                  neutron_subnet_id):
         """Creates service vm and sets up networking for it."""
         service_image_id = self._get_service_image(context)
+        key_name, key_path = self._get_key(context)
+        if not (self.get_config_option("service_instance_password") or
+                key_name):
+            raise exception.ServiceInstanceException(
+                _('Neither service '
+                  'instance password nor key are available.'))
 
-        with lock:
-            key_name, key_path = self._get_key(context)
-            if not (self.get_config_option("service_instance_password") or
-                    key_name):
-                raise exception.ServiceInstanceException(
-                    _('Neither service '
-                      'instance password nor key are available.'))
+        security_group = self._get_or_create_security_group(context)
+        network_data = self._setup_network_for_instance(neutron_net_id,
+                                                        neutron_subnet_id)
+        try:
+            self._ensure_connectivity_with_subnet(
+                network_data['service_subnet'])
+        except Exception as e:
+            LOG.debug(e)
+            for port in network_data['ports']:
+                self.neutron_api.delete_port(port['id'])
+            raise
+
+        service_instance = self._boot_service_instance(
+            context, instance_name, service_image_id, key_name,
+            network_data['ports'], security_group)
 
-            security_group = self._get_or_create_security_group(context)
-            network_data = self._setup_network_for_instance(neutron_net_id,
-                                                            neutron_subnet_id)
-            try:
-                self._setup_connectivity_with_service_instances()
-            except Exception as e:
-                LOG.debug(e)
-                for port in network_data['ports']:
-                    self.neutron_api.delete_port(port['id'])
-                raise
+        router, service_subnet, service_port = (
+            network_data['router'], network_data['service_subnet'],
+            network_data['service_port']
+        )
 
+        service_instance['ip'] = self._get_server_ip(service_instance)
+        service_instance['pk_path'] = key_path
+        service_instance['router_id'] = router['id']
+        service_instance['subnet_id'] = service_subnet['id']
+        service_instance['port_id'] = service_port['id']
+
+        try:
+            public_ip = network_data['public_port']
+        except KeyError:
+            public_ip = network_data['service_port']
+        public_ip = public_ip['fixed_ips']
+        public_ip = public_ip[0]
+        public_ip = public_ip['ip_address']
+
+        service_instance['public_address'] = public_ip
+
+        if not self._check_server_availability(service_instance):
+            raise exception.ServiceInstanceException(
+                _('SSH connection have not been '
+                  'established in %ss. Giving up.') %
+                self.max_time_to_build_instance)
+
+        return service_instance
+
+    def _boot_service_instance(self, context, instance_name, image_id,
+                               key_name, ports, security_group):
+        """Boots service vm with given ports and waits for it to be active."""
         service_instance = self.compute_api.server_create(
             context,
             name=instance_name,
-            image=service_image_id,
+            image=image_id,
             flavor=self.get_config_option("service_instance_flavor_id"),
             key_name=key_name,
-            nics=[{'port-id': port['id']} for port in network_data['ports']])
+            nics=[{'port-id': port['id']} for port in ports])
 
-        t = time.time()
-        while time.time() - t < self.max_time_to_build_instance:
-            # NOTE(vponomaryov): emptiness of 'networks' field is checked as
-            #                    workaround for nova/neutron bug #1210483.
-            if (service_instance['status'] == 'ACTIVE' and
-                    service_instance.get('networks', {})):
-                break
-            if service_instance['status'] == 'ERROR':
+        def is_active(server):
+            # NOTE: a new server may not be shown yet.
+            if server is None:
+                return False
+            if server['status'] == 'ERROR':
                 raise exception.ServiceInstanceException(
                     _('Failed to build service instance.'))
-            time.sleep(1)
-            try:
-                service_instance = self.compute_api.server_get(
-                    context,
-                    service_instance['id'])
-            except exception.InstanceNotFound as e:
-                LOG.debug(e)
-        else:
-            raise exception.ServiceInstanceException(
-                _('Instance have not been spawned in %ss. Giving up.') %
-                self.max_time_to_build_instance)
+            # NOTE(vponomaryov): emptiness of 'networks' field is checked as
+            #                    workaround for nova/neutron bug #1210483.
+            return bool(server['status'] == 'ACTIVE' and
+                        server.get('networks', {}))
+        service_instance = self.compute_api.wait_for_server(
+            context, service_instance['id'], is_active,
+            self.max_time_to_build_instance, server=service_instance)
 
         if security_group:
             LOG.debug("Adding security group "
@@ -414,38 +616,165 @@ class ServiceInstanceManager(object):
             self.compute_api.add_security_group_to_server(
                 context,
                 service_instance["id"], security_group.id)
+        return service_instance
 
-        router, service_subnet, service_port = (
-            network_data['router'], network_data['service_subnet'],
-            network_data['service_port']
-        )
+    def _get_pool_instance_name_prefix(self):
+        """Returns prefix of names of service vms of the pool.
+
+        The prefix is unique per host and backend, so that hosts remove
+        only leftovers of their own pools.
+        """
+        if self.driver_config:
+            return 'manila_service_pool_%s_%s_' % (
+                CONF.host, self.driver_config.config_group)
+        return 'manila_service_pool_%s_' % CONF.host
 
+    def _start_pool(self):
+        """Removes pool leftovers of previous runs and fills the pool."""
+        prefix = self._get_pool_instance_name_prefix()
+        try:
+            for server in self.compute_api.server_list(
+                    self.admin_context, search_opts={'name': '^' + prefix},
+                    all_tenants=True):
+                if server['name'].startswith(prefix):
+                    LOG.debug("Deleting service instance %s left in the "
+                              "pool by previous run.", server['id'])
+                    self._delete_server(self.admin_context, server['id'])
+            for subnet in self._get_all_service_subnets():
+                if subnet['name'].startswith(prefix):
+                    self._rename_service_subnet(subnet['id'], '')
+        except Exception:
+            LOG.exception(_("Failed to remove service instances left in "
+                            "the pool by previous run."))
+        self.pool.refill()
+        if self.pool.ttl:
+            self._pool_expiry = loopingcall.FixedIntervalLoopingCall(
+                self.pool.expire)
+            self._pool_expiry.start(interval=min(self.pool.ttl, 60))
+
+    def _create_pool_instance(self, context):
+        """Creates service vm of the pool on a service subnet of its own.
+
+        The service subnet is named after the vm and is connected to a
+        tenant router only when the vm is claimed.
+        """
+        instance_name = (self._get_pool_instance_name_prefix() +
+                         str(uuid.uuid4()))
+        service_image_id = self._get_service_image(context)
+        key_name, key_path = self._get_key(context)
+        if not (self.get_config_option("service_instance_password") or
+                key_name):
+            raise exception.ServiceInstanceException(
+                _('Neither service '
+                  'instance password nor key are available.'))
+
+        security_group = self._get_or_create_security_group(context)
+        service_subnet, service_port = self._setup_pool_network(
+            instance_name)
+        try:
+            self._ensure_connectivity_with_subnet(service_subnet)
+        except Exception as e:
+            LOG.debug(e)
+            self.neutron_api.delete_port(service_port['id'])
+            self._rename_service_subnet(service_subnet['id'], '')
+            raise
+
+        service_instance = self._boot_service_instance(
+            context, instance_name, service_image_id, key_name,
+            [service_port], security_group)
         service_instance['ip'] = self._get_server_ip(service_instance)
         service_instance['pk_path'] = key_path
-        service_instance['router_id'] = router['id']
         service_instance['subnet_id'] = service_subnet['id']
         service_instance['port_id'] = service_port['id']
 
-        try:
-            public_ip = network_data['public_port']
-        except KeyError:
-            public_ip = network_data['service_port']
-        public_ip = public_ip['fixed_ips']
-        public_ip = public_ip[0]
-        public_ip = public_ip['ip_address']
-
-        service_instance['public_address'] = public_ip
-
         if not self._check_server_availability(service_instance):
+            self._delete_pool_instance(context, service_instance)
             raise exception.ServiceInstanceException(
                 _('SSH connection have not been '
                   'established in %ss. Giving up.') %
                 self.max_time_to_build_instance)
+        return service_instance
 
+    def _setup_pool_network(self, instance_name):
+        """Sets up service subnet and port for service vm of the pool."""
+        service_subnet = self._get_or_create_service_subnet(instance_name)
+        service_port = self.neutron_api.create_port(
+            self.service_tenant_id, self.service_network_id,
+            subnet_id=service_subnet['id'], device_owner='manila')
+        return service_subnet, service_port
+
+    def _delete_pool_instance(self, context, instance):
+        """Deletes service vm of the pool and frees its service subnet."""
+        router_id = instance.get('router_id')
+        self.delete_service_instance(context, instance['id'],
+                                     instance['subnet_id'], router_id)
+        if not router_id:
+            self._rename_service_subnet(instance['subnet_id'], '')
+
+    def _claim_pool_instance(self, context, instance_name, neutron_net_id,
+                             neutron_subnet_id):
+        """Claims service vm of the pool and connects it to the tenant.
+
+        The service subnet of the vm is attached to the router of the
+        tenant subnet and named as routed to it, and, if configured, a
+        port in the tenant network is attached to the vm. Returns None
+        when no vm of the pool could be claimed or the tenant subnet has
+        a service subnet already.
+        """
+        subnet_name = "routed_to_%s" % neutron_subnet_id
+        with lockutils.lock('service_instance_setup_network_for_%s' %
+                            neutron_subnet_id, lock_file_prefix='manila-',
+                            external=True):
+            if self._find_service_subnets(subnet_name):
+                # NOTE: service vms routed to the same tenant subnet share
+                # a service subnet, vms of the pool have subnets of their
+                # own.
+                LOG.debug("Tenant subnet %s has a service subnet already, "
+                          "the pool is not used.", neutron_subnet_id)
+                return None
+            service_instance = self.pool.claim()
+            if service_instance is None:
+                LOG.debug("No service instance is ready in the pool.")
+                return None
+
+            public_port = None
+            try:
+                router = self._get_private_router(neutron_net_id,
+                                                  neutron_subnet_id)
+                self.neutron_api.router_add_interface(
+                    router['id'], service_instance['subnet_id'])
+                service_instance['router_id'] = router['id']
+                self._rename_service_subnet(service_instance['subnet_id'],
+                                            subnet_name)
+                self.compute_api.server_update(
+                    context, service_instance['id'], instance_name)
+                if self.connect_share_server_to_tenant_network:
+                    public_port = self.neutron_api.create_port(
+                        self.service_tenant_id, neutron_net_id,
+                        subnet_id=neutron_subnet_id, device_owner='manila')
+                    self.compute_api.server_interface_attach(
+                        context, service_instance['id'], public_port['id'])
+            except Exception:
+                LOG.exception(_("Failed to claim service instance %s of "
+                                "the pool."), service_instance['id'])
+                if public_port:
+                    self.neutron_api.delete_port(public_port['id'])
+                self.pool.discard(service_instance)
+                return None
+
+        if public_port:
+            service_instance['public_address'] = (
+                public_port['fixed_ips'][0]['ip_address'])
+        else:
+            service_instance['public_address'] = service_instance['ip']
+        LOG.debug("Claimed service instance %(id)s of the pool for "
+                  "%(name)s.", {'id': service_instance['id'],
+                                'name': instance_name})
         return service_instance
 
     def _check_server_availability(self, server):
         t = time.time()
+        delays = waiter.backoff(1, 5)
         while time.time() - t < self.max_time_to_build_instance:
             LOG.debug('Checking service vm availablity.')
             try:
@@ -455,41 +784,46 @@ class ServiceInstanceManager(object):
             except socket.error as e:
                 LOG.debug(e)
                 LOG.debug('Server is not available through ssh. Waiting...')
-                time.sleep(5)
+                time.sleep(next(delays))
         return False
 
-    @utils.synchronized(
-        "service_instance_setup_network_for_instance", external=True)
     def _setup_network_for_instance(self, neutron_net_id, neutron_subnet_id):
-        """Sets up network for service vm."""
+        """Sets up network for service vm.
+
+        Only service vms routed to the same tenant subnet share a service
+        subnet and a router interface, so network setups for different
+        tenant subnets do not wait for each other.
+        """
 
         network_data = dict()
 
         # We get/create subnet for service instance that is routed to
         # subnet provided in args.
         subnet_name = "routed_to_%s" % neutron_subnet_id
-        service_subnet = self._get_service_subnet(subnet_name)
-        if not service_subnet:
-            service_subnet = self.neutron_api.subnet_create(
-                self.service_tenant_id,
-                self.service_network_id,
-                subnet_name,
-                self._get_cidr_for_subnet()
-            )
-
-        network_data['service_subnet'] = service_subnet
-        network_data['router'] = router = self._get_private_router(
-            neutron_net_id, neutron_subnet_id)
-        try:
-            self.neutron_api.router_add_interface(router['id'],
-                                                  service_subnet['id'])
-        except exception.NetworkException as e:
-            if e.kwargs['code'] != 400:
-                raise
-            LOG.debug('Subnet %(subnet_id)s is already attached to the '
-                      'router %(router_id)s.' %
-                      {'subnet_id': service_subnet['id'],
-                       'router_id': router['id']})
+        with lockutils.lock('service_instance_setup_network_for_%s' %
+                            neutron_subnet_id, lock_file_prefix='manila-',
+                            external=True):
+            service_subnet = self._get_or_create_service_subnet(subnet_name)
+            network_data['service_subnet'] = service_subnet
+            network_data['router'] = router = self._get_private_router(
+                neutron_net_id, neutron_subnet_id)
+            try:
+                self.neutron_api.router_add_interface(router['id'],
+                                                      service_subnet['id'])
+            except exception.NetworkException as e:
+                if e.kwargs['code'] != 400:
+                    raise
+                if not self._is_subnet_attached_to_router(
+                        service_subnet['id'], router['id']):
+                    raise exception.ServiceInstanceException(
+                        _('Service subnet %(subnet_id)s is attached to '
+                          'another router than %(router_id)s.') %
+                        {'subnet_id': service_subnet['id'],
+                         'router_id': router['id']})
+                LOG.debug('Subnet %(subnet_id)s is already attached to the '
+                          'router %(router_id)s.' %
+                          {'subnet_id': service_subnet['id'],
+                           'router_id': router['id']})
 
         network_data['service_port'] = self.neutron_api.create_port(
             self.service_tenant_id, self.service_network_id,
@@ -509,7 +843,6 @@ class ServiceInstanceManager(object):
 
         return network_data
 
-    @utils.synchronized("service_instance_get_private_router", external=True)
     def _get_private_router(self, neutron_net_id, neutron_subnet_id):
         """Returns router attached to private subnet gateway."""
         private_subnet = self.neutron_api.get_subnet(neutron_subnet_id)
@@ -531,6 +864,28 @@ class ServiceInstanceManager(object):
             private_subnet_gateway_port['device_id'])
         return private_subnet_router
 
+    def _is_subnet_attached_to_router(self, subnet_id, router_id):
+        """Checks that subnet has an interface on the router."""
+        for port in self.neutron_api.list_ports(device_id=router_id):
+            for fixed_ip in port['fixed_ips']:
+                if fixed_ip.get('subnet_id') == subnet_id:
+                    return True
+        return False
+
+    def _ensure_connectivity_with_subnet(self, service_subnet):
+        """Sets up connectivity with service subnet if not done yet.
+
+        Connectivity with all service subnets is set up at start-up, it is
+        set up again for service subnets created after that and when the
+        network device of the service port has gone.
+        """
+        if (service_subnet['id'] not in self._connected_subnet_ids or
+                not ip_lib.device_exists(self._connected_interface_name)):
+            self._setup_connectivity_with_service_instances()
+
+    @utils.synchronized(
+        "service_instance_setup_connectivity_with_service_instances",
+        external=True)
     def _setup_connectivity_with_service_instances(self):
         """Sets up connectivity with service instances.
 
@@ -556,9 +911,10 @@ class ServiceInstanceManager(object):
 
         # here we are checking for garbage devices from removed service port
         self._remove_outdated_interfaces(device)
+        self._connected_subnet_ids = set(
+            fixed_ip['subnet_id'] for fixed_ip in port['fixed_ips'])
+        self._connected_interface_name = interface_name
 
-    @utils.synchronized(
-        "service_instance_remove_outdated_interfaces", external=True)
     def _remove_outdated_interfaces(self, device):
         """Finds and removes unused network device."""
         list_dev = []
@@ -577,7 +933,6 @@ class ServiceInstanceManager(object):
             if device_cidr_set & cidr_set:
                 self.vif_driver.unplug(dev_name)
 
-    @utils.synchronized("service_instance_get_service_port", external=True)
     def _get_service_port(self):
         """Find or creates service neutron port.
 
@@ -605,8 +960,6 @@ class ServiceInstanceManager(object):
             port = ports[0]
         return port
 
-    @utils.synchronized(
-        "service_instance_add_fixed_ips_to_service_port", external=True)
     def _add_fixed_ips_to_service_port(self, port):
         network = self.neutron_api.get_network(self.service_network_id)
         subnets = set(network['subnets'])
@@ -628,17 +981,38 @@ class ServiceInstanceManager(object):
 
     def _get_cidr_for_subnet(self):
         """Returns not used cidr for service subnet creating."""
-        subnets = self._get_all_service_subnets()
-        used_cidrs = set(subnet['cidr'] for subnet in subnets)
-        serv_cidr = netaddr.IPNetwork(
-            self.get_config_option("service_network_cidr"))
-        division_mask = self.get_config_option("service_network_division_mask")
-        for subnet in serv_cidr.subnet(division_mask):
-            cidr = str(subnet.cidr)
-            if cidr not in used_cidrs:
-                return cidr
-        else:
+        cidr = self.service_subnets.get_free_cidr()
+        if cidr is None:
             raise exception.ServiceInstanceException(_('No available cidrs.'))
+        return cidr
+
+    def _create_service_subnet(self, subnet_name):
+        """Creates service subnet with a not used cidr."""
+        try:
+            service_subnet = self.neutron_api.subnet_create(
+                self.service_tenant_id,
+                self.service_network_id,
+                subnet_name,
+                self._get_cidr_for_subnet()
+            )
+        except exception.NetworkException as e:
+            # NOTE: subnets created by other hosts are not in the index,
+            # one of them may use the cidr.
+            LOG.debug('Failed to create service subnet, retrying with '
+                      'reloaded service subnets: %s', e)
+            self.service_subnets.refresh()
+            service_subnet = self.neutron_api.subnet_create(
+                self.service_tenant_id,
+                self.service_network_id,
+                subnet_name,
+                self._get_cidr_for_subnet()
+            )
+        self.service_subnets.add(service_subnet)
+        return service_subnet
+
+    def _rename_service_subnet(self, subnet_id, name):
+        self.neutron_api.update_subnet(subnet_id, name)
+        self.service_subnets.rename(subnet_id, name)
 
     def delete_service_instance(self, context, instance_id, subnet_id,
                                 router_id):
@@ -658,29 +1032,65 @@ class ServiceInstanceManager(object):
                           'router %(router_id)s.' %
                           {'subnet_id': subnet_id,
                            'router_id': router_id})
-            self.neutron_api.update_subnet(subnet_id, '')
+            self._rename_service_subnet(subnet_id, '')
+
+    def _check_service_subnet_name(self, service_subnet, name):
+        """Checks that service subnet of the index still has given name.
+
+        The index is updated when the subnet was renamed or deleted.
+        """
+        try:
+            subnet = self.neutron_api.get_subnet(service_subnet['id'])
+        except exception.NetworkException as e:
+            if e.kwargs.get('code') != 404:
+                raise
+            self.service_subnets.remove(service_subnet['id'])
+            return False
+        if subnet['name'] != name:
+            self.service_subnets.rename(service_subnet['id'], subnet['name'])
+            return False
+        return True
 
-    @utils.synchronized(
-        "service_instance_get_all_service_subnets", external=True)
     def _get_all_service_subnets(self):
-        service_network = self.neutron_api.get_network(self.service_network_id)
-        return [self.neutron_api.get_subnet(subnet_id)
-                for subnet_id in service_network['subnets']]
+        return self.service_subnets.get_all()
 
     @utils.synchronized("service_instance_get_service_subnet", external=True)
+    def _get_or_create_service_subnet(self, subnet_name):
+        """Returns service subnet with given name, creates it if missing."""
+        return (self._get_service_subnet(subnet_name) or
+                self._create_service_subnet(subnet_name))
+
+    def _find_service_subnets(self, subnet_name):
+        """Returns service subnets with given name.
+
+        Other managers may have renamed or deleted subnets of the index
+        meanwhile, so every subnet found in it is checked with neutron.
+        """
+        service_subnets = [
+            service_subnet for service_subnet in
+            self.service_subnets.get_by_name(subnet_name)
+            if self._check_service_subnet_name(service_subnet, subnet_name)]
+        if not service_subnets and subnet_name:
+            # NOTE: subnets created by other hosts are not in the index.
+            service_subnets = [
+                service_subnet for service_subnet in
+                self.neutron_api.list_subnets(
+                    network_id=self.service_network_id, name=subnet_name)
+                if service_subnet['name'] == subnet_name]
+            for service_subnet in service_subnets:
+                self.service_subnets.add(service_subnet)
+        return service_subnets
+
     def _get_service_subnet(self, subnet_name):
-        all_service_subnets = self._get_all_service_subnets()
-        service_subnets = [subnet for subnet in all_service_subnets
-                           if subnet['name'] == subnet_name]
+        service_subnets = self._find_service_subnets(subnet_name)
         if len(service_subnets) == 1:
             return service_subnets[0]
         elif not service_subnets:
-            unused_service_subnets = [subnet for subnet in all_service_subnets
-                                      if subnet['name'] == '']
-            if unused_service_subnets:
-                service_subnet = unused_service_subnets[0]
-                self.neutron_api.update_subnet(service_subnet['id'],
-                                               subnet_name)
+            for service_subnet in self.service_subnets.get_by_name(''):
+                if not self._check_service_subnet_name(service_subnet, ''):
+                    continue
+                self._rename_service_subnet(service_subnet['id'],
+                                            subnet_name)
                 return service_subnet
             return None
         else:
@@ -19,6 +19,11 @@
 :share_driver: Used by :class:`ShareManager`.
 """
 
+import collections
+import time
+
+import eventlet
+from eventlet import semaphore
 from oslo.config import cfg
 import six
 
@@ -45,6 +50,14 @@ share_manager_opts = [
                 default=False,
                 help='Whether share servers will '
                      'be deleted on deletion of the last share.'),
+    cfg.IntOpt('ensure_share_workers',
+               default=1,
+               help='Number of greenthreads used to re-export shares and '
+                    're-apply their access rules on service start-up.'),
+    cfg.IntOpt('ensure_share_workers_per_share_server',
+               default=1,
+               help='Maximum number of shares of one share server that '
+                    'are re-exported concurrently on service start-up.'),
 ]
 
 CONF = cfg.CONF
@@ -77,43 +90,13 @@ class ShareManager(manager.SchedulerDependentManager):
         self.driver.do_setup(ctxt)
         self.driver.check_for_setup_error()
 
+        started_at = time.time()
         shares = self.db.share_get_all_by_host(ctxt, self.host)
-        LOG.debug("Re-exporting %s shares", len(shares))
+
+        available_shares = []
         for share in shares:
             if share['status'] == 'available':
-                share_server = self._get_share_server(ctxt, share)
-                try:
-                    self.driver.ensure_share(
-                        ctxt, share, share_server=share_server)
-                except Exception as e:
-                    LOG.error(
-                        _("Caught exception trying ensure share '%(s_id)s'. "
-                          "Exception: \n%(e)s."),
-                        {'s_id': share['id'], 'e': six.text_type(e)},
-                    )
-                    continue
-                rules = self.db.share_access_get_all_for_share(ctxt,
-                                                               share['id'])
-                for access_ref in rules:
-                    if access_ref['state'] == access_ref.STATE_ACTIVE:
-                        try:
-                            self.driver.allow_access(ctxt, share,
-                                                     access_ref,
-                                                     share_server=share_server)
-                        except exception.ShareAccessExists:
-                            pass
-                        except Exception as e:
-                            LOG.error(
-                                _("Unexpected exception during share access"
-                                  " allow operation. Share id is '%(s_id)s'"
-                                  ", access rule type is '%(ar_type)s', "
-                                  "access rule id is '%(ar_id)s', exception"
-                                  " is '%(e)s'."),
-                                {'s_id': share['id'],
-                                 'ar_type': access_ref['access_type'],
-                                 'ar_id': access_ref['id'],
-                                 'e': six.text_type(e)},
-                            )
+                available_shares.append(share)
             else:
                 LOG.info(
                     _("Share %(name)s: skipping export, because it has "
@@ -121,8 +104,106 @@ class ShareManager(manager.SchedulerDependentManager):
                     {'name': share['name'], 'status': share['status']},
                 )
 
+        rules_by_share = collections.defaultdict(list)
+        for access_ref in self.db.share_access_get_all_for_shares(
+                ctxt, [share['id'] for share in available_shares]):
+            rules_by_share[access_ref['share_id']].append(access_ref)
+        LOG.debug("Fetched %(shares)s shares and %(rules)s access rules "
+                  "in %(time).2fs",
+                  {'shares': len(shares),
+                   'rules': sum(len(r) for r in rules_by_share.values()),
+                   'time': time.time() - started_at})
+
+        LOG.debug("Re-exporting %s shares", len(available_shares))
+        self._ensure_shares(ctxt, available_shares, rules_by_share)
+        LOG.info(_("Re-exported %(count)s shares in %(time).2fs."),
+                 {'count': len(available_shares),
+                  'time': time.time() - started_at})
+
         self.publish_service_capabilities(ctxt)
 
+    def _ensure_shares(self, context, shares, rules_by_share):
+        """Re-exports shares and re-applies their active access rules.
+
+        Shares are processed by a pool of 'ensure_share_workers'
+        greenthreads, at most 'ensure_share_workers_per_share_server'
+        of them working on shares of the same share server at a time.
+        """
+        pool = eventlet.GreenPool(self.configuration.ensure_share_workers)
+        server_semaphores = collections.defaultdict(
+            lambda: semaphore.Semaphore(
+                self.configuration.ensure_share_workers_per_share_server))
+        stats = {'done': 0, 'ensure_time': 0.0, 'access_time': 0.0}
+        report_every = max(1, len(shares) // 10)
+
+        def _ensure(share):
+            rules = rules_by_share.get(share['id'], [])
+            try:
+                share_server = self._get_share_server(context, share)
+                if share.get('share_server_id'):
+                    with server_semaphores[share['share_server_id']]:
+                        self._ensure_share(context, share, share_server,
+                                           rules, stats)
+                else:
+                    self._ensure_share(context, share, share_server, rules,
+                                       stats)
+            except Exception:
+                LOG.exception(_("Failed to re-export share %s."),
+                              share['id'])
+            stats['done'] += 1
+            if stats['done'] % report_every == 0:
+                LOG.info(_("Re-exported %(done)s of %(total)s shares."),
+                         {'done': stats['done'], 'total': len(shares)})
+
+        for share in shares:
+            pool.spawn_n(_ensure, share)
+        pool.waitall()
+
+        LOG.debug("Spent %(ensure).2fs in ensure_share and %(access).2fs "
+                  "in update_access calls to the driver.",
+                  {'ensure': stats['ensure_time'],
+                   'access': stats['access_time']})
+
+    def _ensure_share(self, context, share, share_server, rules, stats):
+        started_at = time.time()
+        try:
+            self.driver.ensure_share(
+                context, share, share_server=share_server)
+        except Exception as e:
+            LOG.error(
+                _("Caught exception trying ensure share '%(s_id)s'. "
+                  "Exception: \n%(e)s."),
+                {'s_id': share['id'], 'e': six.text_type(e)},
+            )
+            return
+        finally:
+            stats['ensure_time'] += time.time() - started_at
+
+        active_rules = [access_ref for access_ref in rules
+                        if access_ref['state'] == access_ref.STATE_ACTIVE]
+        if not active_rules:
+            return
+        started_at = time.time()
+        failed_ids = []
+        try:
+            self.driver.update_access(context, share, active_rules, [],
+                                      share_server=share_server)
+        except Exception as e:
+            LOG.error(
+                _("Unexpected exception during re-applying of access rules"
+                  " of share '%(s_id)s', exception is '%(e)s'."),
+                {'s_id': share['id'], 'e': six.text_type(e)},
+            )
+            # NOTE: only rules reported by the driver are known to be
+            # wrong, other failures leave the rules to the next start-up.
+            if isinstance(e, exception.ShareAccessUpdateFailed):
+                failed_ids = e.kwargs['access_ids']
+        finally:
+            stats['access_time'] += time.time() - started_at
+        if failed_ids:
+            self.db.share_access_update_many(
+                context, failed_ids, {'state': active_rules[0].STATE_ERROR})
+
     def _provide_share_server_for_share(self, context, share_network_id,
                                         share_id):
         """Gets or creates share_server and updates share with its id.
@@ -261,8 +342,14 @@ class ShareManager(manager.SchedulerDependentManager):
             project_id = context.project_id
         rules = self.db.share_access_get_all_for_share(context, share_id)
         try:
-            for access_ref in rules:
-                self._deny_access(context, access_ref, share_ref, share_server)
+            denied_ids = []
+            try:
+                for access_ref in rules:
+                    self._deny_access_in_driver(context, access_ref,
+                                                share_ref, share_server)
+                    denied_ids.append(access_ref['id'])
+            finally:
+                self.db.share_access_delete_many(context, denied_ids)
             self.driver.delete_share(context, share_ref,
                                      share_server=share_server)
         except Exception:
@@ -381,15 +468,20 @@ class ShareManager(manager.SchedulerDependentManager):
         self._deny_access(context, access_ref, share_ref, share_server)
 
     def _deny_access(self, context, access_ref, share_ref, share_server):
-        access_id = access_ref['id']
+        self._deny_access_in_driver(context, access_ref, share_ref,
+                                    share_server)
+        self.db.share_access_delete(context, access_ref['id'])
+
+    def _deny_access_in_driver(self, context, access_ref, share_ref,
+                               share_server):
         try:
             self.driver.deny_access(context, share_ref, access_ref,
                                     share_server=share_server)
         except Exception:
             with excutils.save_and_reraise_exception():
                 self.db.share_access_update(
-                    context, access_id, {'state': access_ref.STATE_ERROR})
-        self.db.share_access_delete(context, access_id)
+                    context, access_ref['id'],
+                    {'state': access_ref.STATE_ERROR})
 
     @manager.periodic_task
     def _report_driver_status(self, context):
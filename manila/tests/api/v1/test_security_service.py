@@ -151,3 +151,35 @@ class ShareApiTest(test.TestCase):
              }
         ]}
         self.assertEqual(res_dict, expected)
+
+    @mock.patch.object(db, 'security_service_get_all', mock.Mock())
+    def test_security_service_list_filters_and_pagination(self):
+        db.security_service_get_all.return_value = [self.security_service]
+        req = fakes.HTTPRequest.blank(
+            '/security_services/detail?all_tenants=1&status=new&limit=1'
+            '&marker=fake_marker&sort_key=name', use_admin_context=True)
+        res_dict = self.controller.detail(req)
+        self.assertEqual({'security_services': [self.security_service]},
+                         res_dict)
+        db.security_service_get_all.assert_called_once_with(
+            req.environ['manila.context'], filters={'status': 'new'},
+            limit=1, offset=None, marker='fake_marker', sort_key='name',
+            sort_dir=None)
+
+    @mock.patch.object(db, 'security_service_get_all_by_project',
+                       mock.Mock(return_value=[]))
+    def test_security_service_list_summary_columns(self):
+        req = fakes.HTTPRequest.blank('/security_services?offset=2')
+        self.controller.index(req)
+        db.security_service_get_all_by_project.assert_called_once_with(
+            req.environ['manila.context'], 'fake', filters={},
+            limit=1000, offset=2, marker=None, sort_key=None, sort_dir=None,
+            columns=('id', 'name', 'type', 'status'))
+
+    @mock.patch.object(db, 'security_service_get_all_by_project',
+                       mock.Mock(side_effect=exception.InvalidInput(
+                           reason='fake')))
+    def test_security_service_list_invalid_input(self):
+        req = fakes.HTTPRequest.blank('/security_services?sort_key=fake')
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
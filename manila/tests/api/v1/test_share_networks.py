@@ -194,7 +194,9 @@ class ShareNetworkAPITest(test.TestCase):
 
             db_api.share_network_get_all_by_project.assert_called_once_with(
                 self.context,
-                self.context.project_id)
+                self.context.project_id,
+                filters={},
+                columns=self.controller._view_builder.summary_columns)
 
             self.assertEqual(len(result[share_networks.RESOURCES_NAME]), 1)
             self._check_share_network_view_shortened(
@@ -211,13 +213,36 @@ class ShareNetworkAPITest(test.TestCase):
 
             db_api.share_network_get_all_by_project.assert_called_once_with(
                 self.context,
-                self.context.project_id)
+                self.context.project_id,
+                filters={},
+                columns=self.controller._view_builder.detail_columns)
 
             self.assertEqual(len(result[share_networks.RESOURCES_NAME]), 1)
             self._check_share_network_view(
                 result[share_networks.RESOURCES_NAME][0],
                 fake_share_network)
 
+    @mock.patch.object(db_api, 'share_network_get_all',
+                       mock.Mock(return_value=[]))
+    def test_index_filters_and_pagination(self):
+        req = fakes.HTTPRequest.blank(
+            '/share-networks?all_tenants=1&name=fake&limit=2&marker=fake_id'
+            '&sort_key=name&sort_dir=asc')
+        self.controller.index(req)
+        db_api.share_network_get_all.assert_called_once_with(
+            req.environ['manila.context'], filters={'name': 'fake'},
+            limit=2, offset=None, marker='fake_id', sort_key='name',
+            sort_dir='asc',
+            columns=self.controller._view_builder.summary_columns)
+
+    @mock.patch.object(db_api, 'share_network_get_all_by_project',
+                       mock.Mock(side_effect=exception.InvalidInput(
+                           reason='fake')))
+    def test_index_invalid_input(self):
+        req = fakes.HTTPRequest.blank('/share-networks?sort_key=fake')
+        self.assertRaises(webob_exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     @mock.patch.object(db_api, 'share_network_get', mock.Mock())
     def test_update_nominal(self):
         share_nw = 'fake network id'
@@ -167,55 +167,54 @@ class ShareServerAPITest(test.TestCase):
         result = self.controller.index(FakeRequestAdmin)
         policy.check_policy.assert_called_once_with(
             CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
+        db_api.share_server_get_all.assert_called_once_with(CONTEXT,
+                                                            filters={})
         self.assertEqual(result, fake_share_server_list)
 
-    def test_index_host_filter(self):
-        result = self.controller.index(FakeRequestWithHost)
+    def _check_index_filter(self, request, servers):
+        db_api.share_server_get_all.return_value = [
+            fake_share_server_get_all()[i] for i in servers]
+        result = self.controller.index(request)
         policy.check_policy.assert_called_once_with(
             CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(result['share_servers'],
-                         [fake_share_server_list['share_servers'][0]])
+        db_api.share_server_get_all.assert_called_once_with(
+            CONTEXT, filters=request.GET)
+        self.assertEqual(
+            [fake_share_server_list['share_servers'][i] for i in servers],
+            result['share_servers'])
+
+    def test_index_host_filter(self):
+        self._check_index_filter(FakeRequestWithHost, [0])
 
     def test_index_status_filter(self):
-        result = self.controller.index(FakeRequestWithStatus)
-        policy.check_policy.assert_called_once_with(
-            CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(result['share_servers'],
-                         [fake_share_server_list['share_servers'][1]])
+        self._check_index_filter(FakeRequestWithStatus, [1])
 
     def test_index_project_id_filter(self):
-        result = self.controller.index(FakeRequestWithProjectId)
-        policy.check_policy.assert_called_once_with(
-            CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(result['share_servers'],
-                         [fake_share_server_list['share_servers'][0]])
+        self._check_index_filter(FakeRequestWithProjectId, [0])
 
     def test_index_share_network_filter_by_name(self):
-        result = self.controller.index(FakeRequestWithShareNetworkName)
-        policy.check_policy.assert_called_once_with(
-            CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(result['share_servers'],
-                         [fake_share_server_list['share_servers'][0]])
+        self._check_index_filter(FakeRequestWithShareNetworkName, [0])
 
     def test_index_share_network_filter_by_id(self):
-        result = self.controller.index(FakeRequestWithShareNetworkId)
-        policy.check_policy.assert_called_once_with(
-            CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(result['share_servers'],
-                         [fake_share_server_list['share_servers'][0]])
+        self._check_index_filter(FakeRequestWithShareNetworkId, [0])
 
     def test_index_fake_filter(self):
-        result = self.controller.index(FakeRequestWithFakeFilter)
-        policy.check_policy.assert_called_once_with(
-            CONTEXT, share_servers.RESOURCE_NAME, 'index')
-        db_api.share_server_get_all.assert_called_once_with(CONTEXT)
-        self.assertEqual(len(result['share_servers']), 0)
+        self._check_index_filter(FakeRequestWithFakeFilter, [])
+
+    def test_index_pagination(self):
+        request = FakeRequestAdmin()
+        request.GET = {'host': 'fake_host', 'limit': '1',
+                       'marker': 'fake_marker', 'sort_key': 'host'}
+        self.controller.index(request)
+        db_api.share_server_get_all.assert_called_once_with(
+            CONTEXT, filters={'host': 'fake_host'}, limit=1, offset=None,
+            marker='fake_marker', sort_key='host')
+
+    def test_index_invalid_input(self):
+        db_api.share_server_get_all.side_effect = exception.InvalidInput(
+            reason='fake')
+        self.assertRaises(exc.HTTPBadRequest,
+                          self.controller.index, FakeRequestAdmin)
 
     def test_show(self):
         self.stubs.Set(db_api, 'share_server_get',
@@ -15,9 +15,11 @@
 
 import datetime
 
+import mock
 import webob
 
 from manila.api.v1 import share_snapshots
+from manila import exception
 from manila.share import api as share_api
 from manila import test
 from manila.tests.api.contrib import stubs
@@ -198,6 +200,26 @@ class ShareSnapshotApiTest(test.TestCase):
         }
         self.assertEqual(res_dict, expected)
 
+    def test_snapshot_list_summary_pagination(self):
+        self.stubs.Set(share_api.API, 'get_all_snapshots',
+                       mock.Mock(return_value=[]))
+        req = fakes.HTTPRequest.blank(
+            '/snapshots?name=fake_name&limit=2&marker=fake_marker'
+            '&sort_key=size', use_admin_context=True)
+        self.controller.index(req)
+        share_api.API.get_all_snapshots.assert_called_once_with(
+            req.environ['manila.context'],
+            search_opts={'display_name': 'fake_name'},
+            sort_key='size', sort_dir=None, limit=2, offset=None,
+            marker='fake_marker', columns=('id', 'display_name'))
+
+    def test_snapshot_list_invalid_input(self):
+        self.stubs.Set(share_api.API, 'get_all_snapshots', mock.Mock(
+            side_effect=exception.InvalidInput(reason='fake')))
+        req = fakes.HTTPRequest.blank('/snapshots?sort_key=fake')
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     def test_snapshot_updates_description(self):
         snp = self.snp_example
         body = {"snapshot": snp}
@@ -16,6 +16,7 @@
 import datetime
 
 import mock
+from oslo.config import cfg
 import webob
 
 from manila.api import common
@@ -27,6 +28,8 @@ from manila import test
 from manila.tests.api.contrib import stubs
 from manila.tests.api import fakes
 
+CONF = cfg.CONF
+
 
 class ShareApiTest(test.TestCase):
     """Share Api Test."""
@@ -374,6 +377,8 @@ class ShareApiTest(test.TestCase):
                 'share_server_id': share_server_id,
                 'status': status,
             },
+            sort_key=None, sort_dir=None, limit=CONF.osapi_max_limit,
+            offset=None, marker=None,
         )
 
     def test_share_list_summary_with_search_opts_by_admin(self):
@@ -397,6 +402,8 @@ class ShareApiTest(test.TestCase):
                 'share_server_id': share_server_id,
                 'status': status,
             },
+            sort_key=None, sort_dir=None, limit=CONF.osapi_max_limit,
+            offset=None, marker=None,
         )
 
     def test_share_list_summary(self):
@@ -444,6 +451,8 @@ class ShareApiTest(test.TestCase):
                 'share_server_id': share_server_id,
                 'status': status,
             },
+            sort_key=None, sort_dir=None, limit=CONF.osapi_max_limit,
+            offset=None, marker=None,
         )
 
     def test_share_list_detail_with_search_opts_by_admin(self):
@@ -467,6 +476,8 @@ class ShareApiTest(test.TestCase):
                 'share_server_id': share_server_id,
                 'status': status,
             },
+            sort_key=None, sort_dir=None, limit=CONF.osapi_max_limit,
+            offset=None, marker=None,
         )
 
     def test_share_list_detail(self):
@@ -508,6 +519,53 @@ class ShareApiTest(test.TestCase):
         }
         self.assertEqual(res_dict, expected)
 
+    def test_share_list_with_pagination_and_sorting(self):
+        req = fakes.HTTPRequest.blank(
+            '/shares?limit=2&marker=fake_marker&sort_key=size&sort_dir=asc'
+            '&name=fake_name')
+        self.stubs.Set(share_api.API, 'get_all', mock.Mock(return_value=[]))
+        self.controller.index(req)
+        share_api.API.get_all.assert_called_once_with(
+            req.environ['manila.context'],
+            search_opts={'display_name': 'fake_name'},
+            sort_key='size', sort_dir='asc', limit=2, offset=None,
+            marker='fake_marker',
+        )
+
+    def test_share_list_with_offset(self):
+        req = fakes.HTTPRequest.blank('/shares?limit=2&offset=4')
+        self.stubs.Set(share_api.API, 'get_all', mock.Mock(return_value=[]))
+        self.controller.index(req)
+        share_api.API.get_all.assert_called_once_with(
+            req.environ['manila.context'], search_opts={},
+            sort_key=None, sort_dir=None, limit=2, offset=4, marker=None,
+        )
+
+    def test_share_list_invalid_input(self):
+        req = fakes.HTTPRequest.blank('/shares?sort_key=fake_key')
+        self.stubs.Set(share_api.API, 'get_all', mock.Mock(
+            side_effect=exception.InvalidInput(reason='fake')))
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
+    def test_share_list_next_link(self):
+        shares = [stubs.stub_share('1'), stubs.stub_share('2')]
+        req = fakes.HTTPRequest.blank('/shares?limit=2&offset=2')
+        self.stubs.Set(share_api.API, 'get_all',
+                       mock.Mock(return_value=shares))
+        res_dict = self.controller.index(req)
+        self.assertEqual(
+            [{'rel': 'next',
+              'href': 'http://localhost/v1/fake/shares?limit=2&marker=2'}],
+            res_dict['shares_links'])
+
+    def test_share_list_no_next_link_for_last_page(self):
+        req = fakes.HTTPRequest.blank('/shares?limit=2')
+        self.stubs.Set(share_api.API, 'get_all',
+                       mock.Mock(return_value=[stubs.stub_share('1')]))
+        res_dict = self.controller.index(req)
+        self.assertNotIn('shares_links', res_dict)
+
     def test_remove_invalid_options(self):
         ctx = context.RequestContext('fakeuser', 'fakeproject', is_admin=False)
         search_opts = {'a': 'a', 'b': 'b', 'c': 'c', 'd': 'd'}
@@ -0,0 +1,120 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the cache of clients of other services."""
+
+import eventlet
+from eventlet import event
+import mock
+
+from manila.common import client_cache
+from manila import test
+
+
+class ClientCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ClientCacheTestCase, self).setUp()
+        self.cache = client_cache.ClientCache('fake')
+        self.create = mock.Mock(side_effect=lambda: mock.Mock())
+        self.authenticate = mock.Mock()
+
+    def test_get(self):
+        client = self.cache.get('key1', self.create, self.authenticate)
+
+        self.assertIs(client, self.cache.get('key1', self.create,
+                                             self.authenticate))
+        self.assertIsNot(client, self.cache.get('key2', self.create))
+        self.assertEqual(2, self.create.call_count)
+        self.authenticate.assert_called_once_with(client)
+        self.assertEqual({'hits': 1, 'misses': 2, 'auth_calls': 1,
+                          'evictions': 0, 'clients': 2},
+                         self.cache.get_stats())
+
+    def test_get_expired(self):
+        self.flags(client_cache_ttl=10)
+        now = client_cache.time.time()
+        client = self.cache.get('key1', self.create)
+
+        with mock.patch.object(client_cache.time, 'time',
+                               mock.Mock(return_value=now + 11)):
+            new_client = self.cache.get('key1', self.create)
+
+        self.assertIsNot(client, new_client)
+        self.assertEqual(1, self.cache.get_stats()['evictions'])
+        self.assertEqual(1, self.cache.get_stats()['clients'])
+
+    def test_get_least_recently_used_evicted(self):
+        self.flags(client_cache_size=2)
+        client1 = self.cache.get('key1', self.create)
+        self.cache.get('key2', self.create)
+        self.cache.get('key1', self.create)
+        self.cache.get('key3', self.create)
+
+        self.assertIs(client1, self.cache.get('key1', self.create))
+        self.cache.get('key2', self.create)
+        self.assertEqual(4, self.create.call_count)
+        self.assertEqual(2, self.cache.get_stats()['clients'])
+
+    def test_get_caching_disabled(self):
+        self.flags(client_cache_ttl=0)
+
+        client = self.cache.get('key1', self.create)
+
+        self.assertIsNot(client, self.cache.get('key1', self.create))
+        self.assertEqual(0, self.cache.get_stats()['clients'])
+
+    def test_clear(self):
+        client = self.cache.get('key1', self.create)
+        self.cache.clear()
+
+        self.assertIsNot(client, self.cache.get('key1', self.create))
+
+    def test_get_same_key_concurrently(self):
+        def create():
+            eventlet.sleep(0.01)
+            return mock.Mock()
+        self.create.side_effect = create
+
+        threads = [eventlet.spawn(self.cache.get, 'key1', self.create,
+                                  self.authenticate) for i in range(3)]
+        clients = [thread.wait() for thread in threads]
+
+        self.assertEqual(1, self.create.call_count)
+        self.assertEqual(1, self.authenticate.call_count)
+        self.assertTrue(all(client is clients[0] for client in clients))
+        self.assertFalse(self.cache._key_locks)
+
+    def test_get_other_key_while_authenticating(self):
+        authenticated = event.Event()
+        thread = eventlet.spawn(self.cache.get, 'key1', self.create,
+                                lambda client: authenticated.wait())
+        eventlet.sleep(0)
+
+        self.assertIsNotNone(self.cache.get('key2', self.create))
+        self.assertFalse(thread.dead)
+        authenticated.send()
+        thread.wait()
+        self.assertEqual(2, self.cache.get_stats()['clients'])
+
+    def test_get_create_error(self):
+        self.create.side_effect = ValueError
+
+        self.assertRaises(ValueError, self.cache.get, 'key1', self.create)
+        self.assertEqual(0, self.cache.get_stats()['clients'])
+        self.assertFalse(self.cache._key_locks)
+
+    def test_get_all_stats(self):
+        self.cache.get('key1', self.create)
+
+        self.assertEqual(self.cache.get_stats(),
+                         client_cache.get_all_stats()['fake'])
@@ -0,0 +1,147 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for waiting for resources of other services."""
+
+import itertools
+
+import eventlet
+import mock
+
+from manila.common import waiter
+from manila import context
+from manila import exception
+from manila import test
+
+
+class BackoffTestCase(test.TestCase):
+
+    def test_backoff(self):
+        delays = list(itertools.islice(waiter.backoff(1, 5, jitter=0.1), 5))
+
+        for delay, expected in zip(delays, [1, 2, 4, 5, 5]):
+            self.assertTrue(expected * 0.9 <= delay <= expected * 1.1)
+
+    def test_backoff_jitter(self):
+        delays = list(itertools.islice(waiter.backoff(1, 1), 20))
+
+        self.assertTrue(all(0.8 <= delay <= 1.2 for delay in delays))
+        self.assertTrue(len(set(delays)) > 1)
+
+
+class WaiterTestCase(test.TestCase):
+
+    def setUp(self):
+        super(WaiterTestCase, self).setUp()
+        self.context = context.get_admin_context()
+        self.resources = {}
+        self.fetch = mock.Mock(
+            side_effect=lambda ctxt, ids: dict(
+                (i, self.resources[i]) for i in ids if i in self.resources))
+        self.waiter = waiter.Waiter('Resource', self.fetch, interval=0.01,
+                                    max_interval=0.02)
+
+    def _is_ready(self, resource):
+        if resource is None:
+            raise exception.ManilaException('gone')
+        return resource['status'] == 'ready'
+
+    def _set_status(self, resource_id, status, delay=0.05):
+        def set_status():
+            eventlet.sleep(delay)
+            self.resources[resource_id] = {'id': resource_id,
+                                           'status': status}
+        eventlet.spawn_n(set_status)
+
+    def test_wait_known_resource(self):
+        resource = {'id': 'id1', 'status': 'ready'}
+
+        result = self.waiter.wait(self.context, 'id1', self._is_ready, 1,
+                                  resource=resource)
+
+        self.assertIs(resource, result)
+        self.assertFalse(self.fetch.called)
+
+    def test_wait(self):
+        self.resources['id1'] = {'id': 'id1', 'status': 'building'}
+        self._set_status('id1', 'ready')
+
+        result = self.waiter.wait(self.context, 'id1', self._is_ready, 1)
+
+        self.assertEqual('ready', result['status'])
+        self.assertTrue(self.fetch.call_count > 1)
+
+    def test_wait_check_error(self):
+        self.assertRaises(exception.ManilaException, self.waiter.wait,
+                          self.context, 'id1', self._is_ready, 1)
+
+    def test_wait_fetch_error(self):
+        self.fetch.side_effect = exception.NotAuthorized
+
+        self.assertRaises(exception.NotAuthorized, self.waiter.wait,
+                          self.context, 'id1', self._is_ready, 1)
+
+    def test_wait_timeout(self):
+        self.resources['id1'] = {'id': 'id1', 'status': 'building'}
+
+        self.assertRaises(exception.WaitTimeout, self.waiter.wait,
+                          self.context, 'id1', self._is_ready, 0.1)
+        eventlet.sleep(0.05)
+        self.assertFalse(self.waiter._waits)
+
+    def test_wait_many(self):
+        resource_ids = ['id%s' % i for i in range(5)]
+        for i, resource_id in enumerate(resource_ids):
+            self.resources[resource_id] = {'id': resource_id,
+                                           'status': 'building'}
+            self._set_status(resource_id, 'ready', delay=0.05 + 0.01 * i)
+
+        threads = [eventlet.spawn(self.waiter.wait, self.context,
+                                  resource_id, self._is_ready, 1)
+                   for resource_id in resource_ids]
+        results = [thread.wait() for thread in threads]
+
+        self.assertEqual(resource_ids, [result['id'] for result in results])
+        batch_sizes = [len(call[0][1]) for call in self.fetch.call_args_list]
+        self.assertTrue(max(batch_sizes) > 1)
+
+    def test_wait_many_contexts(self):
+        contexts = [context.RequestContext('user', 'project%s' % i)
+                    for i in range(2)]
+        self.resources['id1'] = {'id': 'id1', 'status': 'ready'}
+        self.resources['id2'] = {'id': 'id2', 'status': 'ready'}
+
+        threads = [eventlet.spawn(self.waiter.wait, ctxt, resource_id,
+                                  self._is_ready, 1)
+                   for ctxt, resource_id in zip(contexts, ['id1', 'id2'])]
+        for thread in threads:
+            thread.wait()
+
+        self.assertEqual(
+            [('project0', ['id1']), ('project1', ['id2'])],
+            sorted((call[0][0].project_id, call[0][1])
+                   for call in self.fetch.call_args_list))
+
+    def test_notify(self):
+        self.waiter._interval = 10
+        self.waiter._max_interval = 10
+        resource = {'id': 'id1', 'status': 'ready'}
+
+        def notify():
+            eventlet.sleep(0)
+            self.waiter.notify('id1', resource)
+        eventlet.spawn_n(notify)
+
+        result = self.waiter.wait(self.context, 'id1', self._is_ready, 1)
+
+        self.assertIs(resource, result)
+        self.assertFalse(self.fetch.called)
@@ -99,6 +99,71 @@ class NovaApiTestCase(test.TestCase):
         self.assertEqual([{'id': 'id1'}, {'id': 'id2'}],
                          self.api.server_list(self.ctx))
 
+    def test_wait_for_server(self):
+        self.stubs.Set(nova._server_waiter, 'wait',
+                       mock.Mock(return_value='fake_server'))
+        check = mock.Mock()
+
+        result = self.api.wait_for_server(self.ctx, 'id1', check, 10)
+
+        nova._server_waiter.wait.assert_called_once_with(
+            self.ctx, 'id1', check, 10, resource=None)
+        self.assertEqual('fake_server', result)
+
+    def test_get_servers_one(self):
+        server = mock.Mock(id='id1')
+        self.stubs.Set(self.novaclient.servers, 'get',
+                       mock.Mock(return_value=server))
+
+        result = nova._get_servers(self.ctx, ['id1'])
+
+        self.novaclient.servers.get.assert_called_once_with('id1')
+        self.assertEqual({'id1': server}, result)
+
+    def test_get_servers_one_not_found(self):
+        self.stubs.Set(self.novaclient.servers, 'get', mock.Mock(
+            side_effect=nova_exception.NotFound(404)))
+
+        self.assertEqual({}, nova._get_servers(self.ctx, ['id1']))
+
+    def test_get_servers_many(self):
+        servers = {'id1': mock.Mock(id='id1'), 'id3': mock.Mock(id='id3')}
+        self.stubs.Set(self.novaclient.servers, 'list', mock.Mock(
+            return_value=[servers['id1'], mock.Mock(id='other')]))
+
+        def fake_get(instance_id):
+            if instance_id not in servers:
+                raise nova_exception.NotFound(404)
+            return servers[instance_id]
+        self.stubs.Set(self.novaclient.servers, 'get',
+                       mock.Mock(side_effect=fake_get))
+
+        result = nova._get_servers(self.ctx, ['id1', 'id2', 'id3'])
+
+        self.novaclient.servers.list.assert_called_once_with(
+            True, {'all_tenants': True})
+        self.assertEqual([mock.call('id2'), mock.call('id3')],
+                         self.novaclient.servers.get.call_args_list)
+        self.assertEqual(servers, result)
+
+    def test_get_servers_many_listed(self):
+        servers = {'id1': mock.Mock(id='id1'), 'id2': mock.Mock(id='id2')}
+        self.stubs.Set(self.novaclient.servers, 'list',
+                       mock.Mock(return_value=servers.values()))
+        self.stubs.Set(self.novaclient.servers, 'get', mock.Mock())
+
+        result = nova._get_servers(self.ctx, ['id1', 'id2'])
+
+        self.assertFalse(self.novaclient.servers.get.called)
+        self.assertEqual(servers, result)
+
+    def test_get_servers_error(self):
+        self.stubs.Set(self.novaclient.servers, 'get', mock.Mock(
+            side_effect=nova_exception.ClientException(500)))
+
+        self.assertRaises(nova_exception.ClientException,
+                          nova._get_servers, self.ctx, ['id1'])
+
     def test_server_pause(self):
         self.stubs.Set(self.novaclient.servers, 'pause', mock.Mock())
         self.api.server_pause(self.ctx, 'id1')
@@ -171,6 +236,13 @@ class NovaApiTestCase(test.TestCase):
         self.novaclient.servers.update.assert_called_once_with('id1',
                                                                name='new_name')
 
+    def test_server_interface_attach(self):
+        self.stubs.Set(self.novaclient.servers, 'interface_attach',
+                       mock.Mock())
+        self.api.server_interface_attach(self.ctx, 'id1', 'port_id')
+        self.novaclient.servers.interface_attach.assert_called_once_with(
+            'id1', 'port_id', None, None)
+
     def test_update_server_volume(self):
         self.stubs.Set(self.novaclient.volumes, 'update_server_volume',
                        mock.Mock())
@@ -199,3 +271,26 @@ class NovaApiTestCase(test.TestCase):
     def test_keypair_list(self):
         self.assertEqual([{'id': 'id1'}, {'id': 'id2'}],
                          self.api.keypair_list(self.ctx))
+
+
+class NovaclientTestCase(test.TestCase):
+
+    def setUp(self):
+        super(NovaclientTestCase, self).setUp()
+        nova._client_cache.clear()
+
+    @mock.patch.object(nova.nova_client, 'Client', mock.Mock())
+    def test_novaclient_admin_cached(self):
+        ctx = context.get_admin_context()
+        stats = nova._client_cache.get_stats()
+
+        client = nova.novaclient(ctx)
+
+        self.assertIs(client, nova.novaclient(ctx))
+        nova.nova_client.Client.assert_called_once_with(
+            nova.CONF.nova_admin_username, nova.CONF.nova_admin_password,
+            nova.CONF.nova_admin_tenant_name, nova.CONF.nova_admin_auth_url)
+        client.authenticate.assert_called_once_with()
+        new_stats = nova._client_cache.get_stats()
+        self.assertEqual(1, new_stats['hits'] - stats['hits'])
+        self.assertEqual(1, new_stats['auth_calls'] - stats['auth_calls'])
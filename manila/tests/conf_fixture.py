@@ -36,6 +36,8 @@ def set_defaults(conf):
     _safe_set_of_opts(conf, 'share_driver',
                       'manila.tests.fake_driver.FakeShareDriver')
     _safe_set_of_opts(conf, 'auth_strategy', 'noauth')
+    # NOTE: cached limits would outlive the database of a test.
+    _safe_set_of_opts(conf, 'quota_limits_cache_ttl', 0)
 
 
 def _safe_set_of_opts(conf, *args, **kwargs):
@@ -0,0 +1,129 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for bulk operations on access rules and share metadata."""
+
+from manila import context
+from manila import db
+from manila import exception
+from manila import test
+from manila.tests.db import utils as db_utils
+
+
+class ShareAccessBulkTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareAccessBulkTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        db.share_create(self.ctxt, {'id': 'share1', 'size': 1})
+        db.share_create(self.ctxt, {'id': 'share2', 'size': 1})
+        db.share_create(self.ctxt, {'id': 'share3', 'size': 1})
+
+    def _create_many(self):
+        return db.share_access_create_many(self.ctxt, [
+            {'share_id': 'share1', 'access_type': 'ip',
+             'access_to': '10.0.0.%s' % i} for i in range(3)] + [
+            {'share_id': 'share2', 'access_type': 'ip',
+             'access_to': '10.0.0.1'}])
+
+    def test_create_many(self):
+        rules = self._create_many()
+
+        self.assertEqual(4, len(rules))
+        self.assertEqual(3, len(db.share_access_get_all_for_share(
+            self.ctxt, 'share1')))
+        self.assertEqual('new', db.share_access_get(self.ctxt,
+                                                    rules[0]['id'])['state'])
+
+    def test_get_all_for_shares(self):
+        self._create_many()
+        db.share_access_create(self.ctxt, {'share_id': 'share3',
+                                           'access_type': 'ip',
+                                           'access_to': '10.0.0.1'})
+
+        rules = db.share_access_get_all_for_shares(self.ctxt,
+                                                   ['share1', 'share2'])
+
+        self.assertEqual(['share1'] * 3 + ['share2'],
+                         sorted(rule['share_id'] for rule in rules))
+        self.assertEqual([],
+                         db.share_access_get_all_for_shares(self.ctxt, []))
+
+    def test_update_many(self):
+        rules = self._create_many()
+
+        statements = db_utils.count_statements(
+            lambda: db.share_access_update_many(
+                self.ctxt, [rule['id'] for rule in rules[:2]],
+                {'state': 'error'}))
+
+        self.assertEqual(1, statements)
+        states = [db.share_access_get(self.ctxt, rule['id'])['state']
+                  for rule in rules]
+        self.assertEqual(['error', 'error', 'new', 'new'], states)
+
+    def test_update_many_none(self):
+        self.assertEqual(0, db.share_access_update_many(self.ctxt, [],
+                                                        {'state': 'error'}))
+
+    def test_delete_many(self):
+        rules = self._create_many()
+
+        statements = db_utils.count_statements(
+            lambda: db.share_access_delete_many(
+                self.ctxt, [rule['id'] for rule in rules[1:]]))
+
+        self.assertEqual(1, statements)
+        self.assertEqual([rules[0]['id']],
+                         [rule['id'] for rule in
+                          db.share_access_get_all_for_shares(
+                              self.ctxt, ['share1', 'share2'])])
+        self.assertRaises(exception.NotFound, db.share_access_get,
+                          self.ctxt, rules[1]['id'])
+
+
+class ShareMetadataUpdateTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareMetadataUpdateTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        db.share_create(self.ctxt, {'id': 'share1', 'size': 1,
+                                    'metadata': {'a': '1', 'b': '2',
+                                                 'c': '3'}})
+
+    def test_update(self):
+        db.share_metadata_update(self.ctxt, 'share1',
+                                 {'b': '20', 'c': '3', 'd': '4'}, False)
+
+        self.assertEqual({'a': '1', 'b': '20', 'c': '3', 'd': '4'},
+                         db.share_metadata_get(self.ctxt, 'share1'))
+
+    def test_update_delete(self):
+        db.share_metadata_update(self.ctxt, 'share1',
+                                 {'b': '20', 'd': '4'}, True)
+
+        self.assertEqual({'b': '20', 'd': '4'},
+                         db.share_metadata_get(self.ctxt, 'share1'))
+
+    def test_update_statement_count(self):
+        metadata = dict(('key%s' % i, 'value') for i in range(50))
+        metadata.update({'a': '10', 'b': '20'})
+
+        statements = db_utils.count_statements(
+            lambda: db.share_metadata_update(self.ctxt, 'share1', metadata,
+                                             True))
+
+        # NOTE: share existence checks of share_metadata_update and
+        # _share_metadata_update, select of current metadata, one update
+        # each for deleted and changed keys and one insert.
+        self.assertEqual(6, statements)
+        self.assertEqual(metadata, db.share_metadata_get(self.ctxt, 'share1'))
@@ -0,0 +1,159 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for purge and archival of soft deleted rows."""
+
+import datetime
+
+from manila import context
+from manila import db
+from manila.db.sqlalchemy import api as db_api
+from manila.openstack.common import timeutils
+from manila import test
+from manila.tests.db import utils as db_utils
+
+
+class PurgeDeletedRowsTestCase(test.TestCase):
+
+    def setUp(self):
+        super(PurgeDeletedRowsTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.old = timeutils.utcnow() - datetime.timedelta(days=40)
+        self.recent = timeutils.utcnow() - datetime.timedelta(days=1)
+
+    def _create_share(self, share_id, deleted_at=None):
+        share = db.share_create(self.ctxt, {'id': share_id, 'size': 1,
+                                            'metadata': {'key': 'value'}})
+        if deleted_at:
+            self._delete_share(share_id, deleted_at)
+        return share
+
+    def _delete_share(self, share_id, deleted_at):
+        db.share_delete(self.ctxt, share_id)
+        session = db_api.get_session()
+        with session.begin():
+            for table, column in (('shares', 'id'),
+                                  ('share_metadata', 'share_id')):
+                session.execute(
+                    'UPDATE %s SET deleted_at = :deleted_at '
+                    'WHERE %s = :share_id' % (table, column),
+                    {'deleted_at': deleted_at, 'share_id': share_id})
+
+    def _create_snapshot(self, share_id, deleted_at=None):
+        snapshot = db.share_snapshot_create(self.ctxt, {'share_id': share_id,
+                                                        'size': 1})
+        if deleted_at:
+            db.share_snapshot_update(self.ctxt, snapshot['id'],
+                                     {'deleted': 'True',
+                                      'deleted_at': deleted_at})
+        return snapshot
+
+    def _count(self, table):
+        return db_api.get_session().execute(
+            'SELECT count(*) FROM %s' % table).scalar()
+
+    def test_purge(self):
+        self._create_share('old', self.old)
+        self._create_share('recent', self.recent)
+        self._create_share('active')
+
+        counts = db.purge_deleted_rows(self.ctxt, 30)
+
+        self.assertEqual(1, counts['shares'])
+        self.assertEqual(1, counts['share_metadata'])
+        self.assertEqual(2, self._count('shares'))
+        self.assertEqual(2, self._count('share_metadata'))
+
+    def test_purge_dry_run(self):
+        self._create_share('old', self.old)
+
+        counts = db.purge_deleted_rows(self.ctxt, 30, dry_run=True)
+
+        self.assertEqual(1, counts['shares'])
+        self.assertEqual(1, counts['share_metadata'])
+        self.assertEqual(1, self._count('shares'))
+
+    def test_purge_keeps_referenced_rows(self):
+        self._create_share('old', self.old)
+        self._create_snapshot('old')
+
+        self.assertEqual(0, db.purge_deleted_rows(
+            self.ctxt, 30, dry_run=True)['shares'])
+        self.assertEqual(0, db.purge_deleted_rows(self.ctxt, 30)['shares'])
+        self.assertEqual(1, self._count('shares'))
+
+    def test_purge_removes_children_first(self):
+        self._create_share('old', self.old)
+        self._create_snapshot('old', self.old)
+
+        self.assertEqual(1, db.purge_deleted_rows(
+            self.ctxt, 30, dry_run=True)['shares'])
+        counts = db.purge_deleted_rows(self.ctxt, 30)
+        self.assertEqual(1, counts['share_snapshots'])
+        self.assertEqual(1, counts['shares'])
+
+    def test_purge_keeps_rows_referenced_by_kept_rows(self):
+        db.share_network_create(self.ctxt, {'id': 'net', 'user_id': 'user',
+                                            'project_id': 'project'})
+        db.share_network_delete(self.ctxt, 'net')
+        db_api.get_session().execute(
+            'UPDATE share_networks SET deleted_at = :deleted_at',
+            {'deleted_at': self.old})
+        db.share_create(self.ctxt, {'id': 'old', 'size': 1,
+                                    'share_network_id': 'net'})
+        self._delete_share('old', self.old)
+        self._create_snapshot('old')
+
+        counts = db.purge_deleted_rows(self.ctxt, 30, dry_run=True)
+        self.assertEqual(0, counts['shares'])
+        self.assertEqual(0, counts['share_networks'])
+        counts = db.purge_deleted_rows(self.ctxt, 30)
+        self.assertEqual(0, counts['shares'])
+        self.assertEqual(0, counts['share_networks'])
+        self.assertEqual(1, self._count('share_networks'))
+
+    def test_purge_batches(self):
+        for i in range(5):
+            self._create_share('old%s' % i, self.old)
+
+        with db_utils.capture_statements() as statements:
+            counts = db.purge_deleted_rows(self.ctxt, 30, batch_size=2)
+        deletes = [statement for statement, parameters in statements
+                   if statement.startswith('DELETE FROM shares ')]
+        self.assertEqual(5, counts['shares'])
+        self.assertEqual(0, self._count('shares'))
+        self.assertEqual(3, len(deletes))
+
+    def test_archive(self):
+        self._create_share('old', self.old)
+        self._create_share('active')
+
+        counts = db.purge_deleted_rows(self.ctxt, 30, archive=True)
+
+        self.assertEqual(1, counts['shares'])
+        self.assertEqual(1, self._count('shares'))
+        rows = db_api.get_session().execute(
+            'SELECT id, size FROM shadow_shares').fetchall()
+        self.assertEqual([('old', 1)], [tuple(row) for row in rows])
+
+    def test_archive_adds_new_columns(self):
+        session = db_api.get_session()
+        session.execute('CREATE TABLE shadow_shares '
+                        '(id VARCHAR(36), size INTEGER)')
+        self._create_share('old', self.old)
+
+        counts = db.purge_deleted_rows(self.ctxt, 30, archive=True)
+
+        self.assertEqual(1, counts['shares'])
+        rows = session.execute(
+            'SELECT id, size, deleted FROM shadow_shares').fetchall()
+        self.assertEqual([('old', 1, 'old')], [tuple(row) for row in rows])
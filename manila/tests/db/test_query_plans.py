@@ -0,0 +1,116 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests that hot DB API queries are served by indexes.
+
+Statements issued by a DB API call are captured and explained, the test
+fails when the plan of any of them scans a whole table.
+"""
+
+import datetime
+import re
+
+from manila.common import constants
+from manila import context
+from manila import db
+from manila.db.sqlalchemy import api as db_api
+from manila.db.sqlalchemy import models
+from manila.openstack.common import timeutils
+from manila import test
+from manila.tests.db import utils as db_utils
+
+
+class QueryPlanTestCase(test.TestCase):
+
+    # NOTE: plan details are like 'SCAN shares_1' or, with older SQLite
+    # versions, 'SCAN TABLE shares AS shares_1'.
+    _SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+    def setUp(self):
+        super(QueryPlanTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.share = db.share_create(self.ctxt, {
+            'host': 'host1', 'project_id': 'project1', 'size': 1,
+            'metadata': {'key': 'value'}})
+        self.share_network = db.share_network_create(self.ctxt, {
+            'id': 'net1', 'project_id': 'project1', 'user_id': 'user1'})
+        self.share_server = db.share_server_create(self.ctxt, {
+            'host': 'host1', 'share_network_id': 'net1',
+            'status': constants.STATUS_ACTIVE})
+
+    def _full_scans(self, func, *args, **kwargs):
+        """Call func and return the tables its queries scan entirely."""
+        with db_utils.capture_statements() as statements:
+            func(*args, **kwargs)
+        statements = [(statement, parameters)
+                      for statement, parameters in statements
+                      if statement.lstrip().upper().startswith('SELECT')]
+        self.assertTrue(statements)
+
+        scans = []
+        connection = db_api.get_engine().raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in statements:
+                cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                for row in cursor.fetchall():
+                    match = self._SCAN.match(row[-1])
+                    if match is None or 'USING' in row[-1]:
+                        continue
+                    # NOTE: tables are aliased as <table>_<n> by eager
+                    # loads, subqueries as anon_<n> are not tables.
+                    table = re.sub(r'_\d+$', '', match.group(1))
+                    if table in models.BASE.metadata.tables:
+                        scans.append(table)
+        finally:
+            connection.close()
+        return scans
+
+    def assertNoFullScans(self, func, *args, **kwargs):
+        self.assertEqual([], self._full_scans(func, *args, **kwargs))
+
+    def test_share_get_all_by_host(self):
+        self.assertNoFullScans(db.share_get_all_by_host, self.ctxt, 'host1')
+
+    def test_share_get_all_by_project(self):
+        self.assertNoFullScans(db.share_get_all_by_project, self.ctxt,
+                               'project1', limit=10)
+
+    def test_share_get_all_by_share_server(self):
+        self.assertNoFullScans(db.share_get_all_by_share_server, self.ctxt,
+                               self.share_server['id'])
+
+    def test_share_access_get_all_for_share(self):
+        self.assertNoFullScans(db.share_access_get_all_for_share, self.ctxt,
+                               self.share['id'])
+
+    def test_share_snapshot_get_all_for_share(self):
+        self.assertNoFullScans(db.share_snapshot_get_all_for_share,
+                               self.ctxt, self.share['id'])
+
+    def test_share_server_get_by_host_and_share_net_valid(self):
+        self.assertNoFullScans(db.share_server_get_by_host_and_share_net_valid,
+                               self.ctxt, 'host1', 'net1')
+
+    def test_quota_usage_get_all_by_project(self):
+        self.assertNoFullScans(db.quota_usage_get_all_by_project, self.ctxt,
+                               'project1')
+
+    def test_reservation_expire(self):
+        usage = db_api._quota_usage_create(
+            self.ctxt, 'project1', 'user1', 'shares', 1, 1, None,
+            session=db_api.get_session())
+        db.reservation_create(
+            self.ctxt, 'uuid1', usage, 'project1', 'user1', 'shares', 1,
+            timeutils.utcnow() - datetime.timedelta(days=1))
+
+        self.assertNoFullScans(db.reservation_expire, self.ctxt)
@@ -0,0 +1,179 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for counting and resync of quota usages and for reservations."""
+
+import datetime
+import uuid
+
+import mock
+
+from manila import context
+from manila import db
+from manila.db.sqlalchemy import api as db_api
+from manila.openstack.common import timeutils
+from manila import quota
+from manila import test
+from manila.tests.db import utils as db_utils
+
+
+class QuotaUsageCountTestCase(test.TestCase):
+
+    def setUp(self):
+        super(QuotaUsageCountTestCase, self).setUp()
+        self.ctxt = context.RequestContext(user_id='user1',
+                                           project_id='project1',
+                                           is_admin=True)
+        share = self._create_share('project1', 'user1', 1)
+        self._create_share('project1', 'user1', 2)
+        self._create_share('project1', 'user2', 4)
+        self._create_share('project2', 'user3', 8)
+        deleted_share = self._create_share('project1', 'user1', 16)
+        db.share_delete(self.ctxt, deleted_share['id'])
+        db.share_snapshot_create(self.ctxt, {
+            'share_id': share['id'], 'size': 1, 'project_id': 'project1',
+            'user_id': 'user1'})
+        db.share_network_create(self.ctxt, {'project_id': 'project1',
+                                            'user_id': 'user2'})
+
+    def _create_share(self, project_id, user_id, size):
+        return db.share_create(self.ctxt, {'project_id': project_id,
+                                           'user_id': user_id,
+                                           'size': size})
+
+    def _create_usage(self, project_id, user_id, resource, in_use,
+                      reserved):
+        return db_api._quota_usage_create(
+            self.ctxt, project_id, user_id, resource, in_use, reserved, None,
+            session=db_api.get_session())
+
+    def test_sync_usages_of_user(self):
+        usages = db_api._sync_usages(self.ctxt, 'project1', 'user1', None)
+        self.assertEqual({'shares': 2, 'snapshots': 1, 'gigabytes': 4,
+                          'share_networks': 0}, usages)
+
+    def test_sync_usages_of_project(self):
+        usages = db_api._sync_usages(self.ctxt, 'project1', None, None)
+        self.assertEqual({'shares': 3, 'snapshots': 1, 'gigabytes': 8,
+                          'share_networks': 1}, usages)
+
+    def test_sync_usages_no_snapshot_gb_quota(self):
+        self.flags(no_snapshot_gb_quota=True)
+        usages = db_api._sync_usages(self.ctxt, 'project1', 'user1', None)
+        self.assertEqual(3, usages['gigabytes'])
+
+    def test_sync_usages_is_one_statement(self):
+        self.assertEqual(1, db_utils.count_statements(
+            lambda: db_api._sync_usages(self.ctxt, 'project1', 'user1',
+                                        None)))
+
+    def test_reserve_refreshes_all_resources(self):
+        quota.QUOTAS.reserve(self.ctxt, shares=1, gigabytes=1)
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'project1', 'user1')
+        self.assertEqual(2, usages['shares']['in_use'])
+        self.assertEqual(1, usages['shares']['reserved'])
+        self.assertEqual(4, usages['gigabytes']['in_use'])
+        self.assertEqual(1, usages['snapshots']['in_use'])
+        self.assertEqual(0, usages['share_networks']['in_use'])
+
+    def test_quota_usage_resync(self):
+        self._create_usage('project1', 'user1', 'shares', 5, 1)
+        self._create_usage('project1', 'user1', 'snapshots', 1, 0)
+        self._create_usage('project1', 'user2', 'gigabytes', 0, 0)
+        self._create_usage('project2', 'user3', 'gigabytes', 9, 0)
+
+        resynced = db.quota_usage_resync(self.ctxt)
+
+        self.assertEqual(
+            [('project1', 'user1', 'shares', 5, 2),
+             ('project1', 'user2', 'gigabytes', 0, 4),
+             ('project2', 'user3', 'gigabytes', 9, 8)],
+            sorted((u['project_id'], u['user_id'], u['resource'],
+                    u['tracked_use'], u['in_use']) for u in resynced))
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'project1', 'user1')
+        self.assertEqual(2, usages['shares']['in_use'])
+        self.assertEqual(1, usages['shares']['reserved'])
+        self.assertEqual([], db.quota_usage_resync(self.ctxt))
+
+    def test_quota_usage_resync_project(self):
+        self._create_usage('project1', 'user1', 'shares', 5, 0)
+        self._create_usage('project2', 'user3', 'shares', 5, 0)
+
+        resynced = db.quota_usage_resync(self.ctxt, project_id='project2')
+
+        self.assertEqual([('project2', 'shares', 1)],
+                         [(u['project_id'], u['resource'], u['in_use'])
+                          for u in resynced])
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'project1', 'user1')
+        self.assertEqual(5, usages['shares']['in_use'])
+
+    def test_quota_usage_resync_per_project_usage(self):
+        self._create_usage('project1', None, 'share_networks', 0, 0)
+
+        resynced = db.quota_usage_resync(self.ctxt)
+
+        self.assertEqual([(None, 'share_networks', 1)],
+                         [(u['user_id'], u['resource'], u['in_use'])
+                          for u in resynced])
+
+
+class ReservationExpireTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ReservationExpireTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        session = db_api.get_session()
+        self.usages = [
+            db_api._quota_usage_create(self.ctxt, 'project', 'user',
+                                       resource, 0, 10, None,
+                                       session=session)
+            for resource in ('shares', 'gigabytes')]
+
+    def _create_reservation(self, usage, delta, expire):
+        return db_api._reservation_create(
+            self.ctxt, str(uuid.uuid4()), usage, 'project', 'user',
+            usage['resource'], delta, expire, session=db_api.get_session())
+
+    def _get_reserved(self):
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'project', 'user')
+        return usages['shares']['reserved'], usages['gigabytes']['reserved']
+
+    def test_reservation_expire(self):
+        past = timeutils.utcnow() - datetime.timedelta(seconds=10)
+        future = timeutils.utcnow() + datetime.timedelta(seconds=3600)
+        for i in range(3):
+            self._create_reservation(self.usages[0], 1, past)
+            self._create_reservation(self.usages[1], 2, past)
+        self._create_reservation(self.usages[1], -5, past)
+        active = self._create_reservation(self.usages[0], 1, future)
+        committed = self._create_reservation(self.usages[0], 1, past)
+        db.reservation_commit(self.ctxt, [committed['uuid']], 'project',
+                              'user')
+
+        with mock.patch.object(db_api, '_reservation_expire_batch',
+                               wraps=db_api._reservation_expire_batch) as b:
+            self.assertEqual(7, db.reservation_expire(self.ctxt,
+                                                      batch_size=3))
+        self.assertEqual(3, b.call_count)
+        self.assertEqual((6, 4), self._get_reserved())
+        self.assertEqual(active['uuid'],
+                         db_api.reservation_get(self.ctxt,
+                                                active['uuid'])['uuid'])
+        self.assertEqual(0, db.reservation_expire(self.ctxt))
+
+    def test_reservation_expire_nothing(self):
+        self.assertEqual(0, db.reservation_expire(self.ctxt))
+        self.assertEqual((10, 10), self._get_reserved())
@@ -20,6 +20,7 @@ from manila import db
 from manila import exception
 from manila.openstack.common import uuidutils
 from manila import test
+from manila.tests.db import utils as db_utils
 
 
 class ShareServerTableTestCase(test.TestCase):
@@ -164,6 +165,63 @@ class ShareServerTableTestCase(test.TestCase):
         servers = db.share_server_get_all(self.ctxt)
         self.assertEqual(len(servers), 2)
 
+    def _create_share_network_with_server(self, index, **server_values):
+        network = db.share_network_create(self.ctxt, {
+            'id': 'sn%s' % index, 'name': 'net%s' % index,
+            'project_id': 'project%s' % (index % 2),
+            'user_id': 'user_id',
+            'neutron_subnet_id': 'subnet%s' % index})
+        values = {'share_network_id': network['id'], 'host': 'host1',
+                  'status': 'ACTIVE'}
+        values.update(server_values)
+        return self._create_share_server(values)
+
+    def test_share_server_get_all_statement_count_is_constant(self):
+
+        def list_servers():
+            for server in db.share_server_get_all(self.ctxt):
+                server.share_network['name']
+                server.share_network['project_id']
+
+        self._create_share_network_with_server(0)
+        count = db_utils.count_statements(list_servers)
+        for i in range(1, 10):
+            self._create_share_network_with_server(i)
+        self.assertEqual(count, db_utils.count_statements(list_servers))
+        self.assertEqual(1, count)
+
+    def test_share_server_get_all_filters(self):
+        servers = [self._create_share_network_with_server(i)
+                   for i in range(4)]
+        self._create_share_network_with_server(4, status='ERROR')
+
+        result = db.share_server_get_all(
+            self.ctxt, filters={'project_id': 'project0', 'status': 'ACTIVE'})
+        self.assertEqual(sorted([servers[0]['id'], servers[2]['id']]),
+                         sorted(s['id'] for s in result))
+        result = db.share_server_get_all(
+            self.ctxt, filters={'share_network': 'net1'})
+        self.assertEqual([servers[1]['id']], [s['id'] for s in result])
+        result = db.share_server_get_all(
+            self.ctxt, filters={'share_network': 'sn3'})
+        self.assertEqual([servers[3]['id']], [s['id'] for s in result])
+        result = db.share_server_get_all(
+            self.ctxt, filters={'fake_key': 'fake_value'})
+        self.assertEqual([], result)
+
+    def test_share_server_get_all_paginated(self):
+        servers = [self._create_share_network_with_server(i, host='host%s' % i)
+                   for i in range(3)]
+
+        result = db.share_server_get_all(self.ctxt, sort_key='host',
+                                         sort_dir='asc', limit=2)
+        self.assertEqual([servers[0]['id'], servers[1]['id']],
+                         [s['id'] for s in result])
+        result = db.share_server_get_all(self.ctxt, sort_key='host',
+                                         sort_dir='asc', limit=2,
+                                         marker=result[-1]['id'])
+        self.assertEqual([servers[2]['id']], [s['id'] for s in result])
+
     def test_share_server_backend_details_set(self):
         details = {
             'value1': '1',
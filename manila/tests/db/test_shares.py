@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for listing of shares from the database."""
+
+import datetime
+
+from manila import context
+from manila import db
+from manila import exception
+from manila import test
+
+
+class ShareListTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareListTestCase, self).setUp()
+        self.ctxt = context.RequestContext(user_id='user_id',
+                                           project_id='project_id',
+                                           is_admin=True)
+        self.shares = [
+            self._create_share('share0', 3, 'available', 'project_id'),
+            self._create_share('share1', 1, 'error', 'project_id'),
+            self._create_share('share2', 2, 'available', 'project_id'),
+            self._create_share('share3', 2, 'available', 'other_project',
+                               share_server_id='fake_server'),
+        ]
+
+    def _create_share(self, name, size, status, project_id, **kwargs):
+        created_at = datetime.datetime(2014, 1, 1, 0, 0, int(name[-1]))
+        values = {'id': name, 'display_name': name, 'size': size,
+                  'status': status, 'project_id': project_id,
+                  'created_at': created_at}
+        values.update(kwargs)
+        return db.share_create(self.ctxt, values)
+
+    def _ids(self, shares):
+        return [share['id'] for share in shares]
+
+    def test_share_get_all_by_project(self):
+        shares = db.share_get_all_by_project(self.ctxt, 'project_id')
+        self.assertEqual(['share0', 'share1', 'share2'],
+                         sorted(self._ids(shares)))
+
+    def test_share_get_all_filters(self):
+        shares = db.share_get_all(
+            self.ctxt, filters={'status': 'available', 'size': 2})
+        self.assertEqual(['share2', 'share3'], sorted(self._ids(shares)))
+
+    def test_share_get_all_unknown_filter(self):
+        shares = db.share_get_all(self.ctxt, filters={'fake_key': 'fake'})
+        self.assertEqual([], shares)
+
+    def test_share_get_all_by_share_server_filters(self):
+        shares = db.share_get_all_by_share_server(
+            self.ctxt, 'fake_server', filters={'status': 'error'})
+        self.assertEqual([], shares)
+        shares = db.share_get_all_by_share_server(
+            self.ctxt, 'fake_server', filters={'status': 'available'})
+        self.assertEqual(['share3'], self._ids(shares))
+
+    def test_share_get_all_default_sort(self):
+        shares = db.share_get_all(self.ctxt, limit=10)
+        self.assertEqual(['share3', 'share2', 'share1', 'share0'],
+                         self._ids(shares))
+
+    def test_share_get_all_sort_by_size(self):
+        shares = db.share_get_all(self.ctxt, sort_key='size', sort_dir='asc')
+        self.assertEqual(['share1', 'share2', 'share3', 'share0'],
+                         self._ids(shares))
+
+    def test_share_get_all_by_project_limit_and_marker(self):
+        shares = db.share_get_all_by_project(
+            self.ctxt, 'project_id', sort_key='size', limit=2)
+        self.assertEqual(['share0', 'share2'], self._ids(shares))
+        shares = db.share_get_all_by_project(
+            self.ctxt, 'project_id', sort_key='size', limit=2,
+            marker=shares[-1]['id'])
+        self.assertEqual(['share1'], self._ids(shares))
+
+    def test_share_get_all_limit_and_offset(self):
+        shares = db.share_get_all(self.ctxt, limit=2, offset=1)
+        self.assertEqual(['share2', 'share1'], self._ids(shares))
+
+    def test_share_get_all_invalid_sort_key(self):
+        self.assertRaises(exception.InvalidInput, db.share_get_all,
+                          self.ctxt, sort_key='fake_key')
+
+    def test_share_get_all_invalid_sort_dir(self):
+        self.assertRaises(exception.InvalidInput, db.share_get_all,
+                          self.ctxt, sort_dir='fake_dir')
+
+    def test_share_get_all_marker_not_found(self):
+        self.assertRaises(exception.InvalidInput, db.share_get_all,
+                          self.ctxt, marker='fake_marker')
+
+
+class ShareSnapshotListTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareSnapshotListTestCase, self).setUp()
+        self.ctxt = context.RequestContext(user_id='user_id',
+                                           project_id='project_id',
+                                           is_admin=True)
+        share = db.share_create(self.ctxt, {'id': 'share', 'size': 1})
+        for i, status in enumerate(('available', 'error', 'available')):
+            db.share_snapshot_create(self.ctxt, {
+                'id': 'snapshot%s' % i, 'share_id': share['id'],
+                'display_name': 'snapshot%s' % i, 'status': status,
+                'project_id': 'project_id',
+                'created_at': datetime.datetime(2014, 1, 1, 0, 0, i)})
+
+    def test_share_snapshot_get_all_by_project_filters(self):
+        snapshots = db.share_snapshot_get_all_by_project(
+            self.ctxt, 'project_id', filters={'status': 'available'})
+        self.assertEqual(['snapshot0', 'snapshot2'],
+                         sorted(s['id'] for s in snapshots))
+        self.assertEqual('share', snapshots[0].share['id'])
+
+    def test_share_snapshot_get_all_paginated_columns(self):
+        snapshots = db.share_snapshot_get_all(
+            self.ctxt, limit=2, marker='snapshot2',
+            columns=('id', 'display_name'))
+        self.assertEqual([{'id': 'snapshot1', 'display_name': 'snapshot1'},
+                          {'id': 'snapshot0', 'display_name': 'snapshot0'}],
+                         snapshots)
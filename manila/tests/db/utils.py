@@ -0,0 +1,46 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Helpers capturing SQL statements run by the DB API in tests."""
+
+import contextlib
+
+from sqlalchemy import event
+
+from manila.db.sqlalchemy import api as db_api
+
+
+@contextlib.contextmanager
+def capture_statements():
+    """Collects (statement, parameters) pairs run on the engine meanwhile.
+
+    Pings of connections checked out from the pool are skipped.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        if statement != 'SELECT 1':
+            statements.append((statement, parameters))
+
+    engine = db_api.get_engine()
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+
+def count_statements(func):
+    """Returns the number of statements run by func."""
+    with capture_statements() as statements:
+        func()
+    return len(statements)
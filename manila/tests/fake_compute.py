@@ -18,6 +18,7 @@
 
 from oslo.config import cfg
 
+from manila import exception
 from manila.openstack.common import log as logging
 
 
@@ -91,6 +92,20 @@ class API(object):
     def server_get(self, *args, **kwargs):
         pass
 
+    def wait_for_server(self, context, instance_id, check, timeout,
+                        server=None):
+        """Checks the given server, otherwise polls it once."""
+        if server is not None and check(server):
+            return server
+        try:
+            server = self.server_get(context, instance_id)
+        except exception.InstanceNotFound:
+            server = None
+        if not check(server):
+            raise exception.WaitTimeout(name='Instance', id=instance_id,
+                                        timeout=timeout)
+        return server
+
     def keypair_list(self, *args, **kwargs):
         pass
 
@@ -114,3 +129,9 @@ class API(object):
 
     def security_group_rule_create(self, *args, **kwargs):
         pass
+
+    def server_update(self, *args, **kwargs):
+        pass
+
+    def server_interface_attach(self, *args, **kwargs):
+        pass
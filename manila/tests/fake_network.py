@@ -49,6 +49,9 @@ class FakeSubnet(object):
     def __getitem__(self, attr):
         return getattr(self, attr)
 
+    def __setitem__(self, attr, value):
+        setattr(self, attr, value)
+
 
 class FakePort(object):
     def __init__(self, **kwargs):
@@ -161,6 +164,9 @@ class API(object):
     def get_subnet(self, subnet_id):
         pass
 
+    def list_subnets(self, **search_opts):
+        return []
+
     def subnet_create(self, *args, **kwargs):
         pass
 
@@ -18,6 +18,7 @@
 
 from oslo.config import cfg
 
+from manila import exception
 from manila.openstack.common import log as logging
 
 
@@ -75,3 +76,31 @@ class API(object):
 
     def get_all_snapshots(self, search_opts):
         pass
+
+    def wait_for_volume(self, context, volume_id, check, timeout,
+                        volume=None):
+        """Checks the given volume, otherwise polls it once."""
+        if volume is not None and check(volume):
+            return volume
+        try:
+            volume = self.get(context, volume_id)
+        except exception.VolumeNotFound:
+            volume = None
+        if not check(volume):
+            raise exception.WaitTimeout(name='Volume', id=volume_id,
+                                        timeout=timeout)
+        return volume
+
+    def wait_for_snapshot(self, context, snapshot_id, check, timeout,
+                          snapshot=None):
+        """Checks the given snapshot, otherwise polls it once."""
+        if snapshot is not None and check(snapshot):
+            return snapshot
+        try:
+            snapshot = self.get_snapshot(context, snapshot_id)
+        except exception.VolumeSnapshotNotFound:
+            snapshot = None
+        if not check(snapshot):
+            raise exception.WaitTimeout(name='Volume snapshot',
+                                        id=snapshot_id, timeout=timeout)
+        return snapshot
@@ -53,6 +53,9 @@ class FakeNeutronClient(object):
     def show_subnet(self, subnet_uuid):
         pass
 
+    def list_subnets(self, **search_opts):
+        pass
+
     def create_router(self, body):
         return body
 
@@ -235,6 +238,18 @@ class NeutronApiTest(test.TestCase):
                 subnet_id)
             self.assertEqual(subnet, {})
 
+    def test_list_subnets(self):
+        fake_subnets = [{'fake subnet': 'fake subnet info'}]
+
+        with mock.patch.object(self.neutron_api.client, 'list_subnets',
+                               mock.Mock(return_value={
+                                   'subnets': fake_subnets})):
+
+            subnets = self.neutron_api.list_subnets(network_id='fake net id')
+            self.neutron_api.client.list_subnets.assert_called_once_with(
+                network_id='fake net id')
+            self.assertEqual(subnets, fake_subnets)
+
     def test_get_all_network(self):
         fake_networks = [{'fake network': 'fake network info'}]
         client_list_networks_mock = mock.Mock(
@@ -432,6 +447,10 @@ class NeutronApiTest(test.TestCase):
 
 class TestNeutronClient(test.TestCase):
 
+    def setUp(self):
+        super(TestNeutronClient, self).setUp()
+        neutron._client_cache.clear()
+
     @mock.patch.object(clientv20.Client, '__init__',
                        mock.Mock(return_value=None))
     def test_get_client_with_token(self):
@@ -475,3 +494,19 @@ class TestNeutronClient(test.TestCase):
 
         neutron.get_client(my_context)
         clientv20.Client.__init__.assert_called_once_with(**client_args)
+
+    @mock.patch.object(clientv20.Client, '__init__',
+                       mock.Mock(return_value=None))
+    def test_get_client_cached(self):
+        my_context = context.RequestContext('test_user', 'test_tenant',
+                                            auth_token='test_token',
+                                            is_admin=False)
+        another_context = context.RequestContext('test_user', 'test_tenant',
+                                                 auth_token='another_token',
+                                                 is_admin=False)
+
+        client = neutron.get_client(my_context)
+
+        self.assertIs(client, neutron.get_client(my_context))
+        self.assertIsNot(client, neutron.get_client(another_context))
+        self.assertEqual(2, clientv20.Client.__init__.call_count)
@@ -240,6 +240,36 @@ class ShareNetworkDBTest(test.TestCase):
         self.assertEqual(len(result), 1)
         self._check_fields(expected=share_nw_dict2, actual=result[0])
 
+    def test_get_all_by_project_filters_and_columns(self):
+        share_nw_dict2 = dict(self.share_nw_dict)
+        share_nw_dict2['id'] = 'fake share nw id2'
+        share_nw_dict2['name'] = 'fake name2'
+        share_nw_dict2['neutron_subnet_id'] = 'fake subnet id2'
+        db_api.share_network_create(self.fake_context, self.share_nw_dict)
+        db_api.share_network_create(self.fake_context, share_nw_dict2)
+
+        result = db_api.share_network_get_all_by_project(
+            self.fake_context,
+            self.fake_context.project_id,
+            filters={'name': 'fake name2'},
+            columns=('id', 'name'))
+
+        self.assertEqual([{'id': 'fake share nw id2', 'name': 'fake name2'}],
+                         result)
+
+    def test_get_all_sorted_and_paginated(self):
+        share_nw_dict2 = dict(self.share_nw_dict)
+        share_nw_dict2['id'] = 'fake share nw id2'
+        share_nw_dict2['neutron_subnet_id'] = 'fake subnet id2'
+        db_api.share_network_create(self.fake_context, self.share_nw_dict)
+        db_api.share_network_create(self.fake_context, share_nw_dict2)
+
+        result = db_api.share_network_get_all(
+            self.fake_context, sort_key='id', sort_dir='asc', limit=1,
+            marker=self.share_nw_dict['id'])
+
+        self.assertEqual(['fake share nw id2'], [r['id'] for r in result])
+
     def test_add_security_service(self):
         security_dict1 = {'id': 'fake security service id1',
                           'project_id': self.fake_context.project_id,
@@ -18,9 +18,11 @@ Tests For Capacity Weigher.
 
 import mock
 from oslo.config import cfg
+import testtools
 
 from manila import context
 from manila.openstack.common.scheduler import weights
+from manila.scheduler import host_manager
 from manila.scheduler.weights import capacity
 from manila import test
 from manila.tests.scheduler import fakes
@@ -93,3 +95,19 @@ class CapacityWeigherTestCase(test.TestCase):
         weighed_host = self._get_weighed_host(hostinfo_list)
         self.assertEqual(weighed_host.weight, 2.0)
         self.assertEqual(weighed_host.obj.host, 'host1')
+
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_weigh_objects_vectorized(self):
+        hosts = list(self._get_all_hosts())
+        hosts.append(fakes.FakeHostState('host5',
+                                         {'free_capacity_gb': 'infinite',
+                                          'reserved_percentage': 50}))
+        host_arrays = host_manager.HostStateArrays(hosts)
+        weigher = capacity.CapacityWeigher()
+        weighed_hosts = [weights.WeighedHost(host, 0.0) for host in hosts]
+
+        result = weigher.weigh_objects_vectorized(
+            host_arrays, host_arrays.get_rows(hosts), {})
+
+        self.assertEqual(weigher.weigh_objects(weighed_hosts, {}),
+                         list(result))
@@ -19,6 +19,7 @@ import mock
 
 from manila import context
 from manila import exception
+from manila.scheduler import driver
 from manila.scheduler import filter_scheduler
 from manila.scheduler import host_manager
 from manila.tests.scheduler import fakes
@@ -84,6 +85,40 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test_schedule_create_shares(self, _mock_service_get_all_by_topic):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        self.stubs.Set(driver, 'share_update_db',
+                       mock.Mock(return_value='fake_share'))
+        self.stubs.Set(sched.share_rpcapi, 'create_share', mock.Mock())
+        request_specs = [{
+            'share_id': 'fake_id%s' % i,
+            'snapshot_id': None,
+            'share_properties': {'project_id': 1, 'size': 500},
+        } for i in range(3)]
+        filter_properties = {}
+
+        decisions = sched.schedule_create_shares(fake_context, request_specs,
+                                                 filter_properties)
+
+        # Capacity consumed by the first share is taken into account
+        # when the second one is placed, nothing fits the third one.
+        self.assertEqual([{'host': 'host1'}, {'host': 'host3'}],
+                         decisions[:2])
+        self.assertIsNone(decisions[2]['host'])
+        self.assertIsInstance(decisions[2]['error'], exception.NoValidHost)
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        driver.share_update_db.assert_has_calls([
+            mock.call(fake_context, 'fake_id0', 'host1'),
+            mock.call(fake_context, 'fake_id1', 'host3'),
+        ])
+        self.assertEqual(2, sched.share_rpcapi.create_share.call_count)
+        self.assertEqual({}, filter_properties)
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
         sched = fakes.FakeFilterScheduler()
@@ -15,9 +15,12 @@
 Tests For Scheduler Host Filters.
 """
 
+import testtools
+
 from manila import context
 from manila.openstack.common import jsonutils
 from manila.openstack.common.scheduler import filters
+from manila.scheduler import host_manager
 from manila import test
 from manila.tests.scheduler import fakes
 from manila import utils
@@ -90,6 +93,27 @@ class HostFiltersTestCase(test.TestCase):
                                     'service': service})
         self.assertTrue(filt_cls.host_passes(host, filter_properties))
 
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_capacity_filter_vectorized(self):
+        filt_cls = self.class_map['CapacityFilter']()
+        filter_properties = {'size': 100}
+        capacities = [(200, 0), (120, 20), (120, 10), ('infinite', 100),
+                      ('unknown', 0), (None, 0), (0, 0)]
+        hosts = [fakes.FakeHostState('host%s' % i,
+                                     {'free_capacity_gb': free,
+                                      'reserved_percentage': reserved})
+                 for i, (free, reserved) in enumerate(capacities)]
+        host_arrays = host_manager.HostStateArrays(hosts)
+        rows = host_arrays.get_rows(hosts)
+
+        result = filt_cls.filter_all_vectorized(host_arrays, rows,
+                                                filter_properties)
+
+        self.assertEqual([filt_cls.host_passes(host, filter_properties)
+                          for host in hosts], list(result))
+        self.assertEqual([True, False, True, True, True, False, False],
+                         list(result))
+
     def test_retry_filter_disabled(self):
         # Test case where retry/re-scheduling is disabled.
         filt_cls = self.class_map['RetryFilter']()
@@ -17,6 +17,7 @@ Tests For HostManager
 """
 import mock
 from oslo.config import cfg
+import testtools
 
 from manila import db
 from manila import exception
@@ -152,6 +153,142 @@ class HostManagerTestCase(test.TestCase):
                 self.assertEqual(host_state_map[host].service, share_node)
             db.service_get_all_by_topic.assert_called_once_with(context, topic)
 
+    def test_get_all_host_states_share_cached(self):
+        context = 'fake_context'
+        services = [dict(service) for service in fakes.SHARE_SERVICES]
+        self.stubs.Set(db, 'service_get_all_by_topic',
+                       mock.Mock(return_value=services))
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', dict(free_capacity_gb=10, total_capacity_gb=20,
+                                   reserved_percentage=0))
+        self.host_manager.get_all_host_states_share(context)
+        host_state = self.host_manager.host_state_map['host1']
+        self.assertEqual(10, host_state.free_capacity_gb)
+        self.stubs.Set(host_manager.HostState, 'update_capabilities',
+                       mock.Mock())
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', dict(free_capacity_gb=15, total_capacity_gb=20,
+                                   reserved_percentage=0))
+        self.host_manager.get_all_host_states_share(context)
+
+        self.assertEqual(15, host_state.free_capacity_gb)
+        host_manager.HostState.update_capabilities.assert_called_once_with(
+            mock.ANY, services[0])
+        db.service_get_all_by_topic.assert_called_once_with(
+            context, CONF.share_topic)
+
+    def test_get_all_host_states_share_refresh_interval(self):
+        context = 'fake_context'
+        self.stubs.Set(db, 'service_get_all_by_topic',
+                       mock.Mock(return_value=fakes.SHARE_SERVICES))
+        self.stubs.Set(timeutils, 'is_older_than',
+                       mock.Mock(return_value=False))
+        self.host_manager.get_all_host_states_share(context)
+        self.host_manager.get_all_host_states_share(context)
+        self.assertEqual(1, db.service_get_all_by_topic.call_count)
+
+        timeutils.is_older_than.return_value = True
+        self.host_manager.get_all_host_states_share(context)
+        self.assertEqual(2, db.service_get_all_by_topic.call_count)
+
+        self.flags(scheduler_service_refresh_interval=0)
+        timeutils.is_older_than.return_value = False
+        self.host_manager.get_all_host_states_share(context)
+        self.assertEqual(3, db.service_get_all_by_topic.call_count)
+
+    def test_get_all_host_states_share_new_service(self):
+        context = 'fake_context'
+        capabilities = dict(free_capacity_gb=10, total_capacity_gb=20,
+                            reserved_percentage=0)
+        self.stubs.Set(db, 'service_get_all_by_topic',
+                       mock.Mock(return_value=fakes.SHARE_SERVICES[:1]))
+        self.host_manager.get_all_host_states_share(context)
+        self.host_manager.update_service_capabilities('share', 'host1',
+                                                      capabilities)
+        self.host_manager.get_all_host_states_share(context)
+        self.assertEqual(1, db.service_get_all_by_topic.call_count)
+        db.service_get_all_by_topic.return_value = fakes.SHARE_SERVICES[:2]
+
+        self.host_manager.update_service_capabilities('share', 'host2',
+                                                      capabilities)
+        self.host_manager.get_all_host_states_share(context)
+
+        self.assertEqual(2, db.service_get_all_by_topic.call_count)
+        self.assertEqual(set(['host1', 'host2']),
+                         set(self.host_manager.host_state_map))
+
+    def _get_all_host_states_vectorized(self):
+        self.flags(scheduler_use_vectorized_evaluation=True)
+        host_manager = fakes.FakeHostManager()
+        self.stubs.Set(db, 'service_get_all_by_topic',
+                       mock.Mock(return_value=fakes.SHARE_SERVICES))
+        return host_manager, list(
+            host_manager.get_all_host_states_share('fake_context'))
+
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_get_all_host_states_share_vectorized(self):
+        manager, hosts = self._get_all_host_states_vectorized()
+
+        host_arrays = manager.host_arrays
+        self.assertEqual(4, len(host_arrays.host_states))
+        for host_state in hosts:
+            row = host_state.host_row
+            self.assertIs(host_arrays, host_state.host_arrays)
+            self.assertEqual(host_state.free_capacity_gb,
+                             host_arrays.free_capacity_gb[row])
+            self.assertEqual(host_state.reserved_percentage,
+                             host_arrays.reserved_percentage[row])
+
+        manager.get_all_host_states_share('fake_context')
+        self.assertIs(host_arrays, manager.host_arrays)
+
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_vectorized_filtering_and_weighing(self):
+        manager, hosts = self._get_all_host_states_vectorized()
+        filter_properties = {'size': 300, 'resource_type': {}}
+        self.stubs.Set(manager.filter_handler, 'get_filtered_objects',
+                       mock.Mock(side_effect=lambda classes, objs, props:
+                                 list(objs)))
+
+        filtered = manager.get_filtered_hosts(
+            hosts, filter_properties, ['CapacityFilter', 'CapabilitiesFilter'])
+        weighed = manager.get_weighed_hosts(filtered, filter_properties)
+
+        self.assertEqual(['host1', 'host3'],
+                         [weighed_host.obj.host for weighed_host in weighed])
+        manager.filter_handler.get_filtered_objects.assert_called_once_with(
+            [manager._choose_host_filters('CapabilitiesFilter')[0]],
+            filtered, filter_properties)
+
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_vectorized_evaluation_matches_per_host(self):
+        manager, hosts = self._get_all_host_states_vectorized()
+        filter_properties = {'size': 100, 'resource_type': {}}
+
+        filtered = manager.get_filtered_hosts(hosts, filter_properties)
+        weighed = manager.get_weighed_hosts(filtered, filter_properties)
+        self.flags(scheduler_use_vectorized_evaluation=False)
+        expected_filtered = manager.get_filtered_hosts(hosts,
+                                                       filter_properties)
+        expected_weighed = manager.get_weighed_hosts(expected_filtered,
+                                                     filter_properties)
+
+        self.assertEqual(expected_filtered, filtered)
+        self.assertEqual(
+            [(host.obj, host.weight) for host in expected_weighed],
+            [(host.obj, host.weight) for host in weighed])
+
+    @testtools.skipIf(host_manager.np is None, 'NumPy is not available')
+    def test_vectorized_consume_from_share(self):
+        manager, hosts = self._get_all_host_states_vectorized()
+        host_state = manager.host_state_map['host1']
+
+        host_state.consume_from_share({'size': 24})
+
+        self.assertEqual(1000, manager.host_arrays.free_capacity_gb[
+            host_state.host_row])
+
 
 class HostStateTestCase(test.TestCase):
     """Test case for HostState class."""
@@ -78,7 +78,8 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  service_name='fake_name',
                                  host='fake_host',
                                  capabilities='fake_capabilities',
-                                 fanout=True)
+                                 fanout=True,
+                                 version='1.0')
 
     def test_create_share(self):
         self._test_scheduler_api('create_share',
@@ -89,3 +90,11 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  request_spec='fake_request_spec',
                                  filter_properties='filter_properties',
                                  version='1.0')
+
+    def test_create_shares(self):
+        self._test_scheduler_api('create_shares',
+                                 rpc_method='call',
+                                 topic='topic',
+                                 request_specs=['fake_request_spec'],
+                                 filter_properties='filter_properties',
+                                 version='1.1')
@@ -19,13 +19,17 @@ Tests For Scheduler
 
 import mock
 from oslo.config import cfg
+from oslo import messaging
 
 from manila import context
 from manila import db
 from manila import exception
 from manila.openstack.common import timeutils
+from manila import quota
+from manila import rpc
 from manila.scheduler import driver
 from manila.scheduler import manager
+from manila.scheduler import rpcapi as scheduler_rpcapi
 from manila.scheduler import simple
 from manila.share import rpcapi as share_rpcapi
 from manila import test
@@ -55,6 +59,12 @@ class SchedulerManagerTestCase(test.TestCase):
         manager = self.manager
         self.assertTrue(isinstance(manager.driver, self.driver_cls))
 
+    def test_expire_reservations(self):
+        with mock.patch.object(quota.QUOTAS, 'expire',
+                               mock.Mock(return_value=3)):
+            self.manager._expire_reservations(self.context)
+            quota.QUOTAS.expire.assert_called_once_with(self.context)
+
     def test_update_service_capabilities(self):
         service_name = 'fake_service'
         host = 'fake_host'
@@ -97,6 +107,45 @@ class SchedulerManagerTestCase(test.TestCase):
             self.manager.driver.schedule_create_share.assert_called_once_with(
                 self.context, request_spec, {})
 
+    @mock.patch.object(db, 'share_update', mock.Mock())
+    def test_create_shares(self):
+        request_specs = [{'share_id': 'fake_id1'}, {'share_id': 'fake_id2'}]
+        decisions = [{'host': 'fake_host'},
+                     {'host': None, 'error': exception.NoValidHost(reason='')}]
+        with mock.patch.object(self.manager.driver, 'schedule_create_shares',
+                               mock.Mock(return_value=decisions)):
+            result = self.manager.create_shares(self.context, self.topic,
+                                                request_specs,
+                                                filter_properties={})
+
+            self.assertEqual([{'share_id': 'fake_id1', 'host': 'fake_host'},
+                              {'share_id': 'fake_id2', 'host': None}],
+                             result)
+            self.manager.driver.schedule_create_shares.\
+                assert_called_once_with(self.context, request_specs, {})
+            db.share_update.assert_called_once_with(
+                self.context, 'fake_id2', {'status': 'error'})
+
+    def test_create_shares_through_rpc(self):
+        request_specs = [{'share_id': 'fake_id1'}]
+        target = messaging.Target(topic=CONF.scheduler_topic,
+                                  server=CONF.host)
+        server = rpc.get_server(target, [self.manager])
+        server.start()
+        self.addCleanup(server.wait)
+        self.addCleanup(server.stop)
+        with mock.patch.object(self.manager.driver, 'schedule_create_shares',
+                               mock.Mock(return_value=[
+                                   {'host': 'fake_host'}])):
+            result = scheduler_rpcapi.SchedulerAPI().create_shares(
+                self.context, self.topic, request_specs,
+                filter_properties={})
+
+            self.assertEqual([{'share_id': 'fake_id1', 'host': 'fake_host'}],
+                             result)
+            self.manager.driver.schedule_create_shares.\
+                assert_called_once_with(mock.ANY, request_specs, {})
+
 
 class SchedulerTestCase(test.TestCase):
     """Test case for base scheduler driver class."""
@@ -155,6 +204,24 @@ class SchedulerDriverBaseTestCase(SchedulerTestCase):
                           self.context, self.topic, 'schedule_something',
                           *fake_args, **fake_kwargs)
 
+    def test_schedule_create_shares(self):
+        request_specs = [{'share_id': 'fake_id1'}, {'share_id': 'fake_id2'}]
+        filter_properties = {'fake_key': ['fake_value']}
+        error = exception.NoValidHost(reason='')
+        with mock.patch.object(self.driver, 'schedule_create_share',
+                               mock.Mock(side_effect=['fake_host', error])):
+            result = self.driver.schedule_create_shares(
+                self.context, request_specs, filter_properties)
+
+            self.assertEqual([{'host': 'fake_host'},
+                              {'host': None, 'error': error}], result)
+            self.driver.schedule_create_share.assert_has_calls([
+                mock.call(self.context, request_specs[0], filter_properties),
+                mock.call(self.context, request_specs[1], filter_properties),
+            ])
+            for call in self.driver.schedule_create_share.call_args_list:
+                self.assertIsNot(filter_properties, call[0][2])
+
 
 class SchedulerDriverModuleTestCase(test.TestCase):
     """Test case for scheduler driver module methods."""
@@ -17,9 +17,12 @@
 
 import os
 
+import eventlet
 import mock
 from oslo.config import cfg
+import paramiko
 
+from manila.common import constants as const
 from manila import compute
 from manila import context
 from manila import exception
@@ -546,6 +549,20 @@ class GenericShareDriverTestCase(test.TestCase):
             '',
             snapshot=fake_vol_snap)
 
+    def test_allocate_container_creating(self):
+        creating_vol = fake_volume.FakeVolume(status='creating')
+        fake_vol = fake_volume.FakeVolume()
+        self.stubs.Set(self._driver.volume_api, 'create',
+                       mock.Mock(return_value=creating_vol))
+        self.stubs.Set(self._driver.volume_api, 'get',
+                       mock.Mock(return_value=fake_vol))
+
+        result = self._driver._allocate_container(self._context, self.share)
+
+        self.assertEqual(result, fake_vol)
+        self._driver.volume_api.get.assert_called_once_with(
+            self._context, fake_vol['id'])
+
     def test_allocate_container_error(self):
         fake_vol = fake_volume.FakeVolume(status='error')
         self.stubs.Set(self._driver.volume_api, 'create',
@@ -672,6 +689,27 @@ class GenericShareDriverTestCase(test.TestCase):
                                                 access['access_type'],
                                                 access['access_to'])
 
+    def test_update_access(self):
+        add_rules = [{'access_type': 'ip', 'access_to': '10.0.0.2'}]
+        delete_rules = [{'access_type': 'ip', 'access_to': '10.0.0.3'}]
+        helper = self._driver._helpers[self.share['share_proto']]
+        helper.update_access.return_value = []
+        self._driver.update_access(self._context, self.share, add_rules,
+                                   delete_rules, share_server=self.server)
+        helper.update_access.assert_called_once_with(
+            self.server['backend_details'],
+            self.share['name'],
+            add_rules,
+            delete_rules)
+
+    def test_update_access_failed_rules(self):
+        helper = self._driver._helpers[self.share['share_proto']]
+        helper.update_access.return_value = ['fake_access_id']
+        self.assertRaises(exception.ShareAccessUpdateFailed,
+                          self._driver.update_access,
+                          self._context, self.share, [], [],
+                          share_server=self.server)
+
     def test_setup_network(self):
         sim = self._driver.instance_manager
         net_info = {'server_id': 'fake',
@@ -705,82 +743,224 @@ class GenericShareDriverTestCase(test.TestCase):
         self._driver.teardown_server(self.fake_net_info)
         sim.delete_service_instance.assert_called_once()
 
-    def test_ssh_exec_connection_not_exist(self):
+    def test_ssh_exec(self):
         ssh_output = 'fake_ssh_output'
         cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(return_value=True)
-        ssh_pool = mock.Mock()
-        ssh_pool.create = mock.Mock(return_value=ssh)
-        self.stubs.Set(utils, 'SSHPool', mock.Mock(return_value=ssh_pool))
-        self.stubs.Set(processutils, 'ssh_execute',
+        self.stubs.Set(self._driver.ssh_sessions, 'execute',
                        mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {}
 
         result = self._driver._ssh_exec(self.server, cmd)
 
-        utils.SSHPool.assert_called_once_with(
-            self.server['ip'], 22, None, self.server['username'],
-            self.server['password'], self.server['pk_path'], max_size=1)
-        ssh_pool.create.assert_called_once_with()
-        processutils.ssh_execute.assert_called_once_with(ssh, 'fake command')
-        ssh.get_transport().is_active.assert_called_once_with()
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
+        self._driver.ssh_sessions.execute.assert_called_once_with(
+            self.server, 'fake command')
         self.assertEqual(ssh_output, result)
 
-    def test_ssh_exec_connection_exist(self):
-        ssh_output = 'fake_ssh_output'
-        cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(side_effect=lambda: True)
-        ssh_pool = mock.Mock()
-        self.stubs.Set(processutils, 'ssh_execute',
-                       mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {
-            self.server['instance_id']: (ssh_pool, ssh)
-        }
+    def test_teardown_server_closes_ssh_sessions(self):
+        self.stubs.Set(self._driver.ssh_sessions, 'close', mock.Mock())
+        self._driver.teardown_server(self.fake_net_info)
+        self._driver.ssh_sessions.close.assert_called_once_with(
+            self.fake_net_info.get('instance_id'))
 
-        result = self._driver._ssh_exec(self.server, cmd)
+    def test_update_share_status_evicts_idle_ssh_sessions(self):
+        self.stubs.Set(self._driver.ssh_sessions, 'evict_idle', mock.Mock())
+        self._driver._update_share_status()
+        self._driver.ssh_sessions.evict_idle.assert_called_once_with()
 
-        processutils.ssh_execute.assert_called_once_with(ssh, 'fake command')
-        ssh.get_transport().is_active.assert_called_once_with()
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
-        self.assertEqual(ssh_output, result)
+    def test_update_share_status_logs_client_cache_stats(self):
+        stats = {'nova': {'hits': 1}}
+        self.stubs.Set(generic.client_cache, 'get_all_stats',
+                       mock.Mock(return_value=stats))
+        self.stubs.Set(generic.LOG, 'debug', mock.Mock())
 
-    def test_ssh_exec_connection_recreation(self):
-        ssh_output = 'fake_ssh_output'
-        cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(side_effect=lambda: False)
-        ssh_pool = mock.Mock()
-        ssh_pool.create = mock.Mock(side_effect=lambda: ssh)
-        ssh_pool.remove = mock.Mock()
-        self.stubs.Set(processutils, 'ssh_execute',
-                       mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {
-            self.server['instance_id']: (ssh_pool, ssh)
+        self._driver._update_share_status()
+
+        generic.LOG.debug.assert_any_call("Client cache statistics: %s",
+                                          stats)
+
+
+def fake_ssh_client(active=True):
+    ssh = mock.Mock()
+    ssh.get_transport.return_value.is_active.return_value = active
+    return ssh
+
+
+class SSHSessionManagerTestCase(test.TestCase):
+    """Test case for SSH session manager of generic driver."""
+
+    def setUp(self):
+        super(SSHSessionManagerTestCase, self).setUp()
+        self.server = {
+            'instance_id': 'fake_instance_id',
+            'ip': 'fake_ip',
+            'username': 'fake_username',
+            'password': 'fake_password',
+            'pk_path': 'fake_pk_path',
         }
+        self.ssh_pool = mock.Mock(max_size=2, ip='fake_ip')
+        self.ssh_pool.create.side_effect = lambda: fake_ssh_client()
+        self.stubs.Set(utils, 'SSHPool',
+                       mock.Mock(return_value=self.ssh_pool))
+        self.stubs.Set(processutils, 'ssh_execute',
+                       mock.Mock(return_value=('fake_out', '')))
+        self.manager = generic.SSHSessionManager(pool_size=2, max_channels=2,
+                                                 idle_timeout=600)
 
-        result = self._driver._ssh_exec(self.server, cmd)
+    def test_execute(self):
+        result = self.manager.execute(self.server, 'fake command')
+        self.manager.execute(self.server, 'fake command')
 
-        processutils.ssh_execute.assert_called_once_with(ssh, 'fake command')
-        ssh.get_transport().is_active.assert_called_once_with()
-        ssh_pool.create.assert_called_once_with()
-        ssh_pool.remove.assert_called_once_with(ssh)
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
-        self.assertEqual(ssh_output, result)
+        self.assertEqual(('fake_out', ''), result)
+        utils.SSHPool.assert_called_once_with(
+            self.server['ip'], 22, None, self.server['username'],
+            self.server['password'], self.server['pk_path'], max_size=2)
+        self.ssh_pool.create.assert_called_once_with()
+        self.assertEqual(2, processutils.ssh_execute.call_count)
+        stats = self.manager.get_stats()
+        self.assertEqual(2, stats['commands'])
+        self.assertEqual(1, stats['open_sessions'])
+        self.assertEqual(1, stats['service_instances'])
+
+    def test_execute_concurrent_commands(self):
+        connections = []
+
+        def fake_ssh_execute(ssh, cmd):
+            connections.append(ssh)
+            eventlet.sleep(0)
+            return ('fake_out', '')
+
+        processutils.ssh_execute.side_effect = fake_ssh_execute
+        threads = [eventlet.spawn(self.manager.execute, self.server, 'cmd')
+                   for i in range(5)]
+        for thread in threads:
+            thread.wait()
+
+        self.assertEqual(2, self.ssh_pool.create.call_count)
+        self.assertEqual(5, len(connections))
+        for ssh in set(connections):
+            self.assertTrue(connections.count(ssh) <= 3)
+        self.assertEqual(2, self.manager.get_stats()['open_sessions'])
+
+    def test_execute_reopens_inactive_connection(self):
+        self.manager.execute(self.server, 'fake command')
+        sessions = self.manager._sessions[self.server['instance_id']]
+        ssh = list(sessions.connections)[0]
+        ssh.get_transport.return_value.is_active.return_value = False
+
+        self.manager.execute(self.server, 'fake command')
+
+        self.ssh_pool.remove.assert_called_once_with(ssh)
+        self.assertEqual(2, self.ssh_pool.create.call_count)
+        self.assertNotIn(ssh, sessions.connections)
+
+    def test_execute_error(self):
+        processutils.ssh_execute.side_effect = (
+            exception.ProcessExecutionError)
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self.manager.execute, self.server, 'fake command')
+        sessions = self.manager._sessions[self.server['instance_id']]
+        self.assertEqual([0], list(sessions.connections.values()))
+
+    def test_execute_connection_error(self):
+        self.ssh_pool.create.side_effect = paramiko.SSHException
+
+        self.assertRaises(paramiko.SSHException,
+                          self.manager.execute, self.server, 'fake command')
+        sessions = self.manager._sessions[self.server['instance_id']]
+        self.assertEqual({}, sessions.connections)
+        self.assertEqual(0, self.manager.get_stats()['commands'])
+
+    def test_close(self):
+        self.manager.execute(self.server, 'fake command')
+        sessions = self.manager._sessions[self.server['instance_id']]
+        ssh = list(sessions.connections)[0]
+
+        self.manager.close(self.server['instance_id'])
+
+        self.ssh_pool.remove.assert_called_once_with(ssh)
+        self.assertEqual({}, self.manager._sessions)
+
+    def test_evict_idle(self):
+        self.manager.execute(self.server, 'fake command')
+        self.manager.evict_idle()
+        self.assertIn(self.server['instance_id'], self.manager._sessions)
+
+        self.manager.idle_timeout = -1
+        self.manager.evict_idle()
+        self.assertEqual({}, self.manager._sessions)
+
+
+def fake_batch_output(*results):
+    marker = generic.RemoteCommandBatch.STEP_MARKER
+    return ''.join('%s%s %d %d\n' % (out, marker, index, exit_code)
+                   for index, (out, exit_code) in enumerate(results))
+
+
+class RemoteCommandBatchTestCase(test.TestCase):
+    """Test case for batches of remote commands of generic driver."""
+
+    def setUp(self):
+        super(RemoteCommandBatchTestCase, self).setUp()
+        self.server = {'instance_id': 'fake_instance_id'}
+        self._ssh_exec = mock.Mock(return_value=('', ''))
+        self.batch = generic.RemoteCommandBatch(self._ssh_exec, self.server)
+
+    def test_flush(self):
+        self._ssh_exec.return_value = (
+            fake_batch_output(('foo\n', 0), ('bar', 1), ('', 0)), '')
+        self.assertEqual(0, self.batch.add(['fake', 'cmd', '&&', 'cmd2']))
+        self.assertEqual(1, self.batch.add(['cmd3'], check_exit_code=False))
+        self.batch.defer(['sync'])
+        self.batch.defer(['sync'])
+        self.assertEqual(2, len(self.batch))
+
+        result = self.batch.flush()
+
+        self.assertEqual([('foo\n', 0), ('bar', 1), ('', 0)], result)
+        marker = generic.RemoteCommandBatch.STEP_MARKER
+        self._ssh_exec.assert_called_once_with(self.server, [
+            'fake', 'cmd', '&&', 'cmd2', ';', 'rc=$?', ';',
+            'echo', marker, '0', '$rc', ';',
+            '[', '$rc', '-eq', '0', ']', '||', 'exit', '$rc', ';',
+            'cmd3', ';', 'rc=$?', ';', 'echo', marker, '1', '$rc', ';',
+            'sync', ';', 'rc=$?', ';', 'echo', marker, '2', '$rc', ';',
+            '[', '$rc', '-eq', '0', ']', '||', 'exit', '$rc', ';',
+        ])
+        self.assertEqual(0, len(self.batch))
+
+    def test_flush_empty(self):
+        self.batch.defer(['sync'])
+        self.assertEqual([], self.batch.flush())
+        self.assertFalse(self._ssh_exec.called)
+        self.batch.add(['cmd'])
+        self.batch.flush()
+        self.assertNotIn('sync', self._ssh_exec.call_args[0][1])
+
+    def test_flush_step_failed(self):
+        self._ssh_exec.side_effect = exception.ProcessExecutionError(
+            exit_code=2, stdout=fake_batch_output(('', 0), ('err_out', 2)),
+            stderr='fake_stderr')
+        self.batch.add(['cmd1'])
+        self.batch.add(['cmd2', 'arg'])
+        self.batch.add(['cmd3'])
+
+        e = self.assertRaises(exception.ProcessExecutionError,
+                              self.batch.flush)
+
+        self.assertEqual(2, e.exit_code)
+        self.assertEqual('cmd2 arg', e.cmd)
+        self.assertEqual('err_out', e.stdout)
+        self.assertEqual('fake_stderr', e.stderr)
+
+    def test_flush_connection_error(self):
+        error = exception.ProcessExecutionError(exit_code=255)
+        self._ssh_exec.side_effect = error
+        self.batch.add(['cmd1'])
+
+        e = self.assertRaises(exception.ProcessExecutionError,
+                              self.batch.flush)
+
+        self.assertIs(error, e)
 
 
 class NFSHelperTestCase(test.TestCase):
@@ -805,20 +985,37 @@ class NFSHelperTestCase(test.TestCase):
                                                    'fake_share')])
         self.assertEqual(ret, expected_location)
 
+    def _fake_batch(self):
+        batch = mock.Mock()
+        self.stubs.Set(self._helper, '_get_batch',
+                       mock.Mock(return_value=batch))
+        return batch
+
+    def _get_sync_cmd(self):
+        return ['sudo', 'cp ', const.NFS_EXPORTS_FILE_TEMP,
+                const.NFS_EXPORTS_FILE, '&&', 'sudo', 'exportfs', '-a']
+
     def test_allow_access(self):
-        self.stubs.Set(self._helper, '_sync_nfs_temp_and_perm_files',
-                       mock.Mock())
+        batch = self._fake_batch()
         self._helper.allow_access(self.server, 'fake_share',
                                   'ip', '10.0.0.2')
         local_path = os.path.join(CONF.share_mount_path, 'fake_share')
-        self._ssh_exec.assert_has_calls([
-            mock.call(self.server, ['sudo', 'exportfs']),
-            mock.call(self.server, ['sudo', 'exportfs', '-o',
-                                    'rw,no_subtree_check',
-                                    ':'.join(['10.0.0.2', local_path])])
-        ])
-        self._helper._sync_nfs_temp_and_perm_files.assert_called_once_with(
-            self.server)
+        self._ssh_exec.assert_called_once_with(self.server,
+                                               ['sudo', 'exportfs'])
+        self._helper._get_batch.assert_called_once_with(self.server)
+        batch.add.assert_called_once_with(
+            ['sudo', 'exportfs', '-o', 'rw,no_subtree_check',
+             ':'.join(['10.0.0.2', local_path])])
+        batch.defer.assert_called_once_with(self._get_sync_cmd())
+        batch.flush.assert_called_once_with()
+
+    def test_allow_access_exists(self):
+        local_path = os.path.join(CONF.share_mount_path, 'fake_share')
+        self._ssh_exec.return_value = ('%s\t10.0.0.2\n' % local_path, '')
+        self.assertRaises(exception.ShareAccessExists,
+                          self._helper.allow_access,
+                          self.server, 'fake_share', 'ip', '10.0.0.2')
+        self.assertEqual(1, self._ssh_exec.call_count)
 
     def test_allow_access_no_ip(self):
         self.assertRaises(
@@ -828,19 +1025,88 @@ class NFSHelperTestCase(test.TestCase):
         )
 
     def test_deny_access(self):
-        self.stubs.Set(self._helper, '_sync_nfs_temp_and_perm_files',
-                       mock.Mock())
+        batch = self._fake_batch()
         local_path = os.path.join(CONF.share_mount_path, 'fake_share')
         self._helper.deny_access(self.server, 'fake_share', 'ip', '10.0.0.2')
         export_string = ':'.join(['10.0.0.2', local_path])
-        expected_exec = ['sudo', 'exportfs', '-u', export_string]
-        self._ssh_exec.assert_called_once_with(self.server, expected_exec)
-        self._helper._sync_nfs_temp_and_perm_files.assert_called_once_with(
-            self.server)
+        batch.add.assert_called_once_with(
+            ['sudo', 'exportfs', '-u', export_string])
+        batch.defer.assert_called_once_with(self._get_sync_cmd())
+        batch.flush.assert_called_once_with()
+        self.assertFalse(self._ssh_exec.called)
 
-    def test_sync_nfs_temp_and_perm_files(self):
-        self._helper._sync_nfs_temp_and_perm_files(self.server)
-        self._helper._ssh_exec.assert_called_once_with(self.server, mock.ANY)
+    def test_update_access(self):
+        local_path = os.path.join(CONF.share_mount_path, 'fake_share')
+        exports = '%s\t10.0.0.3\n%s\n\t\t10.0.0.4\n/other\t10.0.0.2\n' % (
+            local_path, local_path)
+        self._ssh_exec.return_value = (exports, '')
+        add_rules = [{'id': 'id2', 'access_type': 'ip',
+                      'access_to': '10.0.0.2'},
+                     {'id': 'id4', 'access_type': 'ip',
+                      'access_to': '10.0.0.4'}]
+        delete_rules = [{'id': 'id3', 'access_type': 'ip',
+                         'access_to': '10.0.0.3'},
+                        {'id': 'id5', 'access_type': 'ip',
+                         'access_to': '10.0.0.5'}]
+
+        batch = self._fake_batch()
+        batch.add.side_effect = [0, 1]
+        batch.flush.return_value = [('', 0), ('', 0), ('', 0)]
+
+        failed_ids = self._helper.update_access(self.server, 'fake_share',
+                                                add_rules, delete_rules)
+
+        self.assertEqual([], failed_ids)
+        self._ssh_exec.assert_called_once_with(self.server,
+                                               ['sudo', 'exportfs'])
+        batch.add.assert_has_calls([
+            mock.call(['sudo', 'exportfs', '-u',
+                       ':'.join(['10.0.0.3', local_path])],
+                      check_exit_code=False),
+            mock.call(['sudo', 'exportfs', '-o', 'rw,no_subtree_check',
+                       ':'.join(['10.0.0.2', local_path])],
+                      check_exit_code=False),
+        ])
+        self.assertEqual(2, batch.add.call_count)
+        batch.defer.assert_called_once_with(self._get_sync_cmd())
+        batch.flush.assert_called_once_with()
+
+    def test_update_access_failed_command(self):
+        add_rules = [{'id': 'id%s' % i, 'access_type': 'ip',
+                      'access_to': '10.0.0.%s' % i} for i in range(3)]
+        batch = self._fake_batch()
+        batch.add.side_effect = [0, 1, 2]
+        batch.flush.return_value = [('', 0), ('bad', 1), ('', 0), ('', 0)]
+
+        failed_ids = self._helper.update_access(self.server, 'fake_share',
+                                                add_rules, [])
+
+        self.assertEqual(['id1'], failed_ids)
+        self.assertEqual(3, batch.add.call_count)
+
+    def test_update_access_nothing_to_change(self):
+        local_path = os.path.join(CONF.share_mount_path, 'fake_share')
+        self._ssh_exec.return_value = ('%s\t10.0.0.2\n' % local_path, '')
+        add_rules = [{'id': 'id2', 'access_type': 'ip',
+                      'access_to': '10.0.0.2'}]
+
+        self._helper.update_access(self.server, 'fake_share', add_rules, [])
+
+        self._ssh_exec.assert_called_once_with(self.server,
+                                               ['sudo', 'exportfs'])
+
+    def test_update_access_no_ip(self):
+        add_rules = [{'id': 'fake_id', 'access_type': 'fake',
+                      'access_to': 'fakerule'}]
+        self.assertEqual(['fake_id'],
+                         self._helper.update_access(self.server, 'fake_share',
+                                                    add_rules, []))
+        self.assertFalse(self._ssh_exec.called)
+
+    def test_get_batch(self):
+        batch = self._helper._get_batch(self.server)
+        self.assertIsInstance(batch, generic.RemoteCommandBatch)
+        self.assertEqual(self.server, batch.server)
 
 
 class CIFSHelperTestCase(test.TestCase):
@@ -864,63 +1130,69 @@ class CIFSHelperTestCase(test.TestCase):
             ['sudo', 'net', 'conf', 'list'],
         )
 
-    def test_create_export_share_does_not_exist(self):
-        def fake_ssh_exec(*args, **kwargs):
-            if 'showshare' in args[1]:
-                raise exception.ProcessExecutionError()
-            else:
-                return ('', '')
+    def _fake_batch(self):
+        batch = mock.Mock()
+        self.stubs.Set(self._helper, '_get_batch',
+                       mock.Mock(return_value=batch))
+        return batch
+
+    def _check_create_export_batch(self, batch):
+        batch.add.assert_any_call([
+            'sudo', 'net', 'conf', 'addshare', self.share_name,
+            self._helper.configuration.share_mount_path,
+            'writeable=y', 'guest_ok=y',
+        ])
+        batch.add.assert_any_call([
+            'sudo', 'net', 'conf', 'setparm', self.share_name,
+            '\"hosts deny\"', '0.0.0.0/0',
+        ])
+        batch.flush.assert_called_once_with()
 
-        self.stubs.Set(self._helper, '_ssh_exec',
-                       mock.Mock(side_effect=fake_ssh_exec))
+    def test_create_export_share_does_not_exist(self):
+        batch = self._fake_batch()
+        self._helper._ssh_exec.side_effect = exception.ProcessExecutionError
 
         ret = self._helper.create_export(self.server_details, self.share_name)
+
         expected_location = '//%s/%s' % (
             self.server_details['public_address'], self.share_name)
         self.assertEqual(ret, expected_location)
-        self._helper._ssh_exec.assert_has_calls([
-            mock.call(
-                self.server_details,
-                ['sudo', 'net', 'conf', 'showshare', self.share_name, ]
-            ),
-            mock.call(
-                self.server_details,
-                [
-                    'sudo', 'net', 'conf', 'addshare', self.share_name,
-                    self._helper.configuration.share_mount_path,
-                    'writeable=y', 'guest_ok=y',
-                ]
-            ),
-            mock.call(self.server_details, mock.ANY),
-        ])
+        self._helper._ssh_exec.assert_called_once_with(
+            self.server_details,
+            ['sudo', 'net', 'conf', 'showshare', self.share_name, ])
+        self._check_create_export_batch(batch)
+        self.assertEqual(6, batch.add.call_count)
+
+    def test_create_export_share_does_not_exist_create_error(self):
+        batch = self._fake_batch()
+        batch.flush.side_effect = exception.ProcessExecutionError
+        self._helper._ssh_exec.side_effect = exception.ProcessExecutionError
+        self.stubs.Set(generic.LOG, 'error', mock.Mock())
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self._helper.create_export,
+                          self.server_details, self.share_name)
+        self.assertEqual(1, generic.LOG.error.call_count)
 
     def test_create_export_share_exist_recreate_true(self):
+        batch = self._fake_batch()
+
         ret = self._helper.create_export(self.server_details, self.share_name,
                                          recreate=True)
+
         expected_location = '//%s/%s' % (
             self.server_details['public_address'], self.share_name)
         self.assertEqual(ret, expected_location)
-        self._helper._ssh_exec.assert_has_calls([
-            mock.call(
-                self.server_details,
-                ['sudo', 'net', 'conf', 'showshare', self.share_name, ]
-            ),
-            mock.call(
-                self.server_details,
-                ['sudo', 'net', 'conf', 'delshare', self.share_name, ]
-            ),
-            mock.call(
-                self.server_details,
-                [
-                    'sudo', 'net', 'conf', 'addshare', self.share_name,
-                    self._helper.configuration.share_mount_path,
-                    'writeable=y', 'guest_ok=y',
-                ]
-            ),
-            mock.call(self.server_details, mock.ANY),
-        ])
+        self.assertFalse(self._helper._ssh_exec.called)
+        self.assertEqual(
+            mock.call(['sudo', 'net', 'conf', 'delshare', self.share_name],
+                      check_exit_code=False),
+            batch.add.call_args_list[0])
+        self._check_create_export_batch(batch)
+        self.assertEqual(7, batch.add.call_count)
 
     def test_create_export_share_exist_recreate_false(self):
+        batch = self._fake_batch()
         self.assertRaises(
             exception.ShareBackendException,
             self._helper.create_export,
@@ -928,12 +1200,10 @@ class CIFSHelperTestCase(test.TestCase):
             self.share_name,
             recreate=False,
         )
-        self._helper._ssh_exec.assert_has_calls([
-            mock.call(
-                self.server_details,
-                ['sudo', 'net', 'conf', 'showshare', self.share_name, ]
-            ),
-        ])
+        self._helper._ssh_exec.assert_called_once_with(
+            self.server_details,
+            ['sudo', 'net', 'conf', 'showshare', self.share_name, ])
+        self.assertFalse(batch.flush.called)
 
     def test_remove_export(self):
         self._helper.remove_export(self.server_details, self.share_name)
@@ -1074,3 +1344,78 @@ class CIFSHelperTestCase(test.TestCase):
         self._helper._get_allow_hosts.assert_called_once_with(
             self.server_details, self.share_name)
         self._helper._set_allow_hosts.assert_has_calls([])
+
+    def test_update_access(self):
+        self.stubs.Set(self._helper, '_get_allow_hosts',
+                       mock.Mock(return_value=['1.1.1.1', '1.1.1.2']))
+        self.stubs.Set(self._helper, '_set_allow_hosts', mock.Mock())
+        add_rules = [{'id': 'id2', 'access_type': 'ip',
+                      'access_to': '1.1.1.2'},
+                     {'id': 'id3', 'access_type': 'ip',
+                      'access_to': '1.1.1.3'}]
+        delete_rules = [{'id': 'id1', 'access_type': 'ip',
+                         'access_to': '1.1.1.1'}]
+
+        failed_ids = self._helper.update_access(
+            self.server_details, self.share_name, add_rules, delete_rules)
+
+        self.assertEqual([], failed_ids)
+        self._helper._get_allow_hosts.assert_called_once_with(
+            self.server_details, self.share_name)
+        self._helper._set_allow_hosts.assert_called_once_with(
+            self.server_details, ['1.1.1.2', '1.1.1.3'], self.share_name)
+
+    def test_update_access_failed_host(self):
+        def set_allow_hosts(server, hosts, share_name):
+            if 'bad' in hosts:
+                raise exception.ProcessExecutionError(stderr='bad host')
+
+        self.stubs.Set(self._helper, '_get_allow_hosts',
+                       mock.Mock(return_value=['1.1.1.1', '1.1.1.2']))
+        self.stubs.Set(self._helper, '_set_allow_hosts',
+                       mock.Mock(side_effect=set_allow_hosts))
+        add_rules = [{'id': 'id_bad', 'access_type': 'ip',
+                      'access_to': 'bad'},
+                     {'id': 'id3', 'access_type': 'ip',
+                      'access_to': '1.1.1.3'}]
+        delete_rules = [{'id': 'id1', 'access_type': 'ip',
+                         'access_to': '1.1.1.1'}]
+
+        failed_ids = self._helper.update_access(
+            self.server_details, self.share_name, add_rules, delete_rules)
+
+        self.assertEqual(['id_bad'], failed_ids)
+        self.assertEqual(
+            mock.call(self.server_details, ['1.1.1.2', '1.1.1.3'],
+                      self.share_name),
+            self._helper._set_allow_hosts.call_args)
+
+    def test_update_access_nothing_to_change(self):
+        self.stubs.Set(self._helper, '_get_allow_hosts',
+                       mock.Mock(return_value=['1.1.1.1']))
+        self.stubs.Set(self._helper, '_set_allow_hosts', mock.Mock())
+        add_rules = [{'id': 'id1', 'access_type': 'ip',
+                      'access_to': '1.1.1.1'}]
+        delete_rules = [{'id': 'id2', 'access_type': 'ip',
+                         'access_to': '1.1.1.2'}]
+
+        self._helper.update_access(
+            self.server_details, self.share_name, add_rules, delete_rules)
+
+        self.assertFalse(self._helper._set_allow_hosts.called)
+
+    def test_update_access_wrong_type(self):
+        self.stubs.Set(self._helper, '_get_allow_hosts',
+                       mock.Mock(return_value=[]))
+        self.stubs.Set(self._helper, '_set_allow_hosts', mock.Mock())
+        add_rules = [{'id': 'id1', 'access_type': 'fake',
+                      'access_to': '1.1.1.1'},
+                     {'id': 'id2', 'access_type': 'ip',
+                      'access_to': '1.1.1.2'}]
+
+        failed_ids = self._helper.update_access(
+            self.server_details, self.share_name, add_rules, [])
+
+        self.assertEqual(['id1'], failed_ids)
+        self._helper._set_allow_hosts.assert_called_once_with(
+            self.server_details, ['1.1.1.2'], self.share_name)
@@ -19,6 +19,7 @@ import errno
 import os
 import subprocess
 
+import eventlet
 import mock
 from oslo.config import cfg
 
@@ -102,6 +103,114 @@ class GlusterAddressTestCase(test.TestCase):
         self.assertEqual(ret[1], {})
 
 
+class GlusterExportDirUpdaterTestCase(test.TestCase):
+    """Tests GlusterExportDirUpdater."""
+
+    def setUp(self):
+        super(GlusterExportDirUpdaterTestCase, self).setUp()
+        self.get_export_dir_dict = mock.Mock(
+            return_value={'example.com': ['10.0.0.1']})
+        self.set_export_dir_dict = mock.Mock()
+        self.updater = glusterfs.GlusterExportDirUpdater(
+            self.get_export_dir_dict, self.set_export_dir_dict)
+
+    def test_update_coalesces_concurrent_changes(self):
+        allow = glusterfs.GlusterfsShareDriver._allow_cbk
+        deny = glusterfs.GlusterfsShareDriver._deny_cbk
+        threads = [
+            eventlet.spawn(self.updater.update, 'share1',
+                           [('10.0.0.2', allow)]),
+            eventlet.spawn(self.updater.update, 'share2',
+                           [('10.0.0.3', allow), ('10.0.0.4', allow)]),
+            eventlet.spawn(self.updater.update, 'example.com',
+                           [('10.0.0.1', deny)]),
+        ]
+        for thread in threads:
+            thread.wait()
+
+        self.get_export_dir_dict.assert_called_once_with()
+        self.set_export_dir_dict.assert_called_once_with(
+            {'share1': ['10.0.0.2'], 'share2': ['10.0.0.3', '10.0.0.4']})
+        self.assertEqual(
+            {'share1': ['10.0.0.2'], 'share2': ['10.0.0.3', '10.0.0.4']},
+            self.updater.export_dir_dict)
+
+    def test_update_keeps_export_dir_dict(self):
+        allow = glusterfs.GlusterfsShareDriver._allow_cbk
+        self.get_export_dir_dict.side_effect = [
+            {'example.com': ['10.0.0.1']},
+            {'example.com': ['10.0.0.1'], 'share1': ['10.0.0.2']}]
+        self.stubs.Set(glusterfs.LOG, 'warning', mock.Mock())
+
+        self.updater.update('share1', [('10.0.0.2', allow)])
+        self.updater.update('share1', [('10.0.0.3', allow)])
+
+        self.assertEqual(2, self.get_export_dir_dict.call_count)
+        self.assertEqual(2, self.set_export_dir_dict.call_count)
+        self.assertEqual(
+            {'example.com': ['10.0.0.1'],
+             'share1': ['10.0.0.2', '10.0.0.3']},
+            self.updater.export_dir_dict)
+        self.assertFalse(glusterfs.LOG.warning.called)
+
+    def test_update_reloads_on_drift(self):
+        allow = glusterfs.GlusterfsShareDriver._allow_cbk
+        self.get_export_dir_dict.side_effect = [
+            {'example.com': ['10.0.0.1']},
+            {'example.com': ['10.0.0.1'], 'other': ['10.0.0.9']}]
+        self.stubs.Set(glusterfs.LOG, 'warning', mock.Mock())
+
+        self.updater.update('share1', [('10.0.0.2', allow)])
+        self.updater.update('share1', [('10.0.0.3', allow)])
+
+        self.set_export_dir_dict.assert_called_with(
+            {'example.com': ['10.0.0.1'], 'other': ['10.0.0.9'],
+             'share1': ['10.0.0.3']})
+        self.assertEqual(1, glusterfs.LOG.warning.call_count)
+
+    def test_update_failing_change_of_one_share(self):
+        allow = glusterfs.GlusterfsShareDriver._allow_cbk
+
+        def fail(ddict, edir, host):
+            ddict[edir].append(host)
+            raise exception.GlusterfsException('fake')
+
+        self.stubs.Set(glusterfs.LOG, 'exception', mock.Mock())
+        threads = [
+            eventlet.spawn(self.updater.update, 'share1',
+                           [('10.0.0.2', allow)]),
+            eventlet.spawn(self.updater.update, 'example.com',
+                           [('10.0.0.3', fail)]),
+        ]
+
+        threads[0].wait()
+        self.assertRaises(exception.GlusterfsException, threads[1].wait)
+        self.set_export_dir_dict.assert_called_once_with(
+            {'example.com': ['10.0.0.1'], 'share1': ['10.0.0.2']})
+
+    def test_update_noop(self):
+        self.updater.update('example.com', [('10.0.0.1', mock.Mock(
+            return_value=True))])
+
+        self.get_export_dir_dict.assert_called_once_with()
+        self.assertFalse(self.set_export_dir_dict.called)
+
+    def test_update_failure_invalidates_cache(self):
+        allow = glusterfs.GlusterfsShareDriver._allow_cbk
+        self.set_export_dir_dict.side_effect = [
+            exception.ProcessExecutionError, None]
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self.updater.update, 'share1', [('10.0.0.2', allow)])
+        self.assertEqual(None, self.updater.export_dir_dict)
+
+        self.updater.update('share1', [('10.0.0.2', allow)])
+        self.assertEqual(2, self.get_export_dir_dict.call_count)
+        self.assertEqual(
+            {'example.com': ['10.0.0.1'], 'share1': ['10.0.0.2']},
+            self.updater.export_dir_dict)
+
+
 class GlusterfsShareDriverTestCase(test.TestCase):
     """Tests GlusterfsShareDriver."""
 
@@ -458,7 +567,7 @@ class GlusterfsShareDriverTestCase(test.TestCase):
     def test_manage_access_noop(self):
         cbk = mock.Mock(return_value=True)
         access = {'access_type': 'ip', 'access_to': '10.0.0.1'}
-        self._driver._get_export_dir_dict = mock.Mock()
+        self._driver._get_export_dir_dict = mock.Mock(return_value={})
         self._driver.gluster_address = mock.Mock(
             make_gluster_args=mock.Mock(return_value=(('true',), {})))
         expected_exec = []
@@ -590,3 +699,55 @@ class GlusterfsShareDriverTestCase(test.TestCase):
                                        share_server)
         self.assertEqual(ret, None)
         self._driver._manage_access.assert_called_once()
+
+    def test_update_access(self):
+        add_rules = [{'id': 'id2', 'access_type': 'ip',
+                      'access_to': '10.0.0.2'},
+                     {'id': 'id3', 'access_type': 'ip',
+                      'access_to': '10.0.0.3'}]
+        delete_rules = [{'id': 'id1', 'access_type': 'ip',
+                         'access_to': '10.0.0.1'}]
+        self._driver._get_export_dir_dict = \
+            mock.Mock(return_value={'fakename': ['10.0.0.1'],
+                                    'example.com': ['10.0.0.1']})
+        self._driver.gluster_address = mock.Mock(
+            make_gluster_args=mock.Mock(return_value=(('true',), {})))
+        self._driver.update_access(self._context, self.share, add_rules,
+                                   delete_rules)
+        self._driver._get_export_dir_dict.assert_called_once_with()
+        self._driver.gluster_address.make_gluster_args.\
+            assert_called_once_with(
+                'volume', 'set', self._driver.gluster_address.volume,
+                'nfs.export-dir',
+                '/example.com(10.0.0.1),/fakename(10.0.0.2|10.0.0.3)')
+        self.assertEqual(fake_utils.fake_execute_get_log(), ['true'])
+
+    def test_update_access_noop(self):
+        add_rules = [{'id': 'id1', 'access_type': 'ip',
+                      'access_to': '10.0.0.1'}]
+        delete_rules = [{'id': 'id2', 'access_type': 'ip',
+                         'access_to': '10.0.0.2'}]
+        self._driver._get_export_dir_dict = \
+            mock.Mock(return_value={'fakename': ['10.0.0.1']})
+        self._driver.gluster_address = mock.Mock(
+            make_gluster_args=mock.Mock(return_value=(('true',), {})))
+        self._driver.update_access(self._context, self.share, add_rules,
+                                   delete_rules)
+        self.assertFalse(self._driver.gluster_address.make_gluster_args.called)
+
+    def test_update_access_bad_access_type(self):
+        add_rules = [{'id': 'id1', 'access_type': 'ip',
+                      'access_to': '10.0.0.1'},
+                     {'id': 'id_bad', 'access_type': 'bad',
+                      'access_to': 'fake'}]
+        self._driver._get_export_dir_dict = mock.Mock(return_value={})
+        self._driver.gluster_address = mock.Mock(
+            make_gluster_args=mock.Mock(return_value=(('true',), {})))
+        exc = self.assertRaises(exception.ShareAccessUpdateFailed,
+                                self._driver.update_access,
+                                self._context, self.share, add_rules, [])
+        self.assertEqual(['id_bad'], exc.kwargs['access_ids'])
+        self._driver.gluster_address.make_gluster_args.\
+            assert_called_once_with(
+                'volume', 'set', self._driver.gluster_address.volume,
+                'nfs.export-dir', '/fakename(10.0.0.1)')
@@ -18,6 +18,7 @@
 import copy
 import os
 
+import eventlet
 import mock
 from oslo.config import cfg
 
@@ -326,6 +327,30 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self.assertFalse(self._manager._check_server_availability.called)
         self.assertFalse(result)
 
+    def test_delete_server(self):
+        self.stubs.Set(self._manager.compute_api, 'server_delete',
+                       mock.Mock())
+        self.stubs.Set(self._manager.compute_api, 'server_get',
+                       mock.Mock(side_effect=exception.InstanceNotFound(
+                           instance_id='fake_id')))
+
+        self._manager._delete_server(self._context, 'fake_id')
+
+        self._manager.compute_api.server_delete.assert_called_once_with(
+            self._context, 'fake_id')
+        self._manager.compute_api.server_get.assert_called_once_with(
+            self._context, 'fake_id')
+
+    def test_delete_server_timeout(self):
+        self.stubs.Set(self._manager.compute_api, 'server_delete',
+                       mock.Mock())
+        self.stubs.Set(self._manager.compute_api, 'server_get',
+                       mock.Mock(return_value=fake_compute.FakeServer()))
+
+        self.assertRaises(exception.WaitTimeout,
+                          self._manager._delete_server,
+                          self._context, 'fake_id')
+
     def test_get_key_create_new(self):
         fake_keypair = fake_compute.FakeKeypair(
             name=CONF.manila_service_keypair_name)
@@ -469,11 +494,51 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self.assertIs(result, fake_server)
         self.assertEqual(result['public_address'], '127.0.0.1')
 
+    def test_create_service_instance_subnet_connected(self):
+        fake_port = fake_network.FakePort(
+            fixed_ips=[{'ip_address': '127.0.0.1'}])
+        fake_network_data = {
+            'router': {'id': 'fake-router-id'},
+            'service_subnet': {'id': 'fake-service-subnet-id'},
+            'service_port': fake_port,
+            'ports': [fake_port],
+        }
+        self._manager._connected_subnet_ids = set(['fake-service-subnet-id'])
+        self._manager._connected_interface_name = 'fake_interface_name'
+        self.stubs.Set(service_instance.ip_lib, 'device_exists',
+                       mock.Mock(return_value=True))
+        self.stubs.Set(self._manager, '_get_service_image',
+                       mock.Mock(return_value='fake_image_id'))
+        self.stubs.Set(self._manager, '_get_key',
+                       mock.Mock(
+                           return_value=('fake_key_name', 'fake_key_path')))
+        self.stubs.Set(self._manager, '_setup_network_for_instance',
+                       mock.Mock(return_value=fake_network_data))
+        self.stubs.Set(self._manager,
+                       '_setup_connectivity_with_service_instances',
+                       mock.Mock())
+        self.stubs.Set(self._manager.compute_api, 'server_create',
+                       mock.Mock(return_value=fake_compute.FakeServer()))
+        self.stubs.Set(self._manager, '_get_server_ip',
+                       mock.Mock(return_value='fake_ip'))
+        self.stubs.Set(self._manager, '_get_or_create_security_group',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self._manager, '_check_server_availability',
+                       mock.Mock(return_value=True))
+
+        self._manager._create_service_instance(
+            self._context, 'fake_instance_name', 'fake-net', 'fake-subnet')
+
+        self.assertFalse(
+            self._manager._setup_connectivity_with_service_instances.called)
+        self.assertEqual(1, self._manager.compute_api.server_create.call_count)
+
     def test_create_service_instance_error(self):
         fake_server = fake_compute.FakeServer(status='ERROR')
         fake_port = fake_network.FakePort()
         fake_security_group = fake_compute.FakeSecurityGroup()
         fake_network_data = {
+            'service_subnet': {'id': 'fake-service-subnet-id'},
             'ports': [fake_port],
         }
 
@@ -511,6 +576,7 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         fake_port = fake_network.FakePort()
         fake_security_group = fake_compute.FakeSecurityGroup()
         fake_network_data = {
+            'service_subnet': {'id': 'fake-service-subnet-id'},
             'ports': [fake_port]
         }
 
@@ -559,15 +625,14 @@ class ServiceInstanceManagerTestCase(test.TestCase):
                           'fake-neutron-subnet')
 
     def test_setup_network_for_instance0(self):
-        fake_service_net = fake_network.FakeNetwork(subnets=[])
         fake_service_subnet = fake_network.\
             FakeSubnet(name=self.share['share_network_id'])
         fake_router = fake_network.FakeRouter()
         fake_port = fake_network.FakePort()
         self.stubs.Set(self._manager,
                        'connect_share_server_to_tenant_network', False)
-        self.stubs.Set(self._manager.neutron_api, 'get_network',
-                       mock.Mock(return_value=fake_service_net))
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[]))
         self.stubs.Set(self._manager.neutron_api, 'subnet_create',
                        mock.Mock(return_value=fake_service_subnet))
         self.stubs.Set(self._manager.db, 'share_network_get',
@@ -584,8 +649,11 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         network_data = self._manager._setup_network_for_instance(
             'fake-net', 'fake-subnet')
 
-        self._manager.neutron_api.get_network.assert_called_once_with(
-            self._manager.service_network_id)
+        self.assertEqual(
+            [mock.call(network_id=self._manager.service_network_id),
+             mock.call(network_id=self._manager.service_network_id,
+                       name='routed_to_fake-subnet')],
+            self._manager.neutron_api.list_subnets.call_args_list)
         self._manager._get_private_router.assert_called_once_with(
             'fake-net', 'fake-subnet')
         self._manager.neutron_api.router_add_interface.assert_called_once_with(
@@ -608,7 +676,6 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self.assertEqual(network_data.get('ports'), [fake_port])
 
     def test_setup_network_for_instance1(self):
-        fake_service_net = fake_network.FakeNetwork(subnets=[])
         fake_service_subnet = fake_network. \
             FakeSubnet(name=self.share['share_network_id'])
         fake_router = fake_network.FakeRouter()
@@ -618,8 +685,8 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         ]
         self.stubs.Set(self._manager,
                        'connect_share_server_to_tenant_network', True)
-        self.stubs.Set(self._manager.neutron_api, 'get_network',
-                       mock.Mock(return_value=fake_service_net))
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[]))
         self.stubs.Set(self._manager.neutron_api, 'subnet_create',
                        mock.Mock(return_value=fake_service_subnet))
         self.stubs.Set(self._manager, '_get_private_router',
@@ -634,8 +701,10 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         network_data = self._manager._setup_network_for_instance('fake-net',
                                                                  'fake-subnet')
 
-        self._manager.neutron_api.get_network. \
-            assert_called_once_with(self._manager.service_network_id)
+        self._manager.neutron_api.list_subnets. \
+            assert_called_with(
+                network_id=self._manager.service_network_id,
+                name='routed_to_fake-subnet')
         self._manager._get_private_router. \
             assert_called_once_with('fake-net', 'fake-subnet')
         self._manager.neutron_api.router_add_interface. \
@@ -662,6 +731,109 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self.assertIs(network_data.get('public_port'), fake_ports[1])
         self.assertEqual(network_data.get('ports'), fake_ports)
 
+    def _setup_network_for_instance_attached(self, attached_subnet_id):
+        fake_service_subnet = fake_network.FakeSubnet(id='fake_subnet_id')
+        fake_router = fake_network.FakeRouter()
+        fake_router_port = fake_network.FakePort(
+            fixed_ips=[{'subnet_id': attached_subnet_id,
+                        'ip_address': '10.254.0.1'}])
+        self.stubs.Set(self._manager,
+                       'connect_share_server_to_tenant_network', False)
+        self.stubs.Set(self._manager, '_get_or_create_service_subnet',
+                       mock.Mock(return_value=fake_service_subnet))
+        self.stubs.Set(self._manager, '_get_private_router',
+                       mock.Mock(return_value=fake_router))
+        self.stubs.Set(self._manager.neutron_api, 'router_add_interface',
+                       mock.Mock(side_effect=exception.NetworkException(
+                           code=400)))
+        self.stubs.Set(self._manager.neutron_api, 'list_ports',
+                       mock.Mock(return_value=[fake_router_port]))
+        self.stubs.Set(self._manager.neutron_api, 'create_port',
+                       mock.Mock(return_value=fake_network.FakePort()))
+        return self._manager._setup_network_for_instance('fake-net',
+                                                         'fake-subnet')
+
+    def test_setup_network_for_instance_already_attached(self):
+        network_data = self._setup_network_for_instance_attached(
+            'fake_subnet_id')
+
+        self._manager.neutron_api.list_ports.assert_called_once_with(
+            device_id='fake_router_id')
+        self.assertEqual('fake_router_id', network_data['router']['id'])
+
+    def test_setup_network_for_instance_attached_to_other_router(self):
+        self.assertRaises(exception.ServiceInstanceException,
+                          self._setup_network_for_instance_attached,
+                          'other_subnet_id')
+        self.assertFalse(self._manager.neutron_api.create_port.called)
+
+    def _setup_networks_concurrently(self, neutron_subnet_ids):
+        """Sets up networks in greenthreads blocked on router lookup.
+
+        Returns for every greenthread whether all of them looked the
+        router up at the same time.
+        """
+        all_inside = eventlet.event.Event()
+        inside = []
+        seen_all_inside = []
+
+        def fake_get_private_router(neutron_net_id, neutron_subnet_id):
+            inside.append(neutron_subnet_id)
+            if len(inside) == len(neutron_subnet_ids):
+                all_inside.send()
+            with eventlet.Timeout(1, False):
+                all_inside.wait()
+            seen_all_inside.append(all_inside.ready())
+            return fake_network.FakeRouter(id='router-' + neutron_subnet_id)
+
+        subnets = {}
+
+        def fake_subnet_create(tenant_id, network_id, name, cidr):
+            eventlet.sleep(0)
+            subnets['id-' + name] = fake_network.FakeSubnet(
+                id='id-' + name, name=name, cidr=cidr)
+            return subnets['id-' + name]
+
+        self.stubs.Set(self._manager,
+                       'connect_share_server_to_tenant_network', False)
+        self.stubs.Set(self._manager.neutron_api, 'subnet_create',
+                       mock.Mock(side_effect=fake_subnet_create))
+        self.stubs.Set(self._manager.neutron_api, 'create_port',
+                       mock.Mock(side_effect=lambda *args, **kwargs:
+                                 fake_network.FakePort()))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(side_effect=lambda subnet_id:
+                                 subnets[subnet_id]))
+        self.stubs.Set(self._manager, '_get_private_router',
+                       mock.Mock(side_effect=fake_get_private_router))
+        threads = [eventlet.spawn(self._manager._setup_network_for_instance,
+                                  'fake-net', neutron_subnet_id)
+                   for neutron_subnet_id in neutron_subnet_ids]
+        results = [thread.wait() for thread in threads]
+        self.assertEqual(len(neutron_subnet_ids), len(results))
+        return seen_all_inside
+
+    def test_setup_network_for_instances_of_different_subnets(self):
+        seen_all_inside = self._setup_networks_concurrently(
+            ['fake-subnet-1', 'fake-subnet-2'])
+
+        self.assertEqual([True, True], seen_all_inside)
+        self.assertEqual(
+            2, self._manager.neutron_api.subnet_create.call_count)
+        cidrs = set(call[0][3] for call in
+                    self._manager.neutron_api.subnet_create.call_args_list)
+        self.assertEqual(2, len(cidrs))
+
+    def test_setup_network_for_instances_of_same_subnet(self):
+        seen_all_inside = self._setup_networks_concurrently(
+            ['fake-subnet', 'fake-subnet'])
+
+        self.assertEqual([False, True], seen_all_inside)
+        self._manager.neutron_api.subnet_create.assert_called_once_with(
+            self._manager.service_tenant_id,
+            self._manager.service_network_id,
+            'routed_to_fake-subnet', mock.ANY)
+
     def test_get_private_router(self):
         fake_net = fake_network.FakeNetwork()
         fake_subnet = fake_network.FakeSubnet(gateway_ip='fake_ip')
@@ -747,6 +919,53 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         device_mock.route.pullup_route.assert_called_once_with(interface_name)
         self._manager._remove_outdated_interfaces.assert_called_once_with(
             device_mock)
+        self.assertEqual(set([fake_subnet['id']]),
+                         self._manager._connected_subnet_ids)
+        self.assertEqual(interface_name,
+                         self._manager._connected_interface_name)
+
+    def test_ensure_connectivity_with_subnet_connected(self):
+        self._manager._connected_subnet_ids = set(['fake_subnet_id'])
+        self._manager._connected_interface_name = 'fake_interface_name'
+        self.stubs.Set(service_instance.ip_lib, 'device_exists',
+                       mock.Mock(return_value=True))
+        self.stubs.Set(self._manager,
+                       '_setup_connectivity_with_service_instances',
+                       mock.Mock())
+
+        self._manager._ensure_connectivity_with_subnet(
+            {'id': 'fake_subnet_id'})
+
+        service_instance.ip_lib.device_exists.assert_called_once_with(
+            'fake_interface_name')
+        self.assertFalse(
+            self._manager._setup_connectivity_with_service_instances.called)
+
+    def test_ensure_connectivity_with_subnet_new_subnet(self):
+        self._manager._connected_subnet_ids = set(['fake_subnet_id'])
+        self.stubs.Set(self._manager,
+                       '_setup_connectivity_with_service_instances',
+                       mock.Mock())
+
+        self._manager._ensure_connectivity_with_subnet({'id': 'new_subnet_id'})
+
+        self._manager._setup_connectivity_with_service_instances.\
+            assert_called_once_with()
+
+    def test_ensure_connectivity_with_subnet_device_gone(self):
+        self._manager._connected_subnet_ids = set(['fake_subnet_id'])
+        self._manager._connected_interface_name = 'fake_interface_name'
+        self.stubs.Set(service_instance.ip_lib, 'device_exists',
+                       mock.Mock(return_value=False))
+        self.stubs.Set(self._manager,
+                       '_setup_connectivity_with_service_instances',
+                       mock.Mock())
+
+        self._manager._ensure_connectivity_with_subnet(
+            {'id': 'fake_subnet_id'})
+
+        self._manager._setup_connectivity_with_service_instances.\
+            assert_called_once_with()
 
     def test_get_service_port(self):
         fake_service_port = fake_network.FakePort(device_id='manila-share')
@@ -819,17 +1038,146 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         cidrs = serv_cidr.subnet(fake_division_mask)
         cidr1 = str(cidrs.next())
         cidr2 = str(cidrs.next())
-        self.stubs.Set(self._manager, '_get_all_service_subnets',
-                       mock.Mock(return_value=[]))
         result = self._manager._get_cidr_for_subnet()
         self.assertEqual(result, cidr1)
 
-        fake_subnet = fake_network.FakeSubnet(cidr=cidr1)
-        self.stubs.Set(self._manager, '_get_all_service_subnets',
-                       mock.Mock(return_value=[fake_subnet]))
+        fake_subnet = fake_network.FakeSubnet(name='fake', cidr=cidr1)
+        self._manager.service_subnets.add(fake_subnet)
         result = self._manager._get_cidr_for_subnet()
         self.assertEqual(result, cidr2)
 
+    def test_get_cidr_for_subnet_no_cidrs(self):
+        self.stubs.Set(self._manager.service_subnets, 'get_free_cidr',
+                       mock.Mock(return_value=None))
+        self.assertRaises(exception.ServiceInstanceException,
+                          self._manager._get_cidr_for_subnet)
+
+    def test_create_service_subnet(self):
+        fake_subnet = fake_network.FakeSubnet(name='fake-name',
+                                              cidr='10.254.0.0/28')
+        self.stubs.Set(self._manager.neutron_api, 'subnet_create',
+                       mock.Mock(return_value=fake_subnet))
+
+        result = self._manager._create_service_subnet('fake-name')
+
+        self._manager.neutron_api.subnet_create.assert_called_once_with(
+            self._manager.service_tenant_id,
+            self._manager.service_network_id,
+            'fake-name', '10.254.0.0/28')
+        self.assertIs(result, fake_subnet)
+        self.assertEqual([fake_subnet],
+                         self._manager._get_all_service_subnets())
+        self.assertEqual('10.254.0.16/28',
+                         self._manager._get_cidr_for_subnet())
+
+    def test_create_service_subnet_cidr_taken(self):
+        taken_subnet = fake_network.FakeSubnet(id='taken', name='other',
+                                               cidr='10.254.0.0/28')
+        fake_subnet = fake_network.FakeSubnet(name='fake-name',
+                                              cidr='10.254.0.16/28')
+        self._manager.service_subnets.refresh()
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[taken_subnet]))
+        self.stubs.Set(self._manager.neutron_api, 'subnet_create',
+                       mock.Mock(side_effect=[
+                           exception.NetworkException(code=400),
+                           fake_subnet]))
+
+        result = self._manager._create_service_subnet('fake-name')
+
+        self.assertIs(result, fake_subnet)
+        self._manager.neutron_api.subnet_create.assert_called_with(
+            self._manager.service_tenant_id,
+            self._manager.service_network_id,
+            'fake-name', '10.254.0.16/28')
+
+    def test_get_service_subnet(self):
+        fake_subnet = fake_network.FakeSubnet(name='fake-name')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[fake_subnet]))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(return_value={'name': 'fake-name'}))
+
+        self.assertIs(fake_subnet,
+                      self._manager._get_service_subnet('fake-name'))
+        self.assertIs(fake_subnet,
+                      self._manager._get_service_subnet('fake-name'))
+        self._manager.neutron_api.list_subnets.assert_called_once_with(
+            network_id=self._manager.service_network_id)
+        self._manager.neutron_api.get_subnet.assert_has_calls([
+            mock.call(fake_subnet['id']), mock.call(fake_subnet['id'])])
+
+    def test_get_service_subnet_taken_by_other_host(self):
+        fake_subnet = fake_network.FakeSubnet(name='fake-name')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(side_effect=[[fake_subnet], []]))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(return_value={'name': 'other'}))
+        self.stubs.Set(self._manager.neutron_api, 'update_subnet',
+                       mock.Mock())
+
+        self.assertIsNone(self._manager._get_service_subnet('fake-name'))
+        self.assertFalse(self._manager.neutron_api.update_subnet.called)
+        self.assertEqual([fake_subnet],
+                         self._manager.service_subnets.get_by_name('other'))
+
+    def test_get_service_subnet_deleted(self):
+        fake_subnet = fake_network.FakeSubnet(name='fake-name')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(side_effect=[[fake_subnet], []]))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(side_effect=exception.NetworkException(
+                           code=404)))
+
+        self.assertIsNone(self._manager._get_service_subnet('fake-name'))
+        self.assertEqual([], self._manager._get_all_service_subnets())
+
+    def test_get_service_subnet_created_by_other_host(self):
+        fake_subnet = fake_network.FakeSubnet(name='fake-name')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(side_effect=[[], [fake_subnet]]))
+
+        self.assertIs(fake_subnet,
+                      self._manager._get_service_subnet('fake-name'))
+        self._manager.neutron_api.list_subnets.assert_called_with(
+            network_id=self._manager.service_network_id, name='fake-name')
+        self.assertEqual([fake_subnet],
+                         self._manager.service_subnets.get_by_name(
+                             'fake-name'))
+
+    def test_get_service_subnet_reuses_unused(self):
+        fake_subnet = fake_network.FakeSubnet(name='')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[fake_subnet]))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(return_value={'name': ''}))
+        self.stubs.Set(self._manager.neutron_api, 'update_subnet',
+                       mock.Mock())
+
+        result = self._manager._get_service_subnet('fake-name')
+
+        self.assertIs(fake_subnet, result)
+        self._manager.neutron_api.update_subnet.assert_called_once_with(
+            fake_subnet['id'], 'fake-name')
+        self.assertEqual([fake_subnet],
+                         self._manager.service_subnets.get_by_name(
+                             'fake-name'))
+        self.assertIsNone(self._manager._get_service_subnet('another-name'))
+
+    def test_get_service_subnet_unused_taken_by_other_host(self):
+        fake_subnet = fake_network.FakeSubnet(name='')
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=[fake_subnet]))
+        self.stubs.Set(self._manager.neutron_api, 'get_subnet',
+                       mock.Mock(return_value={'name': 'other'}))
+        self.stubs.Set(self._manager.neutron_api, 'update_subnet',
+                       mock.Mock())
+
+        self.assertIsNone(self._manager._get_service_subnet('fake-name'))
+        self.assertFalse(self._manager.neutron_api.update_subnet.called)
+        self.assertEqual([fake_subnet],
+                         self._manager.service_subnets.get_by_name('other'))
+
     def test_delete_service_instance(self):
         instance_id = 'fake_instance_id'
         router_id = 'fake_router_id'
@@ -851,3 +1199,292 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self._manager.neutron_api.update_subnet.assert_has_calls([
             mock.call(subnet_id, ''),
         ])
+
+    def test_set_up_service_instance_from_pool(self):
+        fake_server = {'id': 'fake', 'ip': '1.2.3.4',
+                       'public_address': '1.2.3.4',
+                       'subnet_id': 'fake-subnet-id',
+                       'router_id': 'fake-router-id', 'pk_path': 'path'}
+        self._manager.pool = mock.Mock()
+        self.stubs.Set(self._manager, '_claim_pool_instance',
+                       mock.Mock(return_value=fake_server))
+        self.stubs.Set(self._manager, '_create_service_instance',
+                       mock.Mock())
+
+        result = self._manager.set_up_service_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+
+        self._manager._claim_pool_instance.assert_called_once_with(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+        self.assertFalse(self._manager._create_service_instance.called)
+        self.assertEqual('fake', result['instance_id'])
+
+    def test_set_up_service_instance_pool_empty(self):
+        fake_server = {'id': 'fake', 'ip': '1.2.3.4',
+                       'public_address': '1.2.3.4',
+                       'subnet_id': 'fake-subnet-id',
+                       'router_id': 'fake-router-id', 'pk_path': 'path'}
+        self._manager.pool = mock.Mock()
+        self.stubs.Set(self._manager, '_claim_pool_instance',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self._manager, '_create_service_instance',
+                       mock.Mock(return_value=fake_server))
+
+        result = self._manager.set_up_service_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+
+        self._manager._create_service_instance.assert_called_once_with(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+        self.assertEqual('fake', result['instance_id'])
+
+    def test_get_pool_instance_name_prefix(self):
+        self.flags(host='fake-host')
+        self._manager.driver_config = mock.Mock(config_group='fake-backend')
+
+        self.assertEqual('manila_service_pool_fake-host_fake-backend_',
+                         self._manager._get_pool_instance_name_prefix())
+
+    def test_start_pool(self):
+        self.flags(host='fake.host')
+        prefix = 'manila_service_pool_fake.host_'
+        servers = [{'id': 'own', 'name': prefix + 'uuid1'},
+                   {'id': 'other', 'name': 'manila_service_pool_fakeXhost_'}]
+        subnets = [
+            fake_network.FakeSubnet(id='own', name=prefix + 'uuid1'),
+            fake_network.FakeSubnet(id='other',
+                                    name='manila_service_pool_other_uuid2')]
+        self._manager.pool = mock.Mock(ttl=0)
+        self.stubs.Set(self._manager.compute_api, 'server_list',
+                       mock.Mock(return_value=servers))
+        self.stubs.Set(self._manager, '_delete_server', mock.Mock())
+        self.stubs.Set(self._manager.neutron_api, 'list_subnets',
+                       mock.Mock(return_value=subnets))
+        self.stubs.Set(self._manager.neutron_api, 'update_subnet',
+                       mock.Mock())
+
+        self._manager._start_pool()
+
+        self._manager.compute_api.server_list.assert_called_once_with(
+            self._context,
+            search_opts={'name': '^' + prefix},
+            all_tenants=True)
+        self._manager._delete_server.assert_called_once_with(
+            self._context, 'own')
+        self._manager.neutron_api.update_subnet.assert_called_once_with(
+            'own', '')
+        self._manager.pool.refill.assert_called_once_with()
+
+    def test_start_pool_with_ttl(self):
+        self._manager.pool = mock.Mock(ttl=600)
+        self.stubs.Set(self._manager.compute_api, 'server_list',
+                       mock.Mock(return_value=[]))
+        fake_loopingcall = mock.Mock()
+        self.stubs.Set(service_instance.loopingcall,
+                       'FixedIntervalLoopingCall',
+                       mock.Mock(return_value=fake_loopingcall))
+
+        self._manager._start_pool()
+
+        service_instance.loopingcall.FixedIntervalLoopingCall.\
+            assert_called_once_with(self._manager.pool.expire)
+        fake_loopingcall.start.assert_called_once_with(interval=60)
+
+    def test_create_pool_instance(self):
+        fake_server = fake_compute.FakeServer()
+        fake_subnet = fake_network.FakeSubnet(id='fake-service-subnet-id',
+                                              name='fake-name')
+        fake_port = fake_network.FakePort()
+        self.stubs.Set(self._manager, '_get_service_image',
+                       mock.Mock(return_value='fake_image_id'))
+        self.stubs.Set(self._manager, '_get_key',
+                       mock.Mock(
+                           return_value=('fake_key_name', 'fake_key_path')))
+        self.stubs.Set(self._manager, '_get_or_create_security_group',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self._manager, '_get_service_subnet',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self._manager, '_get_cidr_for_subnet',
+                       mock.Mock(return_value='10.254.0.0/28'))
+        self.stubs.Set(self._manager.neutron_api, 'subnet_create',
+                       mock.Mock(return_value=fake_subnet))
+        self.stubs.Set(self._manager.neutron_api, 'create_port',
+                       mock.Mock(return_value=fake_port))
+        self.stubs.Set(self._manager,
+                       '_setup_connectivity_with_service_instances',
+                       mock.Mock())
+        self.stubs.Set(self._manager.compute_api, 'server_create',
+                       mock.Mock(return_value=fake_server))
+        self.stubs.Set(self._manager, '_get_server_ip',
+                       mock.Mock(return_value='fake_ip'))
+        self.stubs.Set(self._manager, '_check_server_availability',
+                       mock.Mock(return_value=True))
+
+        result = self._manager._create_pool_instance(self._context)
+
+        instance_name = self._manager.compute_api.server_create.call_args[1][
+            'name']
+        self.assertTrue(instance_name.startswith('manila_service_pool_'))
+        self._manager.neutron_api.subnet_create.assert_called_once_with(
+            'service tenant id', 'service network id', instance_name,
+            '10.254.0.0/28')
+        self._manager.neutron_api.create_port.assert_called_once_with(
+            'service tenant id', 'service network id',
+            subnet_id='fake-service-subnet-id', device_owner='manila')
+        self.assertIs(result, fake_server)
+        self.assertEqual('fake_ip', result['ip'])
+        self.assertEqual('fake-service-subnet-id', result['subnet_id'])
+
+    def test_claim_pool_instance(self):
+        fake_server = {'id': 'fake', 'ip': '10.254.0.3',
+                       'subnet_id': 'fake-service-subnet-id'}
+        self._manager.pool = mock.Mock()
+        self._manager.pool.claim.return_value = fake_server
+        self._manager.service_subnets.add(fake_network.FakeSubnet(
+            id='fake-service-subnet-id', name='manila_service_pool_fake',
+            cidr='10.254.0.0/28'))
+        self.stubs.Set(self._manager, '_get_private_router',
+                       mock.Mock(return_value={'id': 'fake-router-id'}))
+        self.stubs.Set(self._manager.neutron_api, 'router_add_interface',
+                       mock.Mock())
+        self.stubs.Set(self._manager.neutron_api, 'update_subnet',
+                       mock.Mock())
+        self.stubs.Set(self._manager.compute_api, 'server_update',
+                       mock.Mock())
+
+        result = self._manager._claim_pool_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+
+        self._manager.neutron_api.router_add_interface.\
+            assert_called_once_with('fake-router-id',
+                                    'fake-service-subnet-id')
+        self._manager.neutron_api.update_subnet.assert_called_once_with(
+            'fake-service-subnet-id', 'routed_to_fake-subnet-id')
+        self.assertEqual(['fake-service-subnet-id'],
+                         [subnet['id'] for subnet in
+                          self._manager.service_subnets.get_by_name(
+                              'routed_to_fake-subnet-id')])
+        self._manager.compute_api.server_update.assert_called_once_with(
+            self._context, 'fake', 'fake-inst-name')
+        self.assertEqual('fake-router-id', result['router_id'])
+        self.assertEqual('10.254.0.3', result['public_address'])
+
+    def test_claim_pool_instance_tenant_network(self):
+        fake_server = {'id': 'fake', 'ip': '10.254.0.3',
+                       'subnet_id': 'fake-service-subnet-id'}
+        fake_port = fake_network.FakePort(
+            fixed_ips=[{'ip_address': '192.168.0.5'}])
+        self._manager.connect_share_server_to_tenant_network = True
+        self._manager.pool = mock.Mock()
+        self._manager.pool.claim.return_value = fake_server
+        self.stubs.Set(self._manager, '_get_private_router',
+                       mock.Mock(return_value={'id': 'fake-router-id'}))
+        self.stubs.Set(self._manager.neutron_api, 'create_port',
+                       mock.Mock(return_value=fake_port))
+        self.stubs.Set(self._manager.compute_api, 'server_interface_attach',
+                       mock.Mock())
+
+        result = self._manager._claim_pool_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id')
+
+        self._manager.neutron_api.create_port.assert_called_once_with(
+            'service tenant id', 'fake-net-id', subnet_id='fake-subnet-id',
+            device_owner='manila')
+        self._manager.compute_api.server_interface_attach.\
+            assert_called_once_with(self._context, 'fake', fake_port['id'])
+        self.assertEqual('192.168.0.5', result['public_address'])
+
+    def test_claim_pool_instance_tenant_subnet_routed(self):
+        self._manager.pool = mock.Mock()
+        self.stubs.Set(self._manager, '_find_service_subnets',
+                       mock.Mock(return_value=[{'id': 'fake-id'}]))
+
+        self.assertIsNone(self._manager._claim_pool_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id'))
+        self._manager._find_service_subnets.assert_called_once_with(
+            'routed_to_fake-subnet-id')
+        self.assertFalse(self._manager.pool.claim.called)
+
+    def test_claim_pool_instance_empty(self):
+        self._manager.pool = mock.Mock()
+        self._manager.pool.claim.return_value = None
+
+        self.assertIsNone(self._manager._claim_pool_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id'))
+
+    def test_claim_pool_instance_error(self):
+        fake_server = {'id': 'fake', 'ip': '10.254.0.3',
+                       'subnet_id': 'fake-service-subnet-id'}
+        self._manager.pool = mock.Mock()
+        self._manager.pool.claim.return_value = fake_server
+        self.stubs.Set(self._manager, '_get_private_router', mock.Mock(
+            side_effect=exception.ServiceInstanceException('fake')))
+
+        self.assertIsNone(self._manager._claim_pool_instance(
+            self._context, 'fake-inst-name', 'fake-net-id', 'fake-subnet-id'))
+        self._manager.pool.discard.assert_called_once_with(fake_server)
+
+
+class ServiceInstancePoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ServiceInstancePoolTestCase, self).setUp()
+        self.instances = iter(range(100))
+        self.create_instance = mock.Mock(
+            side_effect=lambda: {'id': next(self.instances)})
+        self.delete_instance = mock.Mock()
+        self.stubs.Set(service_instance.eventlet, 'spawn_n',
+                       lambda func, *args: func(*args))
+
+    def test_refill(self):
+        pool = service_instance.ServiceInstancePool(
+            self.create_instance, self.delete_instance, 3)
+
+        pool.refill()
+        pool.refill()
+
+        self.assertEqual(3, self.create_instance.call_count)
+
+    def test_claim(self):
+        pool = service_instance.ServiceInstancePool(
+            self.create_instance, self.delete_instance, 2)
+        pool.refill()
+
+        self.assertEqual({'id': 0}, pool.claim())
+        self.assertEqual({'id': 1}, pool.claim())
+        self.assertEqual(4, self.create_instance.call_count)
+
+    def test_claim_empty(self):
+        self.create_instance.side_effect = exception.ServiceInstanceException(
+            'fake')
+        pool = service_instance.ServiceInstancePool(
+            self.create_instance, self.delete_instance, 1)
+
+        self.assertIsNone(pool.claim())
+        self.assertEqual(1, self.create_instance.call_count)
+
+    def test_claim_expired(self):
+        pool = service_instance.ServiceInstancePool(
+            self.create_instance, self.delete_instance, 1, ttl=60)
+        now = service_instance.time.time()
+        with mock.patch.object(service_instance.time, 'time',
+                               mock.Mock(return_value=now - 120)):
+            pool.refill()
+
+        self.assertIsNone(pool.claim())
+        self.delete_instance.assert_called_once_with({'id': 0})
+        self.assertEqual({'id': 1}, pool.claim())
+
+    def test_expire(self):
+        pool = service_instance.ServiceInstancePool(
+            self.create_instance, self.delete_instance, 2, ttl=60)
+        now = service_instance.time.time()
+        with mock.patch.object(service_instance.time, 'time',
+                               mock.Mock(return_value=now - 120)):
+            pool.refill()
+
+        pool.expire()
+
+        self.assertEqual([mock.call({'id': 0}), mock.call({'id': 1})],
+                         self.delete_instance.call_args_list)
+        self.assertEqual(4, self.create_instance.call_count)
+        self.assertEqual({'id': 2}, pool.claim())
@@ -96,6 +96,9 @@ def fake_access(id, **kwargs):
     return db_fakes.FakeModel(access)
 
 
+_NO_PAGINATION = dict(sort_key=None, sort_dir=None, limit=None,
+                      offset=None, marker=None)
+
 _FAKE_LIST_OF_ALL_SHARES = [
     {
         'name': 'foo',
@@ -154,7 +157,7 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all')
         db_driver.share_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_1')
+            ctx, 'fake_pid_1', filters={}, **_NO_PAGINATION)
         self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[0])
 
     def test_get_all_admin_filter_by_all_tenants(self):
@@ -164,7 +167,8 @@ class ShareAPITestCase(test.TestCase):
         shares = self.api.get_all(ctx, {'all_tenants': 1})
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all')
-        db_driver.share_get_all.assert_called_once_with(ctx)
+        db_driver.share_get_all.assert_called_once_with(
+            ctx, filters={}, **_NO_PAGINATION)
         self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES)
 
     def test_get_all_non_admin_filter_by_share_server(self):
@@ -202,57 +206,23 @@ class ShareAPITestCase(test.TestCase):
             mock.call(ctx, 'share', 'list_by_share_server_id'),
         ])
         db_driver.share_get_all_by_share_server.assert_called_once_with(
-            ctx, 'fake_server_3')
-        db_driver.share_get_all_by_project.assert_has_calls([])
-        db_driver.share_get_all.assert_has_calls([])
+            ctx, 'fake_server_3', filters={}, **_NO_PAGINATION)
+        self.assertFalse(db_driver.share_get_all_by_project.called)
+        self.assertFalse(db_driver.share_get_all.called)
         self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[2:])
 
-    def test_get_all_admin_filter_by_name(self):
-        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
-        self.stubs.Set(db_driver, 'share_get_all_by_project',
-                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
-        shares = self.api.get_all(ctx, {'name': 'bar'})
-        share_api.policy.check_policy.assert_has_calls([
-            mock.call(ctx, 'share', 'get_all'),
-        ])
-        db_driver.share_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_2')
-        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1::2])
-
     def test_get_all_admin_filter_by_name_and_all_tenants(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
         self.stubs.Set(db_driver, 'share_get_all',
-                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES))
+                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[::2]))
         shares = self.api.get_all(ctx, {'name': 'foo', 'all_tenants': 1})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
-        db_driver.share_get_all.assert_called_once_with(ctx)
+        db_driver.share_get_all.assert_called_once_with(
+            ctx, filters={'name': 'foo'}, **_NO_PAGINATION)
         self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[::2])
 
-    def test_get_all_admin_filter_by_status(self):
-        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
-        self.stubs.Set(db_driver, 'share_get_all_by_project',
-                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
-        shares = self.api.get_all(ctx, {'status': 'active'})
-        share_api.policy.check_policy.assert_has_calls([
-            mock.call(ctx, 'share', 'get_all'),
-        ])
-        db_driver.share_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_2')
-        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[2::4])
-
-    def test_get_all_admin_filter_by_status_and_all_tenants(self):
-        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
-        self.stubs.Set(db_driver, 'share_get_all',
-                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES))
-        shares = self.api.get_all(ctx, {'status': 'error', 'all_tenants': 1})
-        share_api.policy.check_policy.assert_has_calls([
-            mock.call(ctx, 'share', 'get_all'),
-        ])
-        db_driver.share_get_all.assert_called_once_with(ctx)
-        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1::2])
-
     def test_get_all_non_admin_filter_by_all_tenants(self):
         # Expected share list only by project of non-admin user
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
@@ -263,34 +233,33 @@ class ShareAPITestCase(test.TestCase):
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_driver.share_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_2')
+            ctx, 'fake_pid_2', filters={}, **_NO_PAGINATION)
         self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1:])
 
     def test_get_all_non_admin_with_name_and_status_filters(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
         self.stubs.Set(db_driver, 'share_get_all_by_project',
-                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
+                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:2]))
         shares = self.api.get_all(ctx, {'name': 'bar', 'status': 'error'})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_driver.share_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_2')
-
-        # two items expected, one filtered
-        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1::2])
+            ctx, 'fake_pid_2', filters={'name': 'bar', 'status': 'error'},
+            **_NO_PAGINATION)
+        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1:2])
 
-        # one item expected, two filtered
-        shares = self.api.get_all(ctx, {'name': 'foo', 'status': 'active'})
-        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[2::4])
-        share_api.policy.check_policy.assert_has_calls([
-            mock.call(ctx, 'share', 'get_all'),
-            mock.call(ctx, 'share', 'get_all'),
-        ])
-        db_driver.share_get_all_by_project.assert_has_calls([
-            mock.call(ctx, 'fake_pid_2'),
-            mock.call(ctx, 'fake_pid_2'),
-        ])
+    def test_get_all_with_sorting_and_pagination(self):
+        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
+        self.stubs.Set(db_driver, 'share_get_all_by_project',
+                       mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:2]))
+        shares = self.api.get_all(ctx, {'status': 'error'}, sort_key='size',
+                                  sort_dir='asc', limit=1, offset=2,
+                                  marker='fake_marker')
+        db_driver.share_get_all_by_project.assert_called_once_with(
+            ctx, 'fake_pid_2', filters={'status': 'error'}, sort_key='size',
+            sort_dir='asc', limit=1, offset=2, marker='fake_marker')
+        self.assertEqual(shares, _FAKE_LIST_OF_ALL_SHARES[1:2])
 
     def test_create(self):
         date = datetime.datetime(1, 1, 1, 1, 1, 1)
@@ -574,7 +543,7 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all_snapshots')
         db_driver.share_snapshot_get_all_by_project.assert_called_once_with(
-            ctx, 'fakepid')
+            ctx, 'fakepid', filters={}, columns=None, **_NO_PAGINATION)
 
     @mock.patch.object(db_driver, 'share_snapshot_get_all', mock.Mock())
     def test_get_all_snapshots_admin_all_tenants(self):
@@ -582,7 +551,8 @@ class ShareAPITestCase(test.TestCase):
                                    search_opts={'all_tenants': 1})
         share_api.policy.check_policy.assert_called_once_with(
             self.context, 'share', 'get_all_snapshots')
-        db_driver.share_snapshot_get_all.assert_called_once_with(self.context)
+        db_driver.share_snapshot_get_all.assert_called_once_with(
+            self.context, filters={}, columns=None, **_NO_PAGINATION)
 
     @mock.patch.object(db_driver, 'share_snapshot_get_all_by_project',
                        mock.Mock())
@@ -592,21 +562,26 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all_snapshots')
         db_driver.share_snapshot_get_all_by_project.assert_called_once_with(
-            ctx, 'fakepid')
+            ctx, 'fakepid', filters={}, columns=None, **_NO_PAGINATION)
 
     def test_get_all_snapshots_not_admin_search_opts(self):
         search_opts = {'size': 'fakesize'}
-        fake_objs = [{'name': 'fakename1'}, search_opts]
+        fake_objs = [search_opts]
         ctx = context.RequestContext('fakeuid', 'fakepid', is_admin=False)
         with mock.patch.object(db_driver,
                                'share_snapshot_get_all_by_project',
                                mock.Mock(return_value=fake_objs)):
-            result = self.api.get_all_snapshots(ctx, search_opts)
-            self.assertEqual([search_opts], result)
+            result = self.api.get_all_snapshots(
+                ctx, search_opts, sort_key='size', sort_dir='asc', limit=1,
+                offset=2, marker='fake_marker', columns=('id',))
+            self.assertEqual(fake_objs, result)
             share_api.policy.check_policy.assert_called_once_with(
                 ctx, 'share', 'get_all_snapshots')
             db_driver.share_snapshot_get_all_by_project.\
-                assert_called_once_with(ctx, 'fakepid')
+                assert_called_once_with(
+                    ctx, 'fakepid', filters={'size': 'fakesize'},
+                    sort_key='size', sort_dir='asc', limit=1, offset=2,
+                    marker='fake_marker', columns=('id',))
 
     def test_allow_access(self):
         share = fake_share('fakeid', status='available')
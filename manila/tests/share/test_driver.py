@@ -17,6 +17,8 @@
 
 import time
 
+import mock
+
 from manila import exception
 import manila.share.configuration
 from manila.share import driver
@@ -48,3 +50,46 @@ class ShareDriverTestCase(test.TestCase):
             configuration=manila.share.configuration.Configuration(None))
         self.assertRaises(exception.ProcessExecutionError,
                           execute_mixin._try_execute)
+
+    def test_update_access(self):
+        share_driver = driver.ShareDriver(
+            configuration=manila.share.configuration.Configuration(None))
+        share_driver.allow_access = mock.Mock(side_effect=[
+            exception.ShareAccessExists(access_type='ip', access='fake1'),
+            None])
+        share_driver.deny_access = mock.Mock()
+        add_rules = [{'id': 'fake1'}, {'id': 'fake2'}]
+        delete_rules = [{'id': 'fake3'}]
+
+        share_driver.update_access('fake_context', 'fake_share', add_rules,
+                                   delete_rules, share_server='fake_server')
+
+        share_driver.deny_access.assert_called_once_with(
+            'fake_context', 'fake_share', delete_rules[0],
+            share_server='fake_server')
+        share_driver.allow_access.assert_has_calls([
+            mock.call('fake_context', 'fake_share', add_rules[0],
+                      share_server='fake_server'),
+            mock.call('fake_context', 'fake_share', add_rules[1],
+                      share_server='fake_server'),
+        ])
+
+    def test_update_access_error(self):
+        share_driver = driver.ShareDriver(
+            configuration=manila.share.configuration.Configuration(None))
+        share_driver.allow_access = mock.Mock(side_effect=[
+            exception.InvalidShareAccess(reason='fake'), None,
+            exception.InvalidShareAccess(reason='fake')])
+        share_driver.deny_access = mock.Mock()
+        add_rules = [{'id': 'fake1'}, {'id': 'fake2'}, {'id': 'fake3'}]
+
+        exc = self.assertRaises(exception.ShareAccessUpdateFailed,
+                                share_driver.update_access,
+                                'fake_context', {'id': 'fake_share'},
+                                add_rules, [{'id': 'fake4'}])
+
+        self.assertEqual(['fake1', 'fake3'], exc.kwargs['access_ids'])
+        self.assertEqual(3, share_driver.allow_access.call_count)
+        share_driver.deny_access.assert_called_once_with(
+            'fake_context', {'id': 'fake_share'}, {'id': 'fake4'},
+            share_server=None)
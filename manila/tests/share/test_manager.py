@@ -15,6 +15,7 @@
 
 """Test of Share Manager for Manila."""
 
+import eventlet
 import mock
 
 from manila.common import constants
@@ -162,8 +163,8 @@ class ShareManagerTestCase(test.TestCase):
             {'id': 'fake_id_3', 'status': 'in-use', 'name': 'fake_name_3'},
         ]
         rules = [
-            FakeAccessRule(state='active'),
-            FakeAccessRule(state='error'),
+            FakeAccessRule(state='active', share_id='fake_id_1'),
+            FakeAccessRule(state='error', share_id='fake_id_1'),
         ]
         share_server = 'fake_share_server_type_does_not_matter'
         self.stubs.Set(self.share_manager.db,
@@ -174,7 +175,8 @@ class ShareManagerTestCase(test.TestCase):
                        mock.Mock(return_value=share_server))
         self.stubs.Set(self.share_manager, 'publish_service_capabilities',
                        mock.Mock())
-        self.stubs.Set(self.share_manager.db, 'share_access_get_all_for_share',
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
                        mock.Mock(return_value=rules))
         self.stubs.Set(self.share_manager.driver, 'allow_access',
                        mock.Mock(side_effect=raise_share_access_exists))
@@ -194,9 +196,9 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.driver.ensure_share.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext), shares[0],
             share_server=share_server)
-        self.share_manager.db.share_access_get_all_for_share.\
+        self.share_manager.db.share_access_get_all_for_shares.\
             assert_called_once_with(
-                utils.IsAMatcher(context.RequestContext), shares[0]['id'])
+                utils.IsAMatcher(context.RequestContext), ['fake_id_1'])
         self.share_manager.publish_service_capabilities.\
             assert_called_once_with(
                 utils.IsAMatcher(context.RequestContext))
@@ -248,7 +250,7 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.publish_service_capabilities.\
             assert_called_once_with(
                 utils.IsAMatcher(context.RequestContext))
-        manager.LOG.info.assert_called_once_with(
+        manager.LOG.info.assert_any_call(
             mock.ANY,
             {'name': shares[1]['name'], 'status': shares[1]['status']},
         )
@@ -263,8 +265,9 @@ class ShareManagerTestCase(test.TestCase):
             {'id': 'fake_id_3', 'status': 'available', 'name': 'fake_name_3'},
         ]
         rules = [
-            FakeAccessRule(state='active'),
-            FakeAccessRule(state='error'),
+            FakeAccessRule(state='active', share_id='fake_id_1'),
+            FakeAccessRule(state='error', share_id='fake_id_1'),
+            FakeAccessRule(state='active', share_id='fake_id_3'),
         ]
         share_server = 'fake_share_server_type_does_not_matter'
         self.stubs.Set(self.share_manager.db,
@@ -277,7 +280,8 @@ class ShareManagerTestCase(test.TestCase):
                        mock.Mock())
         self.stubs.Set(manager.LOG, 'error', mock.Mock())
         self.stubs.Set(manager.LOG, 'info', mock.Mock())
-        self.stubs.Set(self.share_manager.db, 'share_access_get_all_for_share',
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
                        mock.Mock(return_value=rules))
         self.stubs.Set(self.share_manager.driver, 'allow_access',
                        mock.Mock(side_effect=raise_exception))
@@ -304,7 +308,7 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.publish_service_capabilities.\
             assert_called_once_with(
                 utils.IsAMatcher(context.RequestContext))
-        manager.LOG.info.assert_called_once_with(
+        manager.LOG.info.assert_any_call(
             mock.ANY,
             {'name': shares[1]['name'], 'status': shares[1]['status']},
         )
@@ -312,13 +316,182 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(utils.IsAMatcher(context.RequestContext), shares[0],
                       rules[0], share_server=share_server),
             mock.call(utils.IsAMatcher(context.RequestContext), shares[2],
-                      rules[0], share_server=share_server),
+                      rules[2], share_server=share_server),
         ])
         manager.LOG.error.assert_has_calls([
             mock.call(mock.ANY, mock.ANY),
             mock.call(mock.ANY, mock.ANY),
         ])
 
+    def test_init_host_with_exception_on_one_of_rules(self):
+        shares = [
+            {'id': 'fake_id_1', 'status': 'available', 'name': 'fake_name_1'},
+        ]
+        rules = [
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_a'),
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_b'),
+        ]
+        share_server = 'fake_share_server_type_does_not_matter'
+        self.stubs.Set(self.share_manager.db,
+                       'share_get_all_by_host',
+                       mock.Mock(return_value=shares))
+        self.stubs.Set(self.share_manager.driver, 'ensure_share', mock.Mock())
+        self.stubs.Set(self.share_manager, '_get_share_server',
+                       mock.Mock(return_value=share_server))
+        self.stubs.Set(self.share_manager, 'publish_service_capabilities',
+                       mock.Mock())
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
+                       mock.Mock(return_value=rules))
+        self.stubs.Set(self.share_manager.driver, 'allow_access',
+                       mock.Mock(side_effect=[
+                           exception.ManilaException(message="Fake raise"),
+                           None]))
+
+        self.stubs.Set(self.share_manager.db, 'share_access_update_many',
+                       mock.Mock())
+
+        self.share_manager.init_host()
+
+        self.share_manager.driver.allow_access.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext), shares[0],
+                      rules[0], share_server=share_server),
+            mock.call(utils.IsAMatcher(context.RequestContext), shares[0],
+                      rules[1], share_server=share_server),
+        ])
+        self.share_manager.db.share_access_update_many.\
+            assert_called_once_with(utils.IsAMatcher(context.RequestContext),
+                                    ['fake_id_a'], {'state': 'error'})
+
+    def test_init_host_with_exception_on_update_access(self):
+        shares = [
+            {'id': 'fake_id_1', 'status': 'available', 'name': 'fake_name_1'},
+        ]
+        rules = [
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_a'),
+            FakeAccessRule(state='error', share_id='fake_id_1',
+                           id='fake_id_b'),
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_c'),
+        ]
+        self.stubs.Set(self.share_manager.db,
+                       'share_get_all_by_host',
+                       mock.Mock(return_value=shares))
+        self.stubs.Set(self.share_manager.driver, 'ensure_share', mock.Mock())
+        self.stubs.Set(self.share_manager, '_get_share_server',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self.share_manager, 'publish_service_capabilities',
+                       mock.Mock())
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
+                       mock.Mock(return_value=rules))
+        self.stubs.Set(self.share_manager.driver, 'update_access',
+                       mock.Mock(side_effect=exception.ManilaException(
+                           message="Fake raise")))
+        self.stubs.Set(self.share_manager.db, 'share_access_update_many',
+                       mock.Mock())
+
+        self.share_manager.init_host()
+
+        self.assertFalse(self.share_manager.db.share_access_update_many.called)
+
+    def test_init_host_with_failed_rules_on_update_access(self):
+        shares = [
+            {'id': 'fake_id_1', 'status': 'available', 'name': 'fake_name_1'},
+        ]
+        rules = [
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_a'),
+            FakeAccessRule(state='active', share_id='fake_id_1',
+                           id='fake_id_b'),
+        ]
+        self.stubs.Set(self.share_manager.db,
+                       'share_get_all_by_host',
+                       mock.Mock(return_value=shares))
+        self.stubs.Set(self.share_manager.driver, 'ensure_share', mock.Mock())
+        self.stubs.Set(self.share_manager, '_get_share_server',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self.share_manager, 'publish_service_capabilities',
+                       mock.Mock())
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
+                       mock.Mock(return_value=rules))
+        self.stubs.Set(self.share_manager.driver, 'update_access',
+                       mock.Mock(side_effect=exception.ShareAccessUpdateFailed(
+                           access_ids=['fake_id_b'], share_id='fake_id_1')))
+        self.stubs.Set(self.share_manager.db, 'share_access_update_many',
+                       mock.Mock())
+
+        self.share_manager.init_host()
+
+        self.share_manager.db.share_access_update_many.\
+            assert_called_once_with(utils.IsAMatcher(context.RequestContext),
+                                    ['fake_id_b'], {'state': 'error'})
+
+    def test_init_host_with_workers_limited_per_share_server(self):
+        self.flags(ensure_share_workers=4,
+                   ensure_share_workers_per_share_server=1)
+        shares = [
+            {'id': 'fake_id_%s' % i, 'status': 'available',
+             'share_server_id': 'fake_server_%s' % (i % 2)}
+            for i in range(6)
+        ]
+        running = {'fake_server_0': 0, 'fake_server_1': 0}
+        max_running = {'total': 0}
+
+        def fake_ensure_share(context, share, share_server=None):
+            running[share['share_server_id']] += 1
+            max_running['total'] = max(max_running['total'],
+                                       sum(running.values()))
+            self.assertEqual(1, running[share['share_server_id']])
+            eventlet.sleep(0)
+            running[share['share_server_id']] -= 1
+
+        self.stubs.Set(self.share_manager.db, 'share_get_all_by_host',
+                       mock.Mock(return_value=shares))
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
+                       mock.Mock(return_value=[]))
+        self.stubs.Set(self.share_manager, '_get_share_server',
+                       mock.Mock(return_value=None))
+        self.stubs.Set(self.share_manager.driver, 'ensure_share',
+                       mock.Mock(side_effect=fake_ensure_share))
+        self.stubs.Set(self.share_manager, 'publish_service_capabilities',
+                       mock.Mock())
+
+        self.share_manager.init_host()
+
+        self.assertEqual(len(shares),
+                         self.share_manager.driver.ensure_share.call_count)
+        self.assertEqual(2, max_running['total'])
+
+    def test_init_host_with_exception_on_get_share_server(self):
+        shares = [
+            {'id': 'fake_id_1', 'status': 'available'},
+            {'id': 'fake_id_2', 'status': 'available'},
+        ]
+        self.stubs.Set(self.share_manager.db, 'share_get_all_by_host',
+                       mock.Mock(return_value=shares))
+        self.stubs.Set(self.share_manager.db,
+                       'share_access_get_all_for_shares',
+                       mock.Mock(return_value=[]))
+        self.stubs.Set(self.share_manager, '_get_share_server',
+                       mock.Mock(side_effect=[exception.ShareServerNotFound(
+                           share_server_id='fake'), None]))
+        self.stubs.Set(self.share_manager.driver, 'ensure_share',
+                       mock.Mock())
+        self.stubs.Set(self.share_manager, 'publish_service_capabilities',
+                       mock.Mock())
+
+        self.share_manager.init_host()
+
+        self.share_manager.driver.ensure_share.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), shares[1],
+            share_server=None)
+
     def test_create_share_from_snapshot_with_server(self):
         """Test share can be created from snapshot if server exists."""
         network = self._create_share_network()
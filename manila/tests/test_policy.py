@@ -63,6 +63,29 @@ class PolicyFileTestCase(test.TestCase):
                 self.target,
             )
 
+    def test_policy_file_check_throttled(self):
+        self.flags(policy_file_check_interval=10)
+        with utils.tempdir() as tmpdir:
+            tmpfilename = os.path.join(tmpdir, 'policy')
+            self.flags(policy_file=tmpfilename)
+            with open(tmpfilename, "w") as policyfile:
+                policyfile.write("""{"example:test": []}""")
+            with mock.patch.object(policy.time, 'time',
+                                   mock.Mock(return_value=100)):
+                policy.init(tmpfilename)
+            with mock.patch.object(common_policy.fileutils,
+                                   'read_cached_file') as read_cached_file:
+                read_cached_file.return_value = (False, None)
+                with mock.patch.object(policy.time, 'time',
+                                       mock.Mock(return_value=105)):
+                    policy.enforce(self.context, "example:test", self.target)
+                self.assertFalse(read_cached_file.called)
+                with mock.patch.object(policy.time, 'time',
+                                       mock.Mock(return_value=110)):
+                    policy.enforce(self.context, "example:test", self.target)
+                read_cached_file.assert_called_once_with(tmpfilename,
+                                                         force_reload=False)
+
 
 class PolicyTestCase(test.TestCase):
     def setUp(self):
@@ -159,6 +182,70 @@ class PolicyTestCase(test.TestCase):
         policy.enforce(admin_context, lowercase_action, self.target)
         policy.enforce(admin_context, uppercase_action, self.target)
 
+    def test_enforce_caches_decisions(self):
+        action = "example:my_file"
+        policy.enforce(self.context, action, {'project_id': 'fake'})
+        policy.enforce(self.context, action, {'project_id': 'fake'})
+        self.assertEqual(1, len(policy._ENFORCER._decisions))
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertEqual(2, len(policy._ENFORCER._decisions))
+
+    def test_enforce_cache_ignores_unrelated_values(self):
+        action = "example:my_file"
+        policy.enforce(self.context, action,
+                       {'project_id': 'fake', 'id': 'share1'})
+        policy.enforce(self.context, action,
+                       {'project_id': 'fake', 'id': 'share2'})
+        self.assertEqual(1, len(policy._ENFORCER._decisions))
+
+    def test_enforce_cache_size(self):
+        self.flags(policy_decision_cache_size=1)
+        action = "example:my_file"
+        policy.enforce(self.context, action, {'project_id': 'fake'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertEqual(1, len(policy._ENFORCER._decisions))
+
+    def test_enforce_cache_disabled(self):
+        self.flags(policy_decision_cache_size=0)
+        policy.enforce(self.context, "example:my_file",
+                       {'project_id': 'fake'})
+        self.assertEqual(0, len(policy._ENFORCER._decisions))
+
+    def test_enforce_unhashable_value_not_cached(self):
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:my_file",
+                          {'project_id': {}})
+        self.assertEqual(0, len(policy._ENFORCER._decisions))
+
+    def test_set_rules_invalidates_cached_decisions(self):
+        action = "example:allowed"
+        policy.enforce(self.context, action, self.target)
+        self.rules[action] = [["false:false"]]
+        self._set_rules()
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, self.target)
+
+    def test_enforce_http_not_cached(self):
+        responses = ["True", "False"]
+
+        def fakeurlopen(url, post_data):
+            return six.StringIO(responses.pop(0))
+
+        action = "example:get_http"
+        with mock.patch.object(urlrequest, 'urlopen', fakeurlopen):
+            policy.enforce(self.context, action, {})
+            self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                              self.context, action, {})
+        self.assertEqual(0, len(policy._ENFORCER._decisions))
+
+    def test_enforce_rule_reference_cycle(self):
+        self.rules["example:cycle"] = [["rule:example:cycle"]]
+        self._set_rules()
+        self.assertRaises(RuntimeError, policy.enforce,
+                          self.context, "example:cycle", self.target)
+
 
 class DefaultPolicyTestCase(test.TestCase):
 
@@ -15,9 +15,11 @@
 #    under the License.
 
 import datetime
+import time
 
 import mock
 from oslo.config import cfg
+from oslo.db import exception as db_exception
 import testtools
 
 from manila import context
@@ -87,6 +89,247 @@ class QuotaIntegrationTestCase(test.TestCase):
             db.share_delete(self.context, share_id)
 
 
+class QuotaLimitsCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(QuotaLimitsCacheTestCase, self).setUp()
+        self.flags(quota_limits_cache_ttl=60)
+        self.context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        self.driver = quota.DbQuotaDriver()
+        self.resources = quota.QUOTAS._resources
+
+    def _get_limits(self, ctxt=None, project_id='project'):
+        quotas = self.driver.get_project_quotas(ctxt or self.context,
+                                                self.resources, project_id,
+                                                usages=False)
+        return dict((k, v['limit']) for k, v in quotas.items())
+
+    def test_limits_are_cached(self):
+        with mock.patch.object(db, 'quota_get_all_by_project',
+                               wraps=db.quota_get_all_by_project) as get:
+            self._get_limits()
+            self._get_limits()
+        self.assertEqual(1, get.call_count)
+        # The project limits and the default quota class.
+        self.assertEqual({'hits': 2, 'misses': 2, 'entries': 2},
+                         self.driver.limits_cache.stats())
+
+    def test_limits_expire(self):
+        self._get_limits()
+        db.quota_create(self.context, 'project', 'shares', 5)
+        self.assertEqual(10, self._get_limits()['shares'])
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(5, self._get_limits()['shares'])
+
+    def test_disabled(self):
+        self.flags(quota_limits_cache_ttl=0)
+        self._get_limits()
+        db.quota_create(self.context, 'project', 'shares', 5)
+        self.assertEqual(5, self._get_limits()['shares'])
+        self.assertEqual({'hits': 0, 'misses': 0, 'entries': 0},
+                         self.driver.limits_cache.stats())
+
+    def test_invalidate_project(self):
+        self._get_limits()
+        self._get_limits(project_id='other_project')
+        db.quota_create(self.context, 'project', 'shares', 5)
+        db.quota_create(self.context, 'other_project', 'shares', 5)
+
+        self.driver.invalidate_limits(project_id='project')
+
+        self.assertEqual(5, self._get_limits()['shares'])
+        self.assertEqual(10, self._get_limits(
+            project_id='other_project')['shares'])
+
+    def test_invalidate_quota_class(self):
+        self._get_limits()
+        db.quota_class_create(self.context, 'default', 'shares', 5)
+
+        self.driver.invalidate_limits(quota_class='default')
+
+        self.assertEqual(5, self._get_limits()['shares'])
+
+    def test_user_limits(self):
+        quotas = self.driver.get_user_quotas(self.context, self.resources,
+                                             'project', 'user', usages=False)
+        self.assertEqual(10, quotas['shares']['limit'])
+        db.quota_create(self.context, 'project', 'shares', 5,
+                        user_id='user')
+        self.driver.invalidate_limits(project_id='project')
+
+        quotas = self.driver.get_user_quotas(self.context, self.resources,
+                                             'project', 'user', usages=False)
+        self.assertEqual(5, quotas['shares']['limit'])
+
+    def test_destroy_all_by_project_invalidates(self):
+        db.quota_create(self.context, 'project', 'shares', 5)
+        self.assertEqual(5, self._get_limits()['shares'])
+
+        self.driver.destroy_all_by_project(self.context, 'project')
+
+        self.assertEqual(10, self._get_limits()['shares'])
+
+    def test_hit_checks_access(self):
+        self._get_limits()
+        user_context = context.RequestContext('user', 'other_project')
+        self.assertRaises(exception.NotAuthorized, self._get_limits,
+                          user_context)
+
+    def test_engine_invalidate_limits(self):
+        engine = quota.QuotaEngine(quota_driver_class=self.driver)
+        engine.register_resources(self.resources.values())
+        engine.get_project_quotas(self.context, 'project')
+        db.quota_create(self.context, 'project', 'shares', 5)
+
+        engine.invalidate_limits(project_id='project')
+
+        self.assertEqual(
+            5, engine.get_project_quotas(self.context,
+                                         'project')['shares']['limit'])
+
+
+class OptimisticDbQuotaDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(OptimisticDbQuotaDriverTestCase, self).setUp()
+        self.flags(quota_shares=3, quota_gigabytes=100)
+        self.context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        self.quotas = quota.QuotaEngine(
+            quota_driver_class=quota.OptimisticDbQuotaDriver())
+        self.quotas.register_resources(quota.QUOTAS._resources.values())
+
+    def _get_usages(self):
+        return db.quota_usage_get_all_by_project_and_user(
+            self.context, 'project', 'user')
+
+    def test_reserve_and_commit(self):
+        self.quotas.reserve(self.context, shares=1, gigabytes=10)
+        with mock.patch.object(sqa_api, '_get_user_quota_usages') as locked:
+            reservations = self.quotas.reserve(self.context, shares=1,
+                                               gigabytes=10)
+            self.quotas.commit(self.context, reservations)
+        self.assertFalse(locked.called)
+
+        usages = self._get_usages()
+        self.assertEqual(1, usages['shares']['in_use'])
+        self.assertEqual(1, usages['shares']['reserved'])
+        self.assertEqual(10, usages['gigabytes']['in_use'])
+        self.assertEqual(10, usages['gigabytes']['reserved'])
+
+    def test_commit_twice_is_applied_once(self):
+        self.quotas.reserve(self.context, shares=1)
+        reservations = self.quotas.reserve(self.context, shares=1)
+        self.quotas.commit(self.context, reservations)
+        self.quotas.commit(self.context, reservations)
+
+        usages = self._get_usages()
+        self.assertEqual(1, usages['shares']['in_use'])
+        self.assertEqual(1, usages['shares']['reserved'])
+
+    def test_rollback(self):
+        self.quotas.reserve(self.context, shares=1)
+        reservations = self.quotas.reserve(self.context, shares=1)
+        self.quotas.rollback(self.context, reservations)
+
+        usages = self._get_usages()
+        self.assertEqual(0, usages['shares']['in_use'])
+        self.assertEqual(1, usages['shares']['reserved'])
+
+    def test_reserve_over_quota(self):
+        self.quotas.reserve(self.context, shares=2)
+        self.quotas.reserve(self.context, shares=1)
+        self.assertRaises(exception.OverQuota, self.quotas.reserve,
+                          self.context, shares=1)
+        self.assertEqual(3, self._get_usages()['shares']['reserved'])
+
+    def test_reserve_over_project_quota_of_other_users(self):
+        self.quotas.reserve(self.context, shares=2)
+        other_context = context.RequestContext('other_user', 'project',
+                                               is_admin=True)
+        self.quotas.reserve(other_context, shares=1)
+        self.assertRaises(exception.OverQuota, self.quotas.reserve,
+                          other_context, shares=1)
+
+    def test_reserve_two_users_race(self):
+        self.quotas.reserve(self.context, shares=2)
+        other_context = context.RequestContext('other_user', 'project',
+                                               is_admin=True)
+        self.quotas.reserve(other_context, shares=1)
+
+        # NOTE: increments of other users are invisible to a racing
+        # transaction until they are committed, it sees stale totals.
+        def stale_totals(ctxt, session, project_id, resources):
+            return dict((res, dict(in_use=0, reserved=0, total=0))
+                        for res in resources)
+
+        with mock.patch.object(sqa_api, '_quota_usages_total',
+                               side_effect=stale_totals):
+            self.assertRaises(exception.OverQuota, self.quotas.reserve,
+                              other_context, shares=1)
+
+        usages = db.quota_usage_get_all_by_project(self.context, 'project')
+        self.assertEqual(3, usages['shares']['reserved'])
+
+    def test_reserve_other_user_usage_created_concurrently(self):
+        self.quotas.reserve(self.context, shares=2)
+        quota_usages_total = sqa_api._quota_usages_total
+
+        def create_other_usage(*args):
+            totals = quota_usages_total(*args)
+            sqa_api._quota_usage_create(self.context, 'project',
+                                        'other_user', 'shares', 0, 1, None)
+            return totals
+
+        with mock.patch.object(sqa_api, '_quota_usages_total',
+                               side_effect=create_other_usage):
+            with mock.patch.object(sqa_api, 'quota_reserve',
+                                   wraps=sqa_api.quota_reserve):
+                self.assertRaises(exception.OverQuota, self.quotas.reserve,
+                                  self.context, shares=1)
+                self.assertTrue(sqa_api.quota_reserve.called)
+
+        self.assertEqual(2, self._get_usages()['shares']['reserved'])
+
+    def test_reserve_retries_on_deadlock(self):
+        self.quotas.reserve(self.context, shares=1)
+        reserve = sqa_api._quota_reserve_optimistic
+        attempts = []
+
+        def deadlock_once(*args):
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise db_exception.DBDeadlock()
+            return reserve(*args)
+
+        with mock.patch.object(sqa_api, '_quota_reserve_optimistic',
+                               side_effect=deadlock_once):
+            self.quotas.reserve(self.context, shares=1)
+
+        self.assertEqual(2, len(attempts))
+        self.assertEqual(2, self._get_usages()['shares']['reserved'])
+
+    def test_reserve_retries_then_locks(self):
+        self.flags(quota_reserve_retries=2)
+        self.quotas.reserve(self.context, shares=1)
+        with mock.patch.object(sqa_api, '_quota_reserve_optimistic',
+                               side_effect=sqa_api._QuotaUsageChanged):
+            self.quotas.reserve(self.context, shares=1)
+            self.assertEqual(3, sqa_api._quota_reserve_optimistic.call_count)
+        self.assertEqual(2, self._get_usages()['shares']['reserved'])
+
+    def test_reserve_refresh_locks(self):
+        self.flags(until_refresh=2, quota_shares=10)
+        self.quotas.reserve(self.context, shares=1)
+        db.share_create(self.context, {'user_id': 'user',
+                                       'project_id': 'project', 'size': 1})
+        self.quotas.reserve(self.context, shares=1)
+        self.assertEqual(0, self._get_usages()['shares']['in_use'])
+        self.quotas.reserve(self.context, shares=1)
+        self.assertEqual(1, self._get_usages()['shares']['in_use'])
+
+
 class FakeContext(object):
     def __init__(self, project_id, quota_class):
         self.is_admin = False
@@ -1144,6 +1387,9 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                 return {res_name: 0}
             return sync
 
+        patcher = mock.patch.dict(sqa_api.QUOTA_SYNC_FUNCTIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.resources = {}
         for res_name in ('shares', 'gigabytes'):
             method_name = '_sync_%s' % res_name
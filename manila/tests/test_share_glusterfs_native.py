@@ -197,3 +197,19 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self.assertRaises(exception.ProcessExecutionError,
                           self._driver.deny_access, self._context, self.share,
                           access)
+
+    def test_update_access(self):
+        self._driver.allow_access = mock.Mock()
+        self._driver.deny_access = mock.Mock()
+        self._driver._manage_access = mock.Mock()
+        add_rules = [{'access_type': 'cert', 'access_to': 'client1'}]
+        delete_rules = [{'access_type': 'cert', 'access_to': 'client2'}]
+
+        self._driver.update_access(self._context, self.share, add_rules,
+                                   delete_rules)
+
+        self._driver.deny_access.assert_called_once_with(
+            self._context, self.share, delete_rules[0], share_server=None)
+        self._driver.allow_access.assert_called_once_with(
+            self._context, self.share, add_rules[0], share_server=None)
+        self.assertFalse(self._driver._manage_access.called)
@@ -209,3 +209,99 @@ class CinderApiTestCase(test.TestCase):
         self.api.delete_snapshot(self.ctx, 'id1')
         self.cinderclient.volume_snapshots.delete.assert_called_once_with(
             'id1')
+
+    def test_wait_for_volume(self):
+        self.stubs.Set(cinder._volume_waiter, 'wait',
+                       mock.Mock(return_value='fake_volume'))
+        check = mock.Mock()
+
+        result = self.api.wait_for_volume(self.ctx, 'id1', check, 10)
+
+        cinder._volume_waiter.wait.assert_called_once_with(
+            self.ctx, 'id1', check, 10, resource=None)
+        self.assertEqual('fake_volume', result)
+
+    def test_get_volumes_one(self):
+        volume = mock.Mock(id='id1')
+        self.stubs.Set(self.cinderclient.volumes, 'get',
+                       mock.Mock(return_value=volume))
+        self.stubs.Set(self.cinderclient.volumes, 'list', mock.Mock())
+
+        result = cinder._get_volumes(self.ctx, ['id1'])
+
+        self.cinderclient.volumes.get.assert_called_once_with('id1')
+        self.assertFalse(self.cinderclient.volumes.list.called)
+        self.assertEqual({'id1': volume}, result)
+
+    def test_get_volumes_one_not_found(self):
+        self.stubs.Set(self.cinderclient.volumes, 'get', mock.Mock(
+            side_effect=cinder_exception.NotFound(404)))
+
+        self.assertEqual({}, cinder._get_volumes(self.ctx, ['id1']))
+
+    def test_get_volumes_many(self):
+        volumes = {'id0': mock.Mock(id='id0'), 'id2': mock.Mock(id='id2')}
+        self.stubs.Set(self.cinderclient.volumes, 'list', mock.Mock(
+            return_value=[volumes['id0'], mock.Mock(id='other')]))
+
+        def fake_get(volume_id):
+            if volume_id not in volumes:
+                raise cinder_exception.NotFound(404)
+            return volumes[volume_id]
+        self.stubs.Set(self.cinderclient.volumes, 'get',
+                       mock.Mock(side_effect=fake_get))
+
+        result = cinder._get_volumes(self.ctx, ['id0', 'id2', 'id3'])
+
+        self.cinderclient.volumes.list.assert_called_once_with(
+            detailed=True, search_opts={'all_tenants': True})
+        self.assertEqual([mock.call('id2'), mock.call('id3')],
+                         self.cinderclient.volumes.get.call_args_list)
+        self.assertEqual(volumes, result)
+
+    def test_get_volumes_many_listed(self):
+        volumes = {'id0': mock.Mock(id='id0'), 'id1': mock.Mock(id='id1')}
+        self.stubs.Set(self.cinderclient.volumes, 'list',
+                       mock.Mock(return_value=volumes.values()))
+        self.stubs.Set(self.cinderclient.volumes, 'get', mock.Mock())
+
+        result = cinder._get_volumes(self.ctx, ['id0', 'id1'])
+
+        self.assertFalse(self.cinderclient.volumes.get.called)
+        self.assertEqual(volumes, result)
+
+    def test_get_volumes_error(self):
+        self.stubs.Set(self.cinderclient.volumes, 'get', mock.Mock(
+            side_effect=cinder_exception.ClientException(500)))
+
+        self.assertRaises(cinder_exception.ClientException,
+                          cinder._get_volumes, self.ctx, ['id1'])
+
+    def test_wait_for_snapshot(self):
+        self.stubs.Set(cinder._snapshot_waiter, 'wait',
+                       mock.Mock(return_value='fake_snapshot'))
+        check = mock.Mock()
+
+        result = self.api.wait_for_snapshot(self.ctx, 'id1', check, 10,
+                                            snapshot='fake_snapshot')
+
+        cinder._snapshot_waiter.wait.assert_called_once_with(
+            self.ctx, 'id1', check, 10, resource='fake_snapshot')
+        self.assertEqual('fake_snapshot', result)
+
+
+class CinderclientTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CinderclientTestCase, self).setUp()
+        cinder._client_cache.clear()
+
+    @mock.patch.object(cinder.cinder_client, 'Client', mock.Mock())
+    def test_cinderclient_admin_cached(self):
+        ctx = context.get_admin_context()
+
+        client = cinder.cinderclient(ctx)
+
+        self.assertIs(client, cinder.cinderclient(ctx))
+        self.assertEqual(1, cinder.cinder_client.Client.call_count)
+        client.authenticate.assert_called_once_with()
@@ -27,6 +27,8 @@ from cinderclient import service_catalog
 from cinderclient.v1 import client as cinder_client
 from oslo.config import cfg
 
+from manila.common import client_cache
+from manila.common import waiter
 from manila.db import base
 from manila import exception
 from manila.openstack.common import log as logging
@@ -72,15 +74,20 @@ CONF.register_opts(cinder_opts)
 LOG = logging.getLogger(__name__)
 
 
+_client_cache = client_cache.ClientCache('cinder')
+
+
 def cinderclient(context):
     if context.is_admin and context.project_id is None:
-        c = cinder_client.Client(CONF.cinder_admin_username,
-                                 CONF.cinder_admin_password,
-                                 CONF.cinder_admin_tenant_name,
-                                 CONF.cinder_admin_auth_url,
-                                 retries=CONF.cinder_http_retries,)
-        c.authenticate()
-        return c
+        return _client_cache.get(
+            ('admin', CONF.cinder_admin_auth_url, CONF.cinder_admin_username,
+             CONF.cinder_admin_tenant_name),
+            lambda: cinder_client.Client(CONF.cinder_admin_username,
+                                         CONF.cinder_admin_password,
+                                         CONF.cinder_admin_tenant_name,
+                                         CONF.cinder_admin_auth_url,
+                                         retries=CONF.cinder_http_retries,),
+            authenticate=lambda c: c.authenticate())
 
     compat_catalog = {
         'access': {'serviceCatalog': context.service_catalog or []}
@@ -101,20 +108,24 @@ def cinderclient(context):
                      service_name=service_name,
                      endpoint_type=endpoint_type)
 
-    LOG.debug('Cinderclient connection created using URL: %s' % url)
-
-    c = cinder_client.Client(context.user_id,
-                             context.auth_token,
-                             project_id=context.project_id,
-                             auth_url=url,
-                             insecure=CONF.cinder_api_insecure,
-                             retries=CONF.cinder_http_retries,
-                             cacert=CONF.cinder_ca_certificates_file)
-    # noauth extracts user_id:project_id from auth_token
-    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
-                                                           context.project_id)
-    c.client.management_url = url
-    return c
+    def create():
+        LOG.debug('Cinderclient connection created using URL: %s' % url)
+
+        c = cinder_client.Client(context.user_id,
+                                 context.auth_token,
+                                 project_id=context.project_id,
+                                 auth_url=url,
+                                 insecure=CONF.cinder_api_insecure,
+                                 retries=CONF.cinder_http_retries,
+                                 cacert=CONF.cinder_ca_certificates_file)
+        # noauth extracts user_id:project_id from auth_token
+        c.client.auth_token = context.auth_token or '%s:%s' % (
+            context.user_id, context.project_id)
+        c.client.management_url = url
+        return c
+    return _client_cache.get(
+        (url, context.user_id, context.project_id, context.auth_token),
+        create)
 
 
 def _untranslate_volume_summary_view(context, vol):
@@ -205,6 +216,45 @@ def translate_snapshot_exception(method):
     return wrapper
 
 
+def _get_items(context, manager, item_ids, untranslate):
+    """Returns items with given ids by their ids.
+
+    A single item is shown, several ones are taken from one listing.
+    Listings are capped by cinder, so items missing in the listing are
+    shown on their own. Items cinder reports as not found are left out,
+    other errors are raised.
+    """
+    items = {}
+    if len(item_ids) > 1:
+        search_opts = {'all_tenants': True} if context.is_admin else {}
+        for item in manager.list(detailed=True, search_opts=search_opts):
+            if item.id in item_ids:
+                items[item.id] = untranslate(context, item)
+    for item_id in item_ids:
+        if item_id in items:
+            continue
+        try:
+            item = manager.get(item_id)
+        except cinder_exception.NotFound:
+            continue
+        items[item_id] = untranslate(context, item)
+    return items
+
+
+def _get_volumes(context, volume_ids):
+    return _get_items(context, cinderclient(context).volumes, volume_ids,
+                      _untranslate_volume_summary_view)
+
+
+def _get_snapshots(context, snapshot_ids):
+    return _get_items(context, cinderclient(context).volume_snapshots,
+                      snapshot_ids, _untranslate_snapshot_summary_view)
+
+
+_volume_waiter = waiter.Waiter('Volume', _get_volumes)
+_snapshot_waiter = waiter.Waiter('Volume snapshot', _get_snapshots)
+
+
 class API(base.Base):
     """API for interacting with the volume manager."""
     @translate_volume_exception
@@ -222,6 +272,16 @@ class API(base.Base):
 
         return rval
 
+    def wait_for_volume(self, context, volume_id, check, timeout,
+                        volume=None):
+        """Waits until check passes for the volume and returns it.
+
+        check gets None when the volume does not exist.  Volumes waited
+        for at the same time are polled together.
+        """
+        return _volume_waiter.wait(context, volume_id, check, timeout,
+                                   resource=volume)
+
     def check_attached(self, context, volume):
         """Raise exception if volume in use."""
         if volume['status'] != "in-use":
@@ -332,6 +392,15 @@ class API(base.Base):
 
         return rvals
 
+    def wait_for_snapshot(self, context, snapshot_id, check, timeout,
+                          snapshot=None):
+        """Waits until check passes for the snapshot and returns it.
+
+        check gets None when the snapshot does not exist.
+        """
+        return _snapshot_waiter.wait(context, snapshot_id, check, timeout,
+                                     resource=snapshot)
+
     @translate_volume_exception
     def create_snapshot(self, context, volume_id, name, description):
         item = cinderclient(context).volume_snapshots.create(volume_id,
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare per host and vectorized filtering and weighing of hosts.
+
+Runs CapacityFilter and CapacityWeigher of the scheduler host manager over
+synthetic hosts with both evaluation paths and prints mean time per request.
+
+Usage: tools/benchmark_host_evaluation.py [--requests N] [--json] [HOSTS ...]
+"""
+
+import random
+import sys
+
+import benchmark_utils
+
+from oslo.config import cfg
+
+from manila.scheduler import host_manager
+
+CONF = cfg.CONF
+
+FILTERS = ['CapacityFilter']
+WEIGHERS = ['CapacityWeigher']
+
+
+def make_host_manager(host_count, vectorized):
+    CONF.set_override('scheduler_use_vectorized_evaluation', vectorized)
+    manager = host_manager.HostManager()
+    rand = random.Random(host_count)
+    for i in range(host_count):
+        host_state = host_manager.HostState('host%s' % i)
+        host_state.update_from_share_capability({
+            'total_capacity_gb': 10240,
+            'free_capacity_gb': rand.randint(0, 10240),
+            'reserved_percentage': rand.choice([0, 5, 10]),
+            'timestamp': None,
+        })
+        manager.host_state_map[host_state.host] = host_state
+    if vectorized:
+        manager._update_host_arrays()
+    return manager
+
+
+def run(manager, requests):
+    hosts = list(manager.host_state_map.values())
+    rand = random.Random(requests)
+
+    def schedule():
+        for i in range(requests):
+            filter_properties = {'size': rand.randint(1, 1024)}
+            filtered = manager.get_filtered_hosts(hosts, filter_properties,
+                                                  FILTERS)
+            weighed = manager.get_weighed_hosts(filtered, filter_properties,
+                                                WEIGHERS)
+            if weighed:
+                weighed[0].obj.consume_from_share(filter_properties)
+
+    return benchmark_utils.timed(schedule)[1] / requests
+
+
+def main():
+    parser = benchmark_utils.make_parser(__doc__)
+    parser.add_argument('--requests', type=int, default=20,
+                        help='Number of requests per measurement.')
+    parser.add_argument('hosts', type=int, nargs='*',
+                        default=[10, 1000, 10000],
+                        help='Host counts to measure.')
+    args = parser.parse_args()
+    if host_manager.np is None:
+        sys.exit('NumPy is required for vectorized evaluation.')
+
+    results = []
+    for host_count in args.hosts:
+        per_host = run(make_host_manager(host_count, False), args.requests)
+        vectorized = run(make_host_manager(host_count, True), args.requests)
+        results.append({
+            'hosts': host_count,
+            'per_host_ms': per_host * 1000,
+            'vectorized_ms': vectorized * 1000,
+            'speedup': per_host / vectorized,
+        })
+    benchmark_utils.print_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
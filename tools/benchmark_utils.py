@@ -0,0 +1,84 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Common code of the benchmarks in tools.
+
+Importing this module makes the manila tree the benchmark is run from
+importable and loads the configuration options of manila.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                   os.pardir,
+                                   os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'manila', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+from manila.openstack.common import gettextutils
+gettextutils.install('manila')
+
+from manila.common import config  # noqa
+
+
+def make_parser(doc):
+    """Returns argument parser described by the module docstring."""
+    parser = argparse.ArgumentParser(
+        description=doc.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--json', action='store_true',
+                        help='Print results as JSON.')
+    return parser
+
+
+def timed(func, *args, **kwargs):
+    """Calls func, returns its result and the seconds it took."""
+    start = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - start
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
+
+
+def rate_and_latency(name, latencies, elapsed):
+    """Returns rate and latency percentiles of operations in ms."""
+    return {
+        name + '_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'latency_max_ms': max(latencies or [0]) * 1000,
+    }
+
+
+def print_results(results, as_json=False):
+    """Prints list of result dicts as JSON or as key value lines."""
+    if as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        return
+    width = max(len(key) for result in results for key in result) + 2
+    for result in results:
+        for key in sorted(result):
+            print('%-*s %s' % (width, key, result[key]))
+        print()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark placement decisions of the filter scheduler.
+
+Synthetic share services report their capabilities to the scheduler host
+manager, then a stream of share requests is placed with
+FilterScheduler._schedule_share, with the database replaced by the fakes of
+manila.tests.scheduler. Requests are either generated or replayed from a
+file with one JSON object per line: a request spec or just its share
+properties, e.g. {"size": 10, "availability_zone": "zone1"}.
+
+Reported are decisions per second, latency percentiles and placement
+quality: failed requests, requests failed in spite of enough free capacity
+in total (fragmentation) and spread of utilization over hosts.
+"""
+
+import json
+import math
+import random
+
+import benchmark_utils
+
+import mock
+from oslo.config import cfg
+
+from manila import context
+from manila import db
+from manila import exception
+from manila.openstack.common import timeutils
+from manila.share import rpcapi as share_rpcapi
+from manila.tests.scheduler import fakes
+
+CONF = cfg.CONF
+
+
+def make_services(host_count, zone_count):
+    return [dict(id=i, host='host%s' % i, topic=CONF.share_topic,
+                 disabled=False, availability_zone='zone%s' % (i % zone_count),
+                 updated_at=timeutils.utcnow())
+            for i in range(host_count)]
+
+
+def make_capabilities(rand, args):
+    total = rand.choice(args.host_capacities)
+    return {
+        'total_capacity_gb': total,
+        'free_capacity_gb': int(total * rand.uniform(args.min_free, 1.0)),
+        'reserved_percentage': rand.choice([0, 5, 10]),
+    }
+
+
+def make_size(rand, args):
+    if args.size_distribution == 'fixed':
+        return args.mean_size
+    if args.size_distribution == 'uniform':
+        return rand.randint(1, 2 * args.mean_size - 1)
+    return max(1, int(rand.expovariate(1.0 / args.mean_size)))
+
+
+def generate_requests(rand, args):
+    for i in range(args.requests):
+        share_properties = {'size': make_size(rand, args)}
+        if rand.random() < args.zone_fraction:
+            share_properties['availability_zone'] = 'zone%s' % rand.randrange(
+                args.zones)
+        yield share_properties
+
+
+def load_requests(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def to_request_spec(index, request):
+    if 'share_properties' in request:
+        request_spec = dict(request)
+    else:
+        request_spec = {'share_properties': dict(request)}
+    request_spec.setdefault('share_id', 'share%s' % index)
+    request_spec['share_properties'].setdefault('project_id', 'project')
+    return request_spec
+
+
+def free_capacity(host_state):
+    free = host_state.free_capacity_gb
+    if free in ('infinite', 'unknown'):
+        return float('inf')
+    reserved = float(host_state.reserved_percentage) / 100
+    return math.floor(free * (1 - reserved))
+
+
+def run(args):
+    rand = random.Random(args.seed)
+    CONF.set_override('scheduler_use_vectorized_evaluation', args.vectorized)
+    if args.filters:
+        CONF.set_override('scheduler_default_filters', args.filters)
+    if args.weighers:
+        CONF.set_override('scheduler_default_weighers', args.weighers)
+
+    # Placement decisions are not sent anywhere, RPC client is not needed.
+    with mock.patch.object(share_rpcapi, 'ShareAPI'):
+        sched = fakes.FakeFilterScheduler()
+    services = make_services(args.hosts, args.zones)
+    for service in services:
+        sched.host_manager.update_service_capabilities(
+            'share', service['host'], make_capabilities(rand, args))
+
+    if args.replay:
+        requests = list(load_requests(args.replay))
+    else:
+        requests = list(generate_requests(rand, args))
+    if args.record:
+        with open(args.record, 'w') as f:
+            for request in requests:
+                f.write(json.dumps(request) + '\n')
+
+    ctxt = context.get_admin_context()
+    latencies = []
+    placed = failed = fragmented = 0
+    with mock.patch.object(db, 'service_get_all_by_topic',
+                           mock.Mock(return_value=services)):
+        # Load host states before measuring.
+        host_states = list(
+            sched.host_manager.get_all_host_states_share(ctxt))
+
+        def schedule(request_spec):
+            try:
+                return sched._schedule_share(ctxt, request_spec, {})
+            except exception.NoValidHost:
+                return None
+
+        elapsed = 0.0
+        for index, request in enumerate(requests):
+            request_spec = to_request_spec(index, request)
+            size = request_spec['share_properties']['size']
+            weighed_host, latency = benchmark_utils.timed(schedule,
+                                                          request_spec)
+            latencies.append(latency)
+            elapsed += latency
+            if weighed_host:
+                placed += 1
+                continue
+            failed += 1
+            if sum(free_capacity(host) for host in host_states) >= size:
+                fragmented += 1
+
+    utilization = [1 - float(host.free_capacity_gb) / host.total_capacity_gb
+                   for host in host_states
+                   if host.total_capacity_gb not in ('infinite', 'unknown')]
+    mean = sum(utilization) / len(utilization) if utilization else 0.0
+    stddev = math.sqrt(sum((u - mean) ** 2 for u in utilization) /
+                       len(utilization)) if utilization else 0.0
+    result = benchmark_utils.rate_and_latency('decisions', latencies,
+                                              elapsed)
+    result.update({
+        'hosts': args.hosts,
+        'requests': len(requests),
+        'placed': placed,
+        'failed': failed,
+        'failed_with_free_capacity': fragmented,
+        'utilization_mean': mean,
+        'utilization_stddev': stddev,
+        'utilization_max': max(utilization or [0]),
+        'utilization_min': min(utilization or [0]),
+    })
+    return result
+
+
+def main():
+    parser = benchmark_utils.make_parser(__doc__)
+    parser.add_argument('--hosts', type=int, default=100,
+                        help='Number of share services.')
+    parser.add_argument('--zones', type=int, default=1,
+                        help='Number of availability zones of services.')
+    parser.add_argument('--host-capacities', type=int, nargs='+',
+                        default=[1024, 4096, 16384],
+                        help='Total capacities in GB to choose from.')
+    parser.add_argument('--min-free', type=float, default=0.2,
+                        help='Minimal initial free fraction of capacity.')
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Number of generated requests.')
+    parser.add_argument('--size-distribution', default='exponential',
+                        choices=['exponential', 'uniform', 'fixed'],
+                        help='Distribution of sizes of generated requests.')
+    parser.add_argument('--mean-size', type=int, default=50,
+                        help='Mean size in GB of generated requests.')
+    parser.add_argument('--zone-fraction', type=float, default=0.0,
+                        help='Fraction of generated requests asking for an '
+                             'availability zone.')
+    parser.add_argument('--filters', nargs='+',
+                        help='Filter class names, default is '
+                             'scheduler_default_filters.')
+    parser.add_argument('--weighers', nargs='+',
+                        help='Weigher class names, default is '
+                             'scheduler_default_weighers.')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Use vectorized evaluation of hosts.')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='Replay requests from the file instead of '
+                             'generating them.')
+    parser.add_argument('--record', metavar='FILE',
+                        help='Write requests to the file for later replay.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random generator.')
+    args = parser.parse_args()
+
+    benchmark_utils.print_results([run(args)], args.json)
+
+
+if __name__ == '__main__':
+    main()